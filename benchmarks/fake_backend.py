@@ -0,0 +1,227 @@
+"""Local stand-in for the Prometheus and Loki HTTP APIs used by the benchmarks."""
+from __future__ import annotations
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+_CHECK_TAG_RE = re.compile(r'"mcp_check_id", "(?P<id>\w+)"')
+_STEP_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass
+class BackendConfig:
+    series: int = 100
+    latency_ms: float = 0.0
+    alerts: int = 200
+    log_streams: int = 10
+    log_lines_per_stream: int = 500
+    seed: int = 42
+
+
+def _step_seconds(raw: str) -> float:
+    raw = raw.strip()
+    if raw and raw[-1] in _STEP_UNITS:
+        return float(raw[:-1]) * _STEP_UNITS[raw[-1]]
+    return float(raw)
+
+
+def _to_ns(raw: str) -> int:
+    # Loki accepts both unix seconds and nanoseconds.
+    value = float(raw)
+    return int(value * 1e9) if value < 1e12 else int(raw)
+
+
+def _series_values(rng: random.Random, start: float, end: float, step: float) -> List[List[Any]]:
+    base = rng.uniform(5, 60)
+    amplitude = rng.uniform(1, 30)
+    phase = rng.uniform(0, math.tau)
+    values: List[List[Any]] = []
+    ts = start
+    while ts <= end:
+        value = base + amplitude * math.sin(phase + ts / 3600.0) + rng.uniform(-2, 2)
+        values.append([ts, f"{max(0.0, min(100.0, value)):.4f}"])
+        ts += step
+    return values
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        parsed = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        config = self.server.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000.0)
+
+        routes = {
+            "/api/v1/query_range": self._prom_query_range,
+            "/api/v1/query": self._prom_query,
+            "/api/v1/alerts": self._prom_alerts,
+            "/loki/api/v1/query_range": self._loki_query_range,
+            "/loki/api/v1/series": self._loki_series,
+        }
+        payload = self.server.payloads.get(self.path)
+        if payload is None:
+            handler = routes.get(parsed.path)
+            if handler is not None:
+                body: Dict[str, Any] = handler(params)
+            elif parsed.path.startswith(("/api/v1/label/", "/loki/api/v1/label/")):
+                body = self._label_values(parsed.path.split("/")[-2])
+            else:
+                self.send_error(404)
+                return
+            # Memoize so repeated runs measure the client, not payload generation.
+            payload = json.dumps(body).encode("utf-8")
+            self.server.payloads[self.path] = payload
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _rng(self, *parts: Any) -> random.Random:
+        return random.Random(f"{self.server.config.seed}:{':'.join(map(str, parts))}")
+
+    def _metrics(self, query: str) -> List[Dict[str, str]]:
+        check_ids = [match.group("id") for match in _CHECK_TAG_RE.finditer(query)] or [None]
+        metrics = []
+        for check_id in check_ids:
+            for i in range(self.server.config.series):
+                metric = {"instance": f"host-{i:05d}:9100", "server_name": f"host-{i:05d}", "job": "node"}
+                if check_id:
+                    metric["mcp_check_id"] = check_id
+                metrics.append(metric)
+        return metrics
+
+    def _prom_query_range(self, params: Dict[str, str]) -> Dict[str, Any]:
+        start, end = float(params["start"]), float(params["end"])
+        step = _step_seconds(params["step"])
+        query = params.get("query", "")
+        result = [
+            {"metric": metric, "values": _series_values(self._rng(query, i), start, end, step)}
+            for i, metric in enumerate(self._metrics(query))
+        ]
+        return {"status": "success", "data": {"resultType": "matrix", "result": result}}
+
+    def _prom_query(self, params: Dict[str, str]) -> Dict[str, Any]:
+        at = float(params.get("time", time.time()))
+        query = params.get("query", "")
+        result = [
+            {"metric": metric, "value": [at, f"{self._rng(query, i).uniform(0, 100):.4f}"]}
+            for i, metric in enumerate(self._metrics(query))
+        ]
+        return {"status": "success", "data": {"resultType": "vector", "result": result}}
+
+    def _prom_alerts(self, params: Dict[str, str]) -> Dict[str, Any]:
+        rng = self._rng("alerts")
+        alerts = []
+        for i in range(self.server.config.alerts):
+            alerts.append(
+                {
+                    "labels": {
+                        "alertname": rng.choice(["HighCPU", "DiskFull", "InstanceDown", "HighLoad"]),
+                        "severity": rng.choice(["warning", "critical"]),
+                        "job": "node",
+                        "server_name": f"host-{i % max(1, self.server.config.series):05d}",
+                        "instance": f"host-{i % max(1, self.server.config.series):05d}:9100",
+                    },
+                    "annotations": {"summary": f"synthetic alert {i}"},
+                    "state": rng.choice(["firing", "pending"]),
+                    "activeAt": "2024-03-24T03:00:00.000000000Z",
+                    "value": f"{rng.uniform(0, 100):.2f}",
+                }
+            )
+        return {"status": "success", "data": {"alerts": alerts}}
+
+    def _loki_query_range(self, params: Dict[str, str]) -> Dict[str, Any]:
+        config = self.server.config
+        start_ns, end_ns = _to_ns(params["start"]), _to_ns(params["end"])
+        limit = int(params.get("limit", 100))
+        per_stream = max(1, min(config.log_lines_per_stream, limit))
+        span = max(1, end_ns - start_ns)
+        levels = ["INFO", "INFO", "INFO", "WARN", "ERROR"]
+        result = []
+        for s in range(config.log_streams):
+            rng = self._rng("loki", params.get("query", ""), s)
+            values = []
+            for i in range(per_stream):
+                ts = end_ns - (span * i) // per_stream
+                values.append(
+                    [str(ts), f"{rng.choice(levels)} request id={rng.randrange(1 << 32):08x} took {rng.randrange(1, 900)}ms"]
+                )
+            result.append({"stream": {"host": f"host-{s:05d}", "app": "api", "env": "bench"}, "values": values})
+        return {"status": "success", "data": {"resultType": "streams", "result": result}}
+
+    def _loki_series(self, params: Dict[str, str]) -> Dict[str, Any]:
+        data = [{"host": f"host-{s:05d}", "app": "api", "env": "bench"} for s in range(self.server.config.log_streams)]
+        return {"status": "success", "data": data}
+
+    def _label_values(self, label: str) -> Dict[str, Any]:
+        count = max(self.server.config.series, self.server.config.log_streams)
+        return {"status": "success", "data": [f"{label}-{i:05d}" for i in range(count)]}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    config: BackendConfig
+    payloads: Dict[str, bytes]
+
+
+class FakeBackend:
+    """
+    Serve synthetic Prometheus/Loki responses from a background thread.
+
+    Data is deterministic for a given seed and query, so runs are comparable
+    across commits. Encoded bodies are memoized per request path until
+    `config` is replaced.
+    """
+
+    def __init__(self, config: Optional[BackendConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = _Server((host, port), _Handler)
+        self._server.config = config or BackendConfig()
+        self._server.payloads = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def config(self) -> BackendConfig:
+        return self._server.config
+
+    @config.setter
+    def config(self, value: BackendConfig) -> None:
+        self._server.config = value
+        self._server.payloads = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeBackend":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeBackend":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
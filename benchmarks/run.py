@@ -0,0 +1,273 @@
+"""
+Time the MCP tools end to end against a local fake Prometheus/Loki backend.
+
+    python -m benchmarks.run --series 10,100,1000 --hours 24 --output bench.json
+
+Results are written as JSON (one record per scenario and size) so runs can be
+diffed across commits.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.fake_backend import BackendConfig, FakeBackend, _series_values
+
+ENVIRONMENT = "bench"
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=_int_list, default=[10, 100, 1000], help="series per query (comma list)")
+    parser.add_argument("--hours", type=int, default=24, help="range window for run_check/run_all_checks")
+    parser.add_argument("--step", default="5m")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="parallel run_check calls (comma list)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="artificial backend latency per request")
+    parser.add_argument("--alerts", type=int, default=500)
+    parser.add_argument("--log-streams", type=int, default=20)
+    parser.add_argument("--log-lines", type=int, default=500, help="log lines per stream")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--cache", action="store_true", help="keep the query cache and background snapshots enabled")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _configure_environment(backend_url: str, *, cache: bool) -> None:
+    # Must run before any `core`/`tools` import: configuration is read at import time.
+    os.environ["PROM_ENV_URLS"] = json.dumps({ENVIRONMENT: backend_url})
+    os.environ["LOKI_ENV_URLS"] = json.dumps({ENVIRONMENT: backend_url})
+    if not cache:
+        os.environ["PROM_CACHE_MAX_ENTRIES"] = "0"
+        # Background snapshots are caches too: without --cache every call hits the backend.
+        os.environ["ALERT_POLL_SEC"] = "0"
+        os.environ["PROM_INVENTORY_REFRESH_SEC"] = "0"
+        os.environ["LOKI_LABEL_INDEX_REFRESH_SEC"] = "0"
+
+
+async def _measure(
+    name: str,
+    params: Dict[str, Any],
+    fn: Callable[[], Awaitable[Any]],
+    *,
+    repeat: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    durations: List[float] = []
+    result: Any = None
+    for i in range(warmup + repeat):
+        t0 = time.perf_counter()
+        result = await fn()
+        elapsed = (time.perf_counter() - t0) * 1000
+        if i >= warmup:
+            durations.append(elapsed)
+
+    record = {
+        "name": name,
+        "params": params,
+        "runs": len(durations),
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "max_ms": round(max(durations), 3),
+        "payload_bytes": len(json.dumps(result, default=str)),
+    }
+    print(f"{name:<24} {json.dumps(params):<60} median={record['median_ms']:.1f}ms", file=sys.stderr)
+    return record
+
+
+async def _run_suite(args: argparse.Namespace, backend: FakeBackend) -> List[Dict[str, Any]]:
+    from core.time_utils import step_to_seconds
+    from domain.checks import CHECKS
+    from tools.alerts_runner import get_alerts
+    from tools.checks_runner import _alert_config_for, run_all_checks, run_check
+    from tools.loki_query import find_logs
+    from utils.summarize import summarize_matrix
+
+    # Per-request access logs would dominate the timings.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    measure = lambda name, params, fn: _measure(name, params, fn, repeat=args.repeat, warmup=args.warmup)  # noqa: E731
+    records: List[Dict[str, Any]] = []
+    alert_config = _alert_config_for(CHECKS["cpu_avg_pct"], args.step)
+    step_seconds = step_to_seconds(args.step)
+
+    for series in args.series:
+        backend.config = BackendConfig(
+            series=series,
+            latency_ms=args.latency_ms,
+            alerts=args.alerts,
+            log_streams=args.log_streams,
+            log_lines_per_stream=args.log_lines,
+        )
+        window = {"series": series, "hours": args.hours, "step": args.step}
+
+        end = time.time()
+        start = end - args.hours * 3600
+        matrix = [
+            {
+                "metric": {"instance": f"host-{i:05d}:9100"},
+                "values": _series_values(random.Random(f"matrix:{i}"), start, end, step_seconds),
+            }
+            for i in range(series)
+        ]
+
+        async def _summarize() -> Any:
+            return summarize_matrix(matrix, False, alert_config=alert_config)
+
+        records.append(await measure("summarize_matrix", window, _summarize))
+        records.append(
+            await measure(
+                "run_check",
+                window,
+                lambda: run_check("cpu_avg_pct", hours=args.hours, step=args.step, environment=ENVIRONMENT),
+            )
+        )
+        for concurrency in args.concurrency:
+            if concurrency <= 1:
+                continue
+
+            async def _concurrent(n: int = concurrency) -> Any:
+                return await asyncio.gather(
+                    *(run_check("cpu_avg_pct", hours=args.hours, step=args.step, environment=ENVIRONMENT) for _ in range(n))
+                )
+
+            records.append(await measure("run_check_concurrent", {**window, "concurrency": concurrency}, _concurrent))
+        records.append(
+            await measure(
+                "run_all_checks",
+                {"series": series, "hours": args.hours, "step": "5m"},
+                lambda: run_all_checks(hours=args.hours, environment=ENVIRONMENT),
+            )
+        )
+
+    records.append(await measure("get_alerts", {"alerts": args.alerts}, lambda: get_alerts(environment=ENVIRONMENT)))
+    records.append(
+        await measure(
+            "get_alerts_filtered",
+            {"alerts": args.alerts, "severity": "critical", "alertname": "DiskFull"},
+            lambda: get_alerts(severity="critical", alertname="DiskFull", environment=ENVIRONMENT),
+        )
+    )
+    find_logs_params = {"streams": args.log_streams, "lines_per_stream": args.log_lines, "limit": 1000}
+    records.append(
+        await measure(
+            "find_logs",
+            find_logs_params,
+            lambda: find_logs(ENVIRONMENT, log_env="bench", host="host-00000", app="api", limit=1000),
+        )
+    )
+
+    records.append(
+        await measure(
+            "find_logs_summarize",
+            {**find_logs_params, "scan_limit": 20_000},
+            lambda: find_logs(
+                ENVIRONMENT, log_env="bench", host="host-00000", app="api", summarize=True, scan_limit=20_000
+            ),
+        )
+    )
+
+    matrix_body = json.dumps(
+        {"status": "success", "data": {"resultType": "matrix", "result": matrix}}
+    ).encode("utf-8")
+    logs_result = await find_logs(ENVIRONMENT, log_env="bench", host="host-00000", app="api", limit=1000)
+    records.extend(await _codec_records(measure, matrix_body, logs_result, series=max(args.series)))
+    records.append(await _template_record(measure, [log["line"] for log in logs_result["logs"]]))
+    return records
+
+
+async def _template_record(measure: Any, sample: List[str], lines: int = 100_000) -> Dict[str, Any]:
+    """Throughput of template mining over `lines` lines drawn from a find_logs result."""
+    from utils.log_templates import TemplateMiner
+
+    corpus = [sample[i % len(sample)] for i in range(lines)] if sample else []
+
+    async def _mine() -> int:
+        miner = TemplateMiner()
+        for i, line in enumerate(corpus):
+            miner.add(line, i)
+        return len(miner.clusters)
+
+    record = await measure("mine_log_templates", {"lines": len(corpus)}, _mine)
+    record["lines_per_sec"] = round(len(corpus) / (record["median_ms"] / 1000)) if record["median_ms"] else None
+    return record
+
+
+async def _codec_records(measure: Any, body: bytes, tool_result: Any, *, series: int) -> List[Dict[str, Any]]:
+    """Decode a query_range body and encode a find_logs result with every installed codec."""
+    from core.json_codec import available_codecs
+
+    records: List[Dict[str, Any]] = []
+    for op, payload in (("json_decode", body), ("json_encode", tool_result)):
+        baseline: Optional[float] = None
+        for name, codec in available_codecs().items():
+            fn = codec.loads if op == "json_decode" else codec.dumps
+
+            async def _run(fn: Any = fn, payload: Any = payload) -> None:
+                fn(payload)
+
+            params = {"codec": name, "series": series} if op == "json_decode" else {"codec": name, "payload": "find_logs"}
+            record = await measure(op, params, _run)
+            if name == "json":
+                baseline = record["median_ms"]
+            record["speedup_vs_json"] = round(baseline / record["median_ms"], 2) if baseline and record["median_ms"] else None
+            record["payload_bytes"] = len(body) if op == "json_decode" else len(json.dumps(payload))
+            records.append(record)
+    return records
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    with FakeBackend() as backend:
+        _configure_environment(backend.url, cache=args.cache)
+        started = datetime.now(timezone.utc)
+        records = asyncio.run(_run_suite(args, backend))
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "started_at_utc": started.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": records,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
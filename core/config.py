@@ -19,7 +19,39 @@ ALERT_WARN_PCT = float(os.environ.get("ALERT_WARN_PCT", "85"))
 ALERT_CRIT_PCT = float(os.environ.get("ALERT_CRIT_PCT", "95"))
 ALERT_SUSTAIN_MINUTES = int(os.environ.get("ALERT_SUSTAIN_MINUTES", "5"))
 MAX_SAMPLES_PER_SERIES = int(os.environ.get("PROM_MAX_SAMPLES_PER_SERIES", "5000"))
-MAX_PARALLEL_CHECKS = int(os.environ.get("PROM_MAX_PARALLEL_CHECKS", "6"))
+PROM_STEP_POINT_BUDGET = int(os.environ.get("PROM_STEP_POINT_BUDGET", "300"))
+PROM_SCRAPE_INTERVAL_SEC = int(os.environ.get("PROM_SCRAPE_INTERVAL_SEC", "15"))
+MAX_PARALLEL_CHECKS = int(os.environ.get("PROM_MAX_PARALLEL_CHECKS", "32"))
+PROM_COALESCE_MAX_CHECKS = int(os.environ.get("PROM_COALESCE_MAX_CHECKS", "8"))
+PROM_CACHE_MAX_ENTRIES = int(os.environ.get("PROM_CACHE_MAX_ENTRIES", "512"))
+PROM_CACHE_MAX_BYTES = int(os.environ.get("PROM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROM_CACHE_TTL_SEC = float(os.environ.get("PROM_CACHE_TTL_SEC", "30"))
+PROM_CACHE_HISTORICAL_TTL_SEC = float(os.environ.get("PROM_CACHE_HISTORICAL_TTL_SEC", "3600"))
+PROM_CACHE_FRESHNESS_SEC = int(os.environ.get("PROM_CACHE_FRESHNESS_SEC", "600"))
+PROM_CACHE_INSTANT_ALIGN_SEC = int(os.environ.get("PROM_CACHE_INSTANT_ALIGN_SEC", "15"))
+PROM_RANGE_CHUNK_SEC = int(os.environ.get("PROM_RANGE_CHUNK_SEC", "3600"))
+PROM_RANGE_CHUNK_POINTS = int(os.environ.get("PROM_RANGE_CHUNK_POINTS", "240"))
+PROM_SHARD_MAX_POINTS = int(os.environ.get("PROM_SHARD_MAX_POINTS", "1440"))
+PROM_SHARD_PARALLELISM = int(os.environ.get("PROM_SHARD_PARALLELISM", "4"))
+PROM_SHARD_RETRIES = int(os.environ.get("PROM_SHARD_RETRIES", "2"))
+PROM_ENV_TIMEOUT_SEC = float(os.environ.get("PROM_ENV_TIMEOUT_SEC", "30"))
+PROM_STREAM_DECODE = os.environ.get("PROM_STREAM_DECODE", "1").strip().lower() in ("1", "true", "yes", "on")
+LOKI_SHARD_SEC = int(os.environ.get("LOKI_SHARD_SEC", str(6 * 3600)))
+LOKI_SHARD_PARALLELISM = int(os.environ.get("LOKI_SHARD_PARALLELISM", "4"))
+LOKI_LABEL_INDEX_REFRESH_SEC = float(os.environ.get("LOKI_LABEL_INDEX_REFRESH_SEC", "60"))
+LOKI_LABEL_INDEX_WINDOW_SEC = float(os.environ.get("LOKI_LABEL_INDEX_WINDOW_SEC", "3600"))
+PROM_INVENTORY_REFRESH_SEC = float(os.environ.get("PROM_INVENTORY_REFRESH_SEC", "60"))
+ALERT_POLL_SEC = float(os.environ.get("ALERT_POLL_SEC", "15"))
+ALERT_DELTA_HISTORY = int(os.environ.get("ALERT_DELTA_HISTORY", "240"))
+PROM_POOL_MAX_CONNECTIONS = int(os.environ.get("PROM_POOL_MAX_CONNECTIONS", "64"))
+PROM_POOL_MAX_KEEPALIVE = int(os.environ.get("PROM_POOL_MAX_KEEPALIVE", "32"))
+LOKI_POOL_MAX_CONNECTIONS = int(os.environ.get("LOKI_POOL_MAX_CONNECTIONS", "16"))
+LOKI_POOL_MAX_KEEPALIVE = int(os.environ.get("LOKI_POOL_MAX_KEEPALIVE", "8"))
+HTTP_KEEPALIVE_EXPIRY_SEC = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY_SEC", "30"))
+HTTP_SINGLE_FLIGHT = os.environ.get("HTTP_SINGLE_FLIGHT", "1").strip().lower() in ("1", "true", "yes", "on")
+JSON_CODEC = os.environ.get("JSON_CODEC", "auto").strip().lower() or "auto"
+MCP_METRICS_PORT = int(os.environ.get("MCP_METRICS_PORT", "0"))
+MCP_METRICS_HOST = os.environ.get("MCP_METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
 
 
 def normalize_env(value: str) -> str:
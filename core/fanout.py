@@ -0,0 +1,48 @@
+"""Concurrent execution of one tool call against several Prometheus environments."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from core.config import PROM_ENV_TIMEOUT_SEC
+
+
+async def fan_out_environments(
+    targets: Sequence[Tuple[str, str]],
+    run: Callable[[str, str], Awaitable[Dict[str, Any]]],
+    *,
+    timeout: float = PROM_ENV_TIMEOUT_SEC,
+) -> Dict[str, Any]:
+    """
+    Run `run(env_key, prom_url)` for every target concurrently.
+
+    Each environment is bounded by `timeout`, and a failure or timeout becomes an
+    `error` entry for that environment only, so the merged response is ready as
+    soon as the slowest healthy backend answers.
+    """
+
+    async def _one(env_key: str, prom_url: str) -> Dict[str, Any]:
+        t0 = time.time()
+        try:
+            result = await asyncio.wait_for(run(env_key, prom_url), timeout=timeout)
+            return {"environment": env_key, "prom_url": prom_url, **result}
+        except asyncio.TimeoutError:
+            error = f"Timed out after {timeout:g}s"
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+        return {
+            "environment": env_key,
+            "prom_url": prom_url,
+            "error": error,
+            "elapsed_ms": int((time.time() - t0) * 1000),
+        }
+
+    t0 = time.time()
+    results: List[Dict[str, Any]] = list(await asyncio.gather(*(_one(key, url) for key, url in targets)))
+    return {
+        "environments": [key for key, _ in targets],
+        "failed_environments": [item["environment"] for item in results if "error" in item],
+        "elapsed_ms": int((time.time() - t0) * 1000),
+        "results": results,
+    }
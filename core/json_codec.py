@@ -0,0 +1,95 @@
+"""JSON encoding/decoding through the fastest installed backend."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Union
+
+from core.config import JSON_CODEC
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional speedup
+    msgspec = None
+
+JsonInput = Union[bytes, bytearray, memoryview, str]
+
+
+@dataclass(frozen=True)
+class JsonCodec:
+    name: str
+    loads: Callable[[JsonInput], Any]
+    dumps: Callable[[Any], str]
+
+
+def _stdlib_codec() -> JsonCodec:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+    return JsonCodec("json", json.loads, encoder.encode)
+
+
+def _orjson_codec() -> JsonCodec:
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    return JsonCodec("orjson", orjson.loads, dumps)
+
+
+def _msgspec_codec() -> JsonCodec:
+    encoder = msgspec.json.Encoder(enc_hook=str)
+    decoder = msgspec.json.Decoder()
+
+    def loads(data: JsonInput) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as exc:
+            raise ValueError(str(exc)) from exc
+
+    def dumps(obj: Any) -> str:
+        return encoder.encode(obj).decode("utf-8")
+
+    return JsonCodec("msgspec", loads, dumps)
+
+
+def available_codecs() -> Dict[str, JsonCodec]:
+    codecs = {"json": _stdlib_codec()}
+    if orjson is not None:
+        codecs["orjson"] = _orjson_codec()
+    if msgspec is not None:
+        codecs["msgspec"] = _msgspec_codec()
+    return codecs
+
+
+def get_codec(name: str = "auto") -> JsonCodec:
+    """
+    Return the codec named `name`, or with `auto` the first installed of
+    orjson, msgspec and the stdlib `json` module.
+    """
+    codecs = available_codecs()
+    if name == "auto":
+        for candidate in ("orjson", "msgspec", "json"):
+            if candidate in codecs:
+                return codecs[candidate]
+    if name not in codecs:
+        raise ValueError(f"JSON codec '{name}' is not installed (available: {', '.join(codecs)})")
+    return codecs[name]
+
+
+codec = get_codec(JSON_CODEC)
+
+
+def loads(data: JsonInput) -> Any:
+    """
+    Decode a JSON document; bytes are decoded directly without a str copy.
+    Invalid input raises `ValueError` whichever backend is in use.
+    """
+    return codec.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Encode to compact JSON; non-JSON values fall back to `str()`."""
+    return codec.dumps(obj)
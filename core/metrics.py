@@ -0,0 +1,237 @@
+"""In-process self-metrics: counters, gauges and latency histograms."""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from core.config import MCP_METRICS_HOST
+
+# Seconds; covers sub-millisecond summarization up to slow range queries.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * ((rank - seen) / n)
+            seen += n
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_sec": self.sum,
+            "avg_ms": (self.sum / self.count) * 1000 if self.count else None,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p90_ms": _ms(self.quantile(0.9)),
+            "p99_ms": _ms(self.quantile(0.99)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else seconds * 1000
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of labelled counters, gauges and histograms.
+
+    Metrics are created on first use; `snapshot()` returns a JSON-friendly view
+    and `render_prometheus()` the text exposition format.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def gauge_add(self, name: str, delta: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + delta
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    @contextmanager
+    def in_flight(self, name: str, **labels: Any) -> Iterator[None]:
+        self.gauge_add(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.gauge_add(name, -1, **labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {name: _series(values) for name, values in sorted(self._counters.items())}
+            gauges = {name: _series(values) for name, values in sorted(self._gauges.items())}
+            histograms = {
+                name: [{"labels": dict(key), **hist.snapshot()} for key, hist in sorted(values.items())]
+                for name, values in sorted(self._histograms.items())
+            }
+        return {
+            "uptime_sec": round(time.time() - self.started_at, 3),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, values in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_fmt_labels(key)} {_fmt_value(v)}" for key, v in sorted(values.items()))
+            for name, values in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{_fmt_labels(key)} {_fmt_value(v)}" for key, v in sorted(values.items()))
+            for name, values in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(values.items()):
+                    cumulative = 0
+                    for upper, n in zip(hist.buckets + (math.inf,), hist.counts):
+                        cumulative += n
+                        le = "+Inf" if math.isinf(upper) else _fmt_value(upper)
+                        lines.append(f"{name}_bucket{_fmt_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(hist.sum)}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _series(values: Dict[LabelKey, float]) -> List[Dict[str, Any]]:
+    return [{"labels": dict(key), "value": value} for key, value in sorted(values.items())]
+
+
+def _fmt_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in key) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+T = TypeVar("T")
+
+
+class Stopwatch:
+    """
+    Sum the time of many short sections without taking the registry lock, then
+    observe the total once with `record()` (e.g. per check instead of per series).
+    """
+
+    def __init__(self, name: str, **labels: Any) -> None:
+        self.name = name
+        self.labels = labels
+        self.seconds = 0.0
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - t0
+
+    def record(self, registry: Optional["MetricsRegistry"] = None) -> None:
+        (registry or metrics).observe(self.name, self.seconds, **self.labels)
+
+
+metrics = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler API
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+
+def start_metrics_server(port: int, host: str = MCP_METRICS_HOST) -> ThreadingHTTPServer:
+    """
+    Serve `GET /metrics` in the Prometheus text format from a daemon thread.
+
+    Binds loopback unless `MCP_METRICS_HOST` says otherwise.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple, Union
 
 from domain.checks import Check
 from core.config import (
@@ -9,11 +9,15 @@ from core.config import (
     DEFAULT_PROM_URL,
     LOKI_ENV_URLS,
     MAX_SAMPLES_PER_SERIES,
+    PROM_SCRAPE_INTERVAL_SEC,
+    PROM_STEP_POINT_BUDGET,
     normalize_env,
     normalize_loki_environment,
 )
 from core.server import ENV_URLS
-from core.time_utils import step_to_seconds
+from core.time_utils import AUTO_STEP, auto_step, parse_step, step_to_seconds
+
+ALL_ENVIRONMENTS = "all"
 
 
 def resolve_prom_url(environment: Optional[str], env_hint: Optional[str]) -> Tuple[str, str]:
@@ -34,6 +38,40 @@ def resolve_prom_url(environment: Optional[str], env_hint: Optional[str]) -> Tup
     raise ValueError("No environment selected and PROM_URL is not set")
 
 
+def is_multi_environment(environment: Optional[Union[str, Sequence[str]]]) -> bool:
+    if isinstance(environment, (list, tuple)):
+        return True
+    if isinstance(environment, str):
+        value = environment.strip().lower()
+        return value == ALL_ENVIRONMENTS or "," in value
+    return False
+
+
+def resolve_prom_urls(environment: Union[str, Sequence[str]]) -> List[Tuple[str, str]]:
+    """
+    Resolve `"all"`, a comma-separated string or a list of environments into
+    `(env_key, prom_url)` pairs, in request order and without duplicates.
+    """
+    if isinstance(environment, str) and environment.strip().lower() == ALL_ENVIRONMENTS:
+        if not ENV_URLS:
+            raise ValueError("environment='all' requires PROM_ENV_URLS to be set")
+        return sorted(ENV_URLS.items())
+
+    names = environment.split(",") if isinstance(environment, str) else list(environment)
+    targets: List[Tuple[str, str]] = []
+    seen = set()
+    for name in names:
+        if not str(name).strip():
+            continue
+        key, url = resolve_prom_url(str(name), None)
+        if key not in seen:
+            seen.add(key)
+            targets.append((key, url))
+    if not targets:
+        raise ValueError("No environment selected")
+    return targets
+
+
 def resolve_loki_url(environment: Optional[str]) -> Tuple[str, str]:
     if environment:
         key = normalize_loki_environment(environment)
@@ -55,19 +93,72 @@ def should_apply_alerts(c: Optional[Check]) -> bool:
     return c.id.endswith("_pct")
 
 
+def resolve_step(
+    step: Optional[str],
+    *,
+    start: datetime,
+    end: datetime,
+    max_step_seconds: Optional[float] = None,
+    include_samples: bool = False,
+    max_points: Optional[int] = None,
+) -> str:
+    """
+    `"auto"` picks a step from the window so each series has at most
+    `PROM_STEP_POINT_BUDGET` points, never finer than the scrape interval.
+    Any other value is validated as an explicit step.
+
+    Each point is the expression evaluated at that instant (e.g. a `[5m]`
+    rate or a gauge reading), not an aggregate of the step, so a coarse auto
+    step on a long window skips whatever happens between points. Callers
+    that need every interval covered (sustain checks) pass
+    `max_step_seconds`, which caps the auto step at the cost of more points.
+
+    With `include_samples`, the fetched series stay within
+    `PROM_MAX_SAMPLES_PER_SERIES` points: the auto step is coarsened (past
+    the cap if needed) to fit, and so is an explicit step when `max_points`
+    asks for downsampled samples, so one call returns them instead of an
+    error. Without `max_points`, a too-fine explicit step is left for
+    `validate_sample_volume` to reject.
+    """
+    window = (end - start).total_seconds()
+    limit = MAX_SAMPLES_PER_SERIES if include_samples else None
+    if (step or "").strip().lower() == AUTO_STEP:
+        return auto_step(
+            window,
+            max_points=PROM_STEP_POINT_BUDGET,
+            min_step_seconds=PROM_SCRAPE_INTERVAL_SEC,
+            max_step_seconds=max_step_seconds,
+            point_limit=limit,
+        )
+    parsed = parse_step(step)
+    if limit is not None and max_points is not None and _points(window, parsed) > limit:
+        return auto_step(window, max_points=limit, min_step_seconds=step_to_seconds(parsed), point_limit=limit)
+    return parsed
+
+
+def _points(window_seconds: float, step: str) -> int:
+    return int(max(0.0, window_seconds) // step_to_seconds(step)) + 1
+
+
 def validate_sample_volume(
     *,
     include_samples: bool,
     start: datetime,
     end: datetime,
     step: str,
+    max_points: Optional[int] = None,
 ) -> None:
+    """
+    Reject `include_samples` requests that would fetch too many points per
+    series. `max_points` only shrinks what is returned; the fetch is bounded
+    either way (`resolve_step` coarsens the step to fit when it is set).
+    """
     if not include_samples:
         return
-    points = int(max(0.0, (end - start).total_seconds()) // step_to_seconds(step)) + 1
+    points = _points((end - start).total_seconds(), step)
     if points > MAX_SAMPLES_PER_SERIES:
         raise ValueError(
             f"Too many samples per series ({points}). "
-            f"Reduce range/increase step or disable include_samples "
+            f"Set max_points to downsample, reduce range/increase step or disable include_samples "
             f"(limit={MAX_SAMPLES_PER_SERIES})."
         )
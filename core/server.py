@@ -2,10 +2,17 @@ from __future__ import annotations
 
 import logging
 import sys
+import time
+from typing import Any, Dict
 
 from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+from mcp.server.fastmcp.tools import Tool
+from mcp.types import TextContent
 
+from core import json_codec
 from core.config import load_env_urls
+from core.metrics import metrics
 
 logger = logging.getLogger("prom-mcp")
 logger.setLevel(logging.INFO)
@@ -14,5 +21,59 @@ _handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
 if not logger.handlers:
     logger.addHandler(_handler)
 
-mcp = FastMCP("prometheus-loki-monitoring-mcp")
+
+def _returns_plain_dict(tool: Tool) -> bool:
+    meta = tool.fn_metadata
+    if not meta.wrap_output or meta.output_model is None:
+        return False
+    field = meta.output_model.model_fields.get("result")
+    return field is not None and field.annotation == Dict[str, Any]
+
+
+def _convert_result(tool: Tool, result: Any) -> Any:
+    """
+    Serialize a tool result into (unstructured, structured) content.
+
+    Tools here return `Dict[str, Any]`, for which FastMCP's generic path
+    validates the whole tree against a model that accepts anything, dumps it
+    again and pretty-prints it. For those, encode once with the fast codec
+    instead; any other return type keeps FastMCP's conversion.
+    """
+    if isinstance(result, dict) and _returns_plain_dict(tool):
+        return [TextContent(type="text", text=json_codec.dumps(result))], {"result": result}
+    return tool.fn_metadata.convert_result(result)
+
+
+class InstrumentedFastMCP(FastMCP):
+    """
+    FastMCP that records per-tool call counts, in-flight calls and the time
+    spent executing the tool versus serializing its result.
+    """
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        tool = self._tool_manager.get_tool(name)
+        if tool is None:
+            return await super().call_tool(name, arguments)
+
+        context = self.get_context()
+        outcome = "error"
+        with metrics.in_flight("mcp_tool_in_flight", tool=name):
+            t0 = time.perf_counter()
+            try:
+                result = await tool.run(arguments, context=context)
+                t1 = time.perf_counter()
+                metrics.observe("mcp_tool_stage_seconds", t1 - t0, tool=name, stage="execute")
+                try:
+                    converted = _convert_result(tool, result)
+                except Exception as exc:
+                    raise ToolError(f"Error executing tool {name}: {exc}") from exc
+                metrics.observe("mcp_tool_stage_seconds", time.perf_counter() - t1, tool=name, stage="serialize")
+                outcome = "ok"
+                return converted
+            finally:
+                metrics.observe("mcp_tool_stage_seconds", time.perf_counter() - t0, tool=name, stage="total")
+                metrics.inc("mcp_tool_calls_total", tool=name, outcome=outcome)
+
+
+mcp = InstrumentedFastMCP("prometheus-loki-monitoring-mcp")
 ENV_URLS = load_env_urls(logger)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import math
 import re
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 
 _STEP_RE = re.compile(r"^\d+[smhd]$")
+AUTO_STEP = "auto"
+# Steps `auto` snaps to; evaluation timestamps then line up with dashboards and
+# with the step-aligned range cache across windows of similar length.
+FRIENDLY_STEPS = ("15s", "30s", "1m", "2m", "5m", "10m", "15m", "30m", "1h", "2h", "3h", "6h", "12h", "1d")
 _ISO_FRACTION_RE = re.compile(r"(?P<prefix>\.\d{6})\d+")
 JAKARTA_TZ = timezone(timedelta(hours=7))
 
@@ -13,10 +18,20 @@ def iso(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
 
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
 def to_unix(dt: datetime) -> float:
     return dt.timestamp()
 
 
+def to_unix_ns(dt: datetime) -> int:
+    """Exact integer nanoseconds (no float rounding), as used by Loki."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1) * 1000
+
+
 def parse_step(step: str) -> str:
     s = (step or "").strip().lower()
     if not s:
@@ -39,6 +54,36 @@ def step_to_seconds(step: str) -> int:
     return val * 86400
 
 
+def auto_step(
+    window_seconds: float,
+    *,
+    max_points: int,
+    min_step_seconds: int,
+    max_step_seconds: Optional[float] = None,
+    point_limit: Optional[int] = None,
+) -> str:
+    """
+    Smallest friendly step that keeps `window / step` within `max_points` and
+    is not finer than `min_step_seconds`; beyond `1d`, whole days.
+
+    `max_step_seconds` caps the step (at the largest friendly step within it)
+    even when that exceeds `max_points`. `point_limit` is a hard ceiling on
+    `window / step` that, like `min_step_seconds`, wins over the cap.
+    """
+    # `point_limit` counts both ends of the window, hence `point_limit - 1` steps.
+    lowest = max(min_step_seconds, window_seconds / max(1, point_limit - 1) if point_limit else 0, 1)
+    needed = max(window_seconds / max(1, max_points), lowest)
+    if max_step_seconds is not None and needed > max_step_seconds:
+        fitting = [s for s in FRIENDLY_STEPS if lowest <= step_to_seconds(s) <= max_step_seconds]
+        if fitting:
+            return fitting[-1]
+        needed = lowest
+    for step in FRIENDLY_STEPS:
+        if step_to_seconds(step) >= needed:
+            return step
+    return f"{math.ceil(needed / 86400)}d"
+
+
 def parse_iso_utc(value: str) -> datetime:
     s = value.strip()
     # Python's datetime supports up to microseconds (6 digits). Some Prometheus
@@ -3,6 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict
 
+# range: `query_range` over the window at `step`.
+# instant: one `query` at the window end; the PromQL either reads the current
+# value or aggregates the window itself via `[{range}:]`.
+CHECK_KINDS = ("range", "instant")
+
 
 @dataclass(frozen=True)
 class Check:
@@ -12,6 +17,10 @@ class Check:
     promql: str
     kind: str = "range"
 
+    def __post_init__(self) -> None:
+        if self.kind not in CHECK_KINDS:
+            raise ValueError(f"Unknown check kind for {self.id}: {self.kind}")
+
 
 CHECKS: Dict[str, Check] = {
     "cpu_avg_pct": Check(
@@ -25,6 +34,7 @@ CHECKS: Dict[str, Check] = {
         name="CPU Max Over Selected Range (%)",
         description="Maximum 5-minute CPU usage found within the selected time range. Use raw CPU series to identify the exact occurrence time.",
         promql='max_over_time((100 - (avg by (instance,server_name) (rate(node_cpu_seconds_total{mode="idle"}[5m])) * 100))[{range}:])',
+        kind="instant",
     ),
     "mem_used_pct": Check(
         id="mem_used_pct",
@@ -59,8 +69,9 @@ CHECKS: Dict[str, Check] = {
     "fs_readonly": Check(
         id="fs_readonly",
         name="Filesystem Readonly",
-        description="Readonly filesystem indicator (1=readonly).",
+        description="Readonly filesystem indicator at the end of the range (1=readonly).",
         promql='max by (instance,server_name,device,mountpoint,fstype) (node_filesystem_readonly{fstype!~"tmpfs|overlay"})',
+        kind="instant",
     ),
     "load15_avg": Check(
         id="load15_avg",
@@ -71,8 +82,9 @@ CHECKS: Dict[str, Check] = {
     "up": Check(
         id="up",
         name="Up",
-        description="Target liveness (1=up, 0=down).",
+        description="Target liveness at the end of the range (1=up, 0=down).",
         promql="up",
+        kind="instant",
     ),
     "cpu_iowait_pct": Check(
         id="cpu_iowait_pct",
@@ -155,8 +167,9 @@ CHECKS: Dict[str, Check] = {
     "pg_up": Check(
         id="pg_up",
         name="PostgreSQL Up",
-        description="PostgreSQL exporter up state (1=up, 0=down).",
+        description="PostgreSQL exporter up state at the end of the range (1=up, 0=down).",
         promql='up{job=~"PROD DB PostgreSQL|TEST DB PostgreSQL|DEV DB PostgreSQL"}',
+        kind="instant",
     ),
     "pg_qps": Check(
         id="pg_qps",
@@ -0,0 +1,280 @@
+"""Polled `/api/v1/alerts` snapshots with label indexes and change history."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import secrets
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from core.config import ALERT_DELTA_HISTORY, ALERT_POLL_SEC
+from core.time_utils import iso, iso_jakarta, parse_iso_utc
+from infra.async_prom_client import prom_alerts
+from infra.background_snapshots import BackgroundSnapshots
+
+# Filterable fields; all are alert labels except `state`.
+INDEXED_FIELDS: Tuple[str, ...] = ("severity", "state", "alertname", "job", "server_name", "instance")
+SUMMARY_FIELDS: Tuple[str, ...] = ("severity", "state", "alertname", "job", "server_name")
+
+# Snapshot versions only count within this process; `since` tokens issued
+# before a restart are detected by this id and answered with a reset.
+_BOOT_ID = secrets.token_hex(4)
+
+
+def alert_fingerprint(labels: Mapping[str, Any]) -> str:
+    raw = json.dumps(sorted((str(k), str(v)) for k, v in labels.items()), ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def format_alert(a: Mapping[str, Any]) -> Dict[str, Any]:
+    labels = a.get("labels", {}) or {}
+    active_at_raw = a.get("activeAt")
+    active_at_utc = None
+    active_at_jakarta = None
+    if isinstance(active_at_raw, str) and active_at_raw.strip():
+        try:
+            active_at_utc_dt = parse_iso_utc(active_at_raw)
+            active_at_utc = iso(active_at_utc_dt)
+            active_at_jakarta = iso_jakarta(active_at_utc_dt)
+        except Exception:
+            active_at_utc = None
+            active_at_jakarta = None
+    return {
+        "labels": labels,
+        "annotations": a.get("annotations", {}) or {},
+        "state": a.get("state"),
+        "activeAt_raw": active_at_raw,
+        "activeAt_utc": active_at_utc,
+        "activeAt_jakarta": active_at_jakarta,
+        "value": a.get("value"),
+    }
+
+
+def _value(alert: Mapping[str, Any], name: str) -> Any:
+    return alert.get("state") if name == "state" else alert["labels"].get(name)
+
+
+def matches(alert: Mapping[str, Any], filters: Mapping[str, Optional[str]]) -> bool:
+    """Exact-match filters; unset filters match everything."""
+    return all(not wanted or _value(alert, name) == wanted for name, wanted in filters.items())
+
+
+@dataclass(frozen=True)
+class AlertChange:
+    version: int
+    fired: Tuple[Dict[str, Any], ...]
+    resolved: Tuple[Dict[str, Any], ...]
+
+
+@dataclass(frozen=True)
+class AlertSnapshot:
+    """
+    One poll of `/api/v1/alerts`, with an inverted index per filterable field.
+
+    `index[field][value]` holds the positions of matching alerts, so a filtered
+    lookup intersects a few small sets instead of scanning every alert.
+    `changes` keeps the last `ALERT_DELTA_HISTORY` poll-to-poll differences.
+    """
+
+    built_at: float
+    version: int
+    alerts: List[Dict[str, Any]]
+    fingerprints: List[str]
+    index: Dict[str, Dict[str, FrozenSet[int]]]
+    changes: Tuple[AlertChange, ...]
+
+    def age_sec(self, now: Optional[float] = None) -> float:
+        return max(0.0, (time.time() if now is None else now) - self.built_at)
+
+    def select(self, filters: Mapping[str, Optional[str]]) -> List[Dict[str, Any]]:
+        postings = []
+        for name, wanted in filters.items():
+            if not wanted:
+                continue
+            posting = self.index.get(name, {}).get(wanted)
+            if not posting:
+                return []
+            postings.append(posting)
+        if not postings:
+            return self.alerts
+        postings.sort(key=len)
+        hits = set(postings[0]).intersection(*postings[1:])
+        return [self.alerts[i] for i in sorted(hits)]
+
+    def counts(self, filters: Mapping[str, Optional[str]], selected: List[Dict[str, Any]]) -> Dict[str, Counter]:
+        counters: Dict[str, Counter] = {name: Counter() for name in SUMMARY_FIELDS}
+        if not any(filters.values()):
+            # Unfiltered: the posting list sizes are the counts.
+            for name, counter in counters.items():
+                counter.update({value: len(p) for value, p in self.index[name].items()})
+                missing = len(self.alerts) - sum(counter.values())
+                if missing:
+                    counter["unknown"] += missing
+            return counters
+        for alert in selected:
+            for name, counter in counters.items():
+                counter[str(_value(alert, name) or "unknown")] += 1
+        return counters
+
+    def changes_since(self, version: int) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """
+        Net `(fired, resolved)` alerts after snapshot `version`, or None when the
+        history no longer reaches back that far.
+        """
+        if version > self.version:
+            return None
+        pending = [change for change in self.changes if change.version > version]
+        if len(pending) != self.version - version:
+            return None
+        fired: Dict[str, Dict[str, Any]] = {}
+        resolved: Dict[str, Dict[str, Any]] = {}
+        for change in pending:
+            for alert in change.fired:
+                fp = alert_fingerprint(alert["labels"])
+                fired[fp] = alert
+                resolved.pop(fp, None)
+            for alert in change.resolved:
+                fp = alert_fingerprint(alert["labels"])
+                fired.pop(fp, None)
+                resolved[fp] = alert
+        return list(fired.values()), list(resolved.values())
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "age_sec": round(self.age_sec(), 3),
+            "alerts": len(self.alerts),
+        }
+
+
+def build_alert_snapshot(
+    raw_alerts: Iterable[Mapping[str, Any]],
+    *,
+    built_at: float,
+    previous: Optional[AlertSnapshot],
+    history: int = ALERT_DELTA_HISTORY,
+) -> AlertSnapshot:
+    alerts = [format_alert(a) for a in raw_alerts]
+    fingerprints = [alert_fingerprint(a["labels"]) for a in alerts]
+    index: Dict[str, Dict[str, set]] = {name: {} for name in INDEXED_FIELDS}
+    for pos, alert in enumerate(alerts):
+        for name in INDEXED_FIELDS:
+            value = _value(alert, name)
+            if value:
+                index[name].setdefault(str(value), set()).add(pos)
+
+    version = 1 if previous is None else previous.version + 1
+    changes: Tuple[AlertChange, ...] = ()
+    if previous is not None:
+        before = {fp: alert for fp, alert in zip(previous.fingerprints, previous.alerts)}
+        now_by_fp = dict(zip(fingerprints, alerts))
+        fired = tuple(
+            alert
+            for fp, alert in now_by_fp.items()
+            if alert["state"] == "firing" and (fp not in before or before[fp]["state"] != "firing")
+        )
+        # Only a firing alert can resolve; a pending one that disappears never fired.
+        resolved = tuple(
+            alert for fp, alert in before.items() if fp not in now_by_fp and alert["state"] == "firing"
+        )
+        kept = previous.changes[-(history - 1):] if history > 1 else ()
+        changes = kept + (AlertChange(version, fired, resolved),) if history > 0 else ()
+
+    return AlertSnapshot(
+        built_at=built_at,
+        version=version,
+        alerts=alerts,
+        fingerprints=fingerprints,
+        index={name: {value: frozenset(p) for value, p in values.items()} for name, values in index.items()},
+        changes=changes,
+    )
+
+
+def encode_since(versions: Mapping[str, int]) -> str:
+    raw = json.dumps({"b": _BOOT_ID, "v": dict(versions)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_since(token: str) -> Optional[Dict[str, int]]:
+    """Versions per environment, or None when the token predates a restart."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        boot, versions = payload["b"], {str(k): int(v) for k, v in payload["v"].items()}
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError("Invalid since token") from exc
+    return versions if boot == _BOOT_ID else None
+
+
+class AlertPoller:
+    """
+    Per-environment alert snapshots, never served older than `poll_sec`.
+
+    A lookup within `poll_sec` of the last poll answers from memory; a later
+    one polls inline (concurrent lookups share one poll), so an idle server
+    never reports alerts from long ago as current.
+    After the first lookup of an environment, a background task also polls it
+    every `poll_sec`, so `since` deltas include alerts that fired and resolved
+    between two lookups (down to `poll_sec` granularity). The task stops once
+    the environment has not been looked up for `ALERT_DELTA_HISTORY` polls,
+    after which any `since` token would be answered with a reset anyway.
+    `poll_sec <= 0` polls on every lookup and runs no background task.
+    """
+
+    def __init__(self, *, poll_sec: float, idle_polls: int = ALERT_DELTA_HISTORY) -> None:
+        self.poll_sec = poll_sec
+        self.idle_sec = poll_sec * max(1, idle_polls)
+        self._snapshots: BackgroundSnapshots[AlertSnapshot] = BackgroundSnapshots(
+            "alerts", self._refresh, refresh_sec=poll_sec, max_age_sec=poll_sec
+        )
+        self._pollers: Dict[str, "asyncio.Task[None]"] = {}
+        self._last_lookup: Dict[str, float] = {}
+
+    async def snapshot(self, env_key: str, prom_url: str) -> AlertSnapshot:
+        self._last_lookup[env_key] = time.monotonic()
+        snapshot = await self._snapshots.get(env_key, prom_url)
+        self._ensure_polling(env_key, prom_url)
+        return snapshot
+
+    def _ensure_polling(self, env_key: str, prom_url: str) -> None:
+        if self.poll_sec <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        task = self._pollers.get(env_key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._pollers[env_key] = loop.create_task(self._poll(env_key, prom_url))
+
+    async def _poll(self, env_key: str, prom_url: str) -> None:
+        while time.monotonic() - self._last_lookup.get(env_key, 0.0) < self.idle_sec:
+            await asyncio.sleep(self.poll_sec)
+            try:
+                await asyncio.shield(self._snapshots.refresh(env_key, prom_url))
+            except Exception:
+                pass  # logged by BackgroundSnapshots; the next poll retries
+
+    async def _refresh(self, env_key: str, prom_url: str, previous: Optional[AlertSnapshot]) -> AlertSnapshot:
+        now = time.time()
+        raw = await prom_alerts(prom_url)
+        alerts = raw.get("data", {}).get("alerts", []) or []
+        return build_alert_snapshot(alerts, built_at=now, previous=previous)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "poll_sec": self.poll_sec,
+            "polling": sorted(env for env, task in self._pollers.items() if not task.done()),
+            "environments": {env: snap.describe() for env, snap in self._snapshots.items()},
+        }
+
+    def clear(self) -> None:
+        for task in self._pollers.values():
+            task.cancel()
+        self._pollers.clear()
+        self._last_lookup.clear()
+        self._snapshots.clear()
+
+
+alert_poller = AlertPoller(poll_sec=ALERT_POLL_SEC)
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from core import json_codec
+from core.config import HTTP_SINGLE_FLIGHT
+from core.metrics import metrics
+from infra.http_pool import pool_manager
+from infra.single_flight import Lead, SingleFlight, request_key
+
+RETRY_TOTAL = 3
+RETRY_BACKOFF_SEC = 0.3
+RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+
+backend_flights = SingleFlight(enabled=HTTP_SINGLE_FLIGHT)
+
+
+def get_async_client(url: str, backend: str) -> httpx.AsyncClient:
+    return pool_manager.client_for(url, backend)
+
+
+def backend_label(url: str) -> str:
+    return "loki" if "/loki/api/" in url else "prometheus"
+
+
+class RequestTrace:
+    """
+    httpx `trace` extension callback that timestamps connection and HTTP events.
+
+    Event names are normalized by dropping the protocol prefix
+    (`http11.` / `http2.`), so stages are comparable across protocols.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.first_event_at: Optional[float] = None
+        self.events: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        prefix, _, rest = event_name.partition(".")
+        name = event_name if prefix == "connection" else rest
+        now = time.perf_counter()
+        if self.first_event_at is None:
+            self.first_event_at = now
+        self.events[name] = now
+
+    def span(self, start: str, end: str) -> Optional[float]:
+        t0, t1 = self.events.get(start), self.events.get(end)
+        if t0 is None or t1 is None:
+            return None
+        return max(0.0, t1 - t0)
+
+    @property
+    def opened_connection(self) -> bool:
+        return "connection.connect_tcp.started" in self.events
+
+    @property
+    def pool_wait(self) -> Optional[float]:
+        """Time until the transport started using a connection (new or pooled)."""
+        if self.first_event_at is None:
+            return None
+        return max(0.0, self.first_event_at - self.started_at)
+
+    def record(self, url: str, backend: str) -> None:
+        pool_wait = self.pool_wait
+        if pool_wait is not None:
+            pool_manager.record_connection(url, backend, opened=self.opened_connection, pool_wait_sec=pool_wait)
+            metrics.inc("mcp_backend_connections_total", backend=backend, reused=str(not self.opened_connection).lower())
+        stages = {
+            "pool_wait": pool_wait,
+            "connect": _sum_spans(
+                self.span("connection.connect_tcp.started", "connection.connect_tcp.complete"),
+                self.span("connection.start_tls.started", "connection.start_tls.complete"),
+            ),
+            # Request sent until response headers arrive: Prometheus/Loki server time.
+            "server": self.span("send_request_headers.started", "receive_response_headers.complete"),
+            "download": self.span("receive_response_body.started", "receive_response_body.complete"),
+        }
+        for stage, seconds in stages.items():
+            if seconds is not None:
+                metrics.observe("mcp_backend_stage_seconds", seconds, backend=backend, stage=stage)
+
+
+def _sum_spans(*spans: Optional[float]) -> Optional[float]:
+    present = [span for span in spans if span is not None]
+    return sum(present) if present else None
+
+
+async def _send_traced(
+    client: httpx.AsyncClient,
+    request: httpx.Request,
+    *,
+    backend: str,
+    stream: bool,
+) -> httpx.Response:
+    url = str(request.url)
+    trace = RequestTrace()
+    request.extensions["trace"] = trace
+    t0 = time.perf_counter()
+    try:
+        with pool_manager.track(url, backend):
+            response = await client.send(request, stream=stream)
+    except Exception:
+        metrics.inc("mcp_backend_requests_total", backend=backend, status="error")
+        raise
+    trace.record(url, backend)
+    metrics.observe("mcp_backend_stage_seconds", time.perf_counter() - t0, backend=backend, stage="request")
+    metrics.inc("mcp_backend_requests_total", backend=backend, status=str(response.status_code))
+    return response
+
+
+async def get_json(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float,
+) -> Dict[str, Any]:
+    data, _ = await fetch_json(url, params=params, headers=headers, timeout=timeout)
+    return data
+
+
+async def fetch_json(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float,
+) -> Tuple[Dict[str, Any], int]:
+    """
+    GET `url` and decode the JSON body; returns `(data, body_size_bytes)`.
+
+    Mirrors the retry policy of the blocking `requests` sessions: up to
+    `RETRY_TOTAL` retries with exponential backoff on 429/5xx responses.
+    Connection errors are retried by the transport itself.
+
+    Concurrent calls with the same URL, params and headers share one request
+    (`HTTP_SINGLE_FLIGHT`); every caller gets the same decoded object, which
+    must not be mutated.
+    """
+    backend = backend_label(url)
+    return await backend_flights.do(
+        request_key(url, params, headers),
+        lambda: _fetch_json(url, params=params, headers=headers, timeout=timeout, backend=backend),
+        backend=backend,
+    )
+
+
+async def _fetch_json(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+    backend: str,
+) -> Tuple[Dict[str, Any], int]:
+    client = get_async_client(url, backend)
+    attempt = 0
+    with metrics.in_flight("mcp_backend_in_flight", backend=backend):
+        while True:
+            request = client.build_request("GET", url, params=params, headers=headers, timeout=timeout)
+            response = await _send_traced(client, request, backend=backend, stream=False)
+            if response.status_code in RETRY_STATUS and attempt < RETRY_TOTAL:
+                await asyncio.sleep(RETRY_BACKOFF_SEC * (2**attempt))
+                attempt += 1
+                continue
+            response.raise_for_status()
+            with metrics.timer("mcp_backend_stage_seconds", backend=backend, stage="decode"):
+                data = json_codec.loads(response.content)
+            return data, len(response.content)
+
+
+async def fetch_streamed(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float,
+    decode: Callable[[httpx.Response], Awaitable[Tuple[Dict[str, Any], int]]],
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Like `fetch_json`, but `decode` consumes the body as it arrives (see
+    `open_stream`) and returns `(data, body_size_bytes)`, so the raw body is
+    never held in full. Shares single-flight keys with `fetch_json`.
+    """
+    backend = backend_label(url)
+
+    async def _fetch() -> Tuple[Dict[str, Any], int]:
+        with metrics.in_flight("mcp_backend_in_flight", backend=backend):
+            response = await open_stream(url, params=params, headers=headers, timeout=timeout)
+            try:
+                return await decode(response)
+            finally:
+                await response.aclose()
+
+    return await backend_flights.do(request_key(url, params, headers), _fetch, backend=backend)
+
+
+def lead_request(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Optional[Lead]:
+    """
+    Take single-flight leadership of a GET the caller sends and consumes itself
+    (e.g. with `open_stream`), keyed like `fetch_json`.
+
+    Returns None when an identical request is already in flight; `fetch_json`
+    then joins it. Otherwise identical `fetch_json` calls wait for the leader
+    to `share()` a `(data, body_size_bytes)` tuple, or run on their own if it
+    declines.
+    """
+    return backend_flights.lead(request_key(url, params, headers))
+
+
+async def open_stream(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float,
+) -> httpx.Response:
+    """
+    GET `url` without reading the body; the caller must `aclose()` the response.
+
+    Retryable statuses are retried like `fetch_json` before any body bytes are consumed.
+    """
+    backend = backend_label(url)
+    client = get_async_client(url, backend)
+    attempt = 0
+    while True:
+        request = client.build_request("GET", url, params=params, headers=headers, timeout=timeout)
+        response = await _send_traced(client, request, backend=backend, stream=True)
+        if response.status_code in RETRY_STATUS and attempt < RETRY_TOTAL:
+            await response.aclose()
+            await asyncio.sleep(RETRY_BACKOFF_SEC * (2**attempt))
+            attempt += 1
+            continue
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            await response.aclose()
+            raise
+        return response
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Union
+
+from core.config import LOKI_TIMEOUT_SEC
+from core.time_utils import to_unix, to_unix_ns
+from infra.async_http import get_json
+from infra.loki_client import _loki_headers
+
+
+async def _loki_get_json(loki_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    if not loki_url:
+        raise ValueError("loki_url is empty")
+
+    url = f"{loki_url.rstrip('/')}{path}"
+    data = await get_json(url, params=params, headers=_loki_headers(), timeout=LOKI_TIMEOUT_SEC)
+    if data.get("status") != "success":
+        raise RuntimeError(f"Loki error: {data}")
+    return data
+
+
+def _loki_ns(value: Union[datetime, int]) -> int:
+    return value if isinstance(value, int) else to_unix_ns(value)
+
+
+async def loki_query_range(
+    loki_url: str,
+    query: str,
+    *,
+    start: Union[datetime, int],
+    end: Union[datetime, int],
+    step: Optional[str] = None,
+    limit: Optional[int] = None,
+    direction: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    `start`/`end` are datetimes or integer unix nanoseconds; both are sent as
+    nanoseconds so log pagination can address individual timestamps.
+    """
+    params: Dict[str, Any] = {
+        "query": query,
+        "start": _loki_ns(start),
+        "end": _loki_ns(end),
+    }
+    if step:
+        params["step"] = step
+    if limit is not None:
+        params["limit"] = limit
+    if direction:
+        params["direction"] = direction
+    return await _loki_get_json(loki_url, "/loki/api/v1/query_range", params=params)
+
+
+async def loki_label_values(
+    loki_url: str,
+    label: str,
+    *,
+    selectors: Optional[Sequence[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Sequence[str]:
+    params: Dict[str, Any] = {}
+    if selectors:
+        params["match[]"] = [selector for selector in selectors if selector]
+    if start is not None:
+        params["start"] = to_unix(start)
+    if end is not None:
+        params["end"] = to_unix(end)
+
+    data = await _loki_get_json(loki_url, f"/loki/api/v1/label/{label}/values", params=params or None)
+    return data.get("data", [])
+
+
+async def loki_series(
+    loki_url: str,
+    *,
+    selectors: Optional[Sequence[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Sequence[Dict[str, Any]]:
+    params: Dict[str, Any] = {}
+    if selectors:
+        params["match[]"] = [selector for selector in selectors if selector]
+    if start is not None:
+        params["start"] = to_unix(start)
+    if end is not None:
+        params["end"] = to_unix(end)
+
+    data = await _loki_get_json(loki_url, "/loki/api/v1/series", params=params or None)
+    return data.get("data", [])
@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+import httpx
+
+from core.config import (
+    HTTP_TIMEOUT_SEC,
+    PROM_CACHE_FRESHNESS_SEC,
+    PROM_CACHE_HISTORICAL_TTL_SEC,
+    PROM_CACHE_INSTANT_ALIGN_SEC,
+    PROM_CACHE_MAX_BYTES,
+    PROM_CACHE_MAX_ENTRIES,
+    PROM_CACHE_TTL_SEC,
+    PROM_RANGE_CHUNK_POINTS,
+    PROM_RANGE_CHUNK_SEC,
+    PROM_SHARD_MAX_POINTS,
+    PROM_SHARD_PARALLELISM,
+    PROM_SHARD_RETRIES,
+    PROM_STREAM_DECODE,
+)
+from core.metrics import metrics
+from core.time_utils import step_to_seconds, to_unix
+from infra.async_http import RETRY_STATUS, fetch_json, fetch_streamed, lead_request, open_stream
+from infra.json_stream import ResultStreamDecoder
+from infra.prom_client import _prom_headers
+from infra.range_chunks import Chunk, chunk_seconds_for_step, contiguous_runs, plan_chunks, split_matrix, stitch_matrices
+from infra.response_cache import ResponseCache
+
+SHARD_RETRY_BACKOFF_SEC = 0.5
+# One chunked query may use at most 1/CHUNK_CACHE_SHARE of the cache entries,
+# so a long window cannot evict the whole cache (including its own chunks).
+CHUNK_CACHE_SHARE = 4
+
+query_cache = ResponseCache(max_entries=PROM_CACHE_MAX_ENTRIES, max_bytes=PROM_CACHE_MAX_BYTES)
+
+T = TypeVar("T")
+
+
+async def _prom_fetch_json(
+    prom_url: str, path: str, params: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], int]:
+    if not prom_url:
+        raise ValueError("prom_url is empty")
+
+    url = f"{prom_url.rstrip('/')}{path}"
+    data, size = await fetch_json(url, params=params, headers=_prom_headers(), timeout=HTTP_TIMEOUT_SEC)
+    if data.get("status") != "success":
+        raise RuntimeError(f"Prometheus error: {data}")
+    return data, size
+
+
+async def _prom_get_json(prom_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    data, _ = await _prom_fetch_json(prom_url, path, params=params)
+    return data
+
+
+async def _prom_get_json_cached(
+    key: Hashable,
+    prom_url: str,
+    path: str,
+    params: Dict[str, Any],
+    *,
+    ttl: float,
+) -> Dict[str, Any]:
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+    data, size = await _prom_fetch_json(prom_url, path, params=params)
+    query_cache.put(key, data, size=size, ttl=ttl)
+    return data
+
+
+def _align(ts: float, step_seconds: int) -> int:
+    return int(math.floor(ts / step_seconds) * step_seconds)
+
+
+def _align_up(ts: float, step_seconds: int) -> int:
+    return int(math.ceil(ts / step_seconds) * step_seconds)
+
+
+def _ttl_for_window_end(end_ts: float) -> float:
+    # Windows that closed before the freshness horizon are immutable in practice;
+    # windows ending near "now" still receive samples and must expire quickly.
+    if time.time() - end_ts > PROM_CACHE_FRESHNESS_SEC:
+        return PROM_CACHE_HISTORICAL_TTL_SEC
+    return PROM_CACHE_TTL_SEC
+
+
+def _cache_key(prom_url: str, path: str, *parts: Any) -> Tuple[Any, ...]:
+    return (prom_url.rstrip("/"), path, *parts)
+
+
+async def prom_query_range(prom_url: str, query: str, start: datetime, end: datetime, step: str) -> Dict[str, Any]:
+    """
+    Run `/api/v1/query_range` with start aligned down and end aligned up to
+    the step grid.
+
+    Alignment makes repeated calls for the same window share cache entries.
+    Rounding `end` up keeps the newest partial step: the last evaluation is at
+    or after the requested end, so a "now" query still sees the latest sample.
+    With `PROM_RANGE_CHUNK_SEC` set, windows longer than one chunk
+    (`PROM_RANGE_CHUNK_POINTS` steps, at least `PROM_RANGE_CHUNK_SEC`) are
+    served from step-aligned chunks so only missing or still-open chunks are
+    fetched from Prometheus. Shorter windows, and windows that would need more
+    than `1/CHUNK_CACHE_SHARE` of the cache entries, are cached whole.
+    Windows longer than `PROM_SHARD_MAX_POINTS` steps are fetched as time
+    shards running concurrently; the PromQL text (including a rendered
+    `{range}`) is sent unchanged to every shard, so each evaluation timestamp
+    yields the same value as in a single request.
+
+    The returned dict may be a cache entry shared with other callers (and with
+    concurrent identical requests); treat it as read-only.
+    """
+    step_seconds = step_to_seconds(step)
+    start_ts = _align(to_unix(start), step_seconds)
+    end_ts = max(start_ts, _align_up(to_unix(end), step_seconds))
+
+    plan = _chunk_plan(start_ts, end_ts, step_seconds)
+    if plan is not None:
+        chunks, chunk_seconds = plan
+        return await _prom_query_range_chunked(
+            prom_url, query, start_ts, end_ts, step, step_seconds, chunks, chunk_seconds
+        )
+
+    key = _range_key(prom_url, query, start_ts, end_ts, step_seconds)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    shard_seconds = _shard_points() * step_seconds
+    shards = [
+        Chunk(start=max(chunk.start, start_ts), last=chunk.last)
+        for chunk in plan_chunks(start_ts, end_ts, step_seconds=step_seconds, chunk_seconds=shard_seconds)
+    ]
+    fetched = await _gather_limited(
+        [_fetch_range_shard(prom_url, query, step, shard.start, shard.last) for shard in shards]
+    )
+    if len(fetched) == 1:
+        data, size = fetched[0]
+    else:
+        parts = [shard_data.get("data", {}).get("result", []) for shard_data, _ in fetched]
+        data = {
+            "status": "success",
+            "data": {
+                "resultType": "matrix",
+                "result": stitch_matrices(parts, start_ts=start_ts, end_ts=end_ts),
+            },
+            "shards": {"total": len(shards)},
+        }
+        size = sum(shard_size for _, shard_size in fetched)
+    query_cache.put(key, data, size=size, ttl=_ttl_for_window_end(end_ts))
+    return data
+
+
+async def iter_range_series(
+    prom_url: str,
+    query: str,
+    start: datetime,
+    end: datetime,
+    step: str,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield `query_range` result series one at a time.
+
+    Windows that fit in one shard and are not served from cached chunks are
+    decoded incrementally: each series is yielded as soon as it has been
+    parsed, without first holding the raw body. With the cache disabled, peak
+    memory scales with one series. With the cache enabled, a cached matrix is
+    iterated directly; on a miss the streamed series are also collected into
+    the cache entry, and collection stops (the entry is skipped) once the body
+    exceeds `PROM_CACHE_MAX_BYTES`, so memory stays bounded by the cache limit.
+    The stream takes part in single-flight like `fetch_json`: identical
+    requests arriving while it is in flight receive its collected series
+    (or send their own request if collection stopped), and a stream is not
+    opened while an identical request is already in flight.
+    Chunked and sharded windows go through `prom_query_range`, which also
+    decodes each chunk or shard response while it streams (without holding
+    the raw body) but returns the whole matrix.
+    """
+    step_seconds = step_to_seconds(step)
+    start_ts = _align(to_unix(start), step_seconds)
+    end_ts = max(start_ts, _align_up(to_unix(end), step_seconds))
+    points = (end_ts - start_ts) // step_seconds + 1
+
+    if not PROM_STREAM_DECODE or points > _shard_points() or _chunk_plan(start_ts, end_ts, step_seconds) is not None:
+        data = await prom_query_range(prom_url, query, start=start, end=end, step=step)
+        for series in data.get("data", {}).get("result", []):
+            yield series
+        return
+
+    if not prom_url:
+        raise ValueError("prom_url is empty")
+    key = _range_key(prom_url, query, start_ts, end_ts, step_seconds)
+    if query_cache.enabled:
+        cached = query_cache.get(key)
+        if cached is not None:
+            for series in cached.get("data", {}).get("result", []):
+                yield series
+            return
+
+    params = {
+        "query": query,
+        "start": start_ts,
+        "end": end_ts,
+        "step": step,
+    }
+    url = f"{prom_url.rstrip('/')}/api/v1/query_range"
+    headers = _prom_headers()
+    lead = lead_request(url, params=params, headers=headers)
+    if lead is None:
+        # An identical request is already in flight: share its result.
+        data, _ = await _prom_fetch_json(prom_url, "/api/v1/query_range", params=params)
+        for series in data.get("data", {}).get("result", []):
+            yield series
+        return
+
+    collected: Optional[List[Dict[str, Any]]] = None
+    size = 0
+    complete = False
+    try:
+        with metrics.in_flight("mcp_backend_in_flight", backend="prometheus"):
+            response = await open_stream(url, params=params, headers=headers, timeout=HTTP_TIMEOUT_SEC)
+            # Collect for the cache, and for identical requests that arrived
+            # while this one was being sent (they would hold the whole result
+            # anyway, so their share is not bounded by the cache size).
+            sharing = lead.followers > 0
+            if query_cache.enabled or sharing:
+                collected = []
+            try:
+                async for items, chunk_size in _decoded_batches(response):
+                    size += chunk_size
+                    if collected is not None and not sharing and size > query_cache.max_bytes:
+                        collected = None
+                    if collected is not None:
+                        collected.extend(items)
+                    for series in items:
+                        yield series
+                complete = True
+            finally:
+                await response.aclose()
+    except Exception as exc:
+        lead.fail(exc)
+        raise
+    finally:
+        if complete and collected is not None:
+            data = {"status": "success", "data": {"resultType": "matrix", "result": collected}}
+            lead.share((data, size))
+            query_cache.put(key, data, size=size, ttl=_ttl_for_window_end(end_ts))
+        lead.decline()
+
+
+async def _decoded_batches(response: httpx.Response) -> AsyncIterator[Tuple[List[Dict[str, Any]], int]]:
+    """`(series, chunk_bytes)` for each received chunk of a streamed range response, then the tail."""
+    decoder = ResultStreamDecoder()
+    decode_sec = 0.0
+    async for chunk in response.aiter_bytes():
+        t0 = time.perf_counter()
+        items = decoder.feed(chunk)
+        decode_sec += time.perf_counter() - t0
+        yield items, len(chunk)
+    t0 = time.perf_counter()
+    items = decoder.close()
+    decode_sec += time.perf_counter() - t0
+    metrics.observe("mcp_backend_stage_seconds", decode_sec, backend="prometheus", stage="decode")
+    yield items, 0
+
+
+async def _decode_range_body(response: httpx.Response) -> Tuple[Dict[str, Any], int]:
+    result: List[Dict[str, Any]] = []
+    size = 0
+    async for items, chunk_size in _decoded_batches(response):
+        result.extend(items)
+        size += chunk_size
+    return {"status": "success", "data": {"resultType": "matrix", "result": result}}, size
+
+
+async def _prom_fetch_range(prom_url: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """`query_range` as `(data, size)`; decoded while streaming when `PROM_STREAM_DECODE` is on."""
+    if not PROM_STREAM_DECODE:
+        return await _prom_fetch_json(prom_url, "/api/v1/query_range", params=params)
+    if not prom_url:
+        raise ValueError("prom_url is empty")
+    url = f"{prom_url.rstrip('/')}/api/v1/query_range"
+    return await fetch_streamed(
+        url, params=params, headers=_prom_headers(), timeout=HTTP_TIMEOUT_SEC, decode=_decode_range_body
+    )
+
+
+def _shard_points() -> int:
+    return max(1, PROM_SHARD_MAX_POINTS)
+
+
+def _range_key(prom_url: str, query: str, start_ts: int, end_ts: int, step_seconds: int) -> Tuple[Any, ...]:
+    return _cache_key(prom_url, "/api/v1/query_range", query, start_ts, end_ts, step_seconds)
+
+
+def _chunk_plan(start_ts: int, end_ts: int, step_seconds: int) -> Optional[Tuple[List[Chunk], int]]:
+    """`(chunks, chunk_seconds)` when the window is served from cached chunks, else None."""
+    if PROM_RANGE_CHUNK_SEC <= 0 or not query_cache.enabled:
+        return None
+    chunk_seconds = _chunk_seconds(step_seconds)
+    if end_ts - start_ts < chunk_seconds:
+        return None
+    chunks = plan_chunks(start_ts, end_ts, step_seconds=step_seconds, chunk_seconds=chunk_seconds)
+    if len(chunks) > _max_chunks():
+        return None
+    return chunks, chunk_seconds
+
+
+def _chunk_seconds(step_seconds: int) -> int:
+    target = max(PROM_RANGE_CHUNK_SEC, step_seconds * max(1, PROM_RANGE_CHUNK_POINTS))
+    return chunk_seconds_for_step(step_seconds, target)
+
+
+def _max_chunks() -> int:
+    return max(1, query_cache.max_entries // CHUNK_CACHE_SHARE)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+async def _gather_limited(aws: List[Awaitable[T]]) -> List[T]:
+    """Await `aws` concurrently with at most `PROM_SHARD_PARALLELISM` in flight."""
+    if len(aws) == 1:
+        return [await aws[0]]
+
+    semaphore = asyncio.Semaphore(max(1, PROM_SHARD_PARALLELISM))
+
+    async def _guarded(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return list(await asyncio.gather(*(_guarded(aw) for aw in aws)))
+
+
+async def _fetch_range_shard(
+    prom_url: str,
+    query: str,
+    step: str,
+    first_ts: int,
+    last_ts: int,
+) -> Tuple[Dict[str, Any], int]:
+    """Fetch one time shard, retrying only this shard on transient failures."""
+    params = {
+        "query": query,
+        "start": first_ts,
+        "end": last_ts,
+        "step": step,
+    }
+    attempt = 0
+    while True:
+        try:
+            return await _prom_fetch_range(prom_url, params)
+        except Exception as exc:
+            if attempt >= PROM_SHARD_RETRIES or not _is_retryable(exc):
+                raise
+            attempt += 1
+            await asyncio.sleep(SHARD_RETRY_BACKOFF_SEC * attempt)
+
+
+def _chunk_key(prom_url: str, query: str, step_seconds: int, chunk: Chunk) -> Tuple[Any, ...]:
+    return _cache_key(prom_url, "/api/v1/query_range#chunk", query, step_seconds, chunk.start, chunk.last)
+
+
+async def _fetch_chunk_run(
+    prom_url: str,
+    query: str,
+    step: str,
+    step_seconds: int,
+    chunks: List[Chunk],
+) -> List[List[Dict[str, Any]]]:
+    """Fetch contiguous chunks with one request, then cache each chunk separately."""
+    data, size = await _fetch_range_shard(prom_url, query, step, chunks[0].start, chunks[-1].last)
+    parts = split_matrix(data.get("data", {}).get("result", []), chunks)
+    total_points = max(1, sum(len(s["values"]) for part in parts for s in part))
+    for chunk, part in zip(chunks, parts):
+        part_points = sum(len(s["values"]) for s in part)
+        query_cache.put(
+            _chunk_key(prom_url, query, step_seconds, chunk),
+            part,
+            size=max(1, size * part_points // total_points),
+            ttl=_ttl_for_window_end(chunk.last),
+        )
+    return parts
+
+
+async def _prom_query_range_chunked(
+    prom_url: str,
+    query: str,
+    start_ts: int,
+    end_ts: int,
+    step: str,
+    step_seconds: int,
+    chunks: List[Chunk],
+    chunk_seconds: int,
+) -> Dict[str, Any]:
+    if not prom_url:
+        raise ValueError("prom_url is empty")
+
+    parts: List[Optional[List[Dict[str, Any]]]] = [
+        query_cache.get(_chunk_key(prom_url, query, step_seconds, chunk)) for chunk in chunks
+    ]
+    missing = [idx for idx, part in enumerate(parts) if part is None]
+
+    # Each contiguous run of missing chunks is fetched as one or more shards of
+    # whole chunks, bounded by PROM_SHARD_MAX_POINTS evaluation steps each.
+    chunks_per_shard = max(1, (_shard_points() * step_seconds) // chunk_seconds)
+    shards: List[Tuple[int, int]] = []
+    for first, last in contiguous_runs(missing):
+        for shard_first in range(first, last + 1, chunks_per_shard):
+            shards.append((shard_first, min(last, shard_first + chunks_per_shard - 1)))
+
+    fetched = await _gather_limited(
+        [
+            _fetch_chunk_run(prom_url, query, step, step_seconds, chunks[first : last + 1])
+            for first, last in shards
+        ]
+    )
+    for (first, _last), shard_parts in zip(shards, fetched):
+        for offset, part in enumerate(shard_parts):
+            parts[first + offset] = part
+
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "matrix",
+            "result": stitch_matrices(parts, start_ts=start_ts, end_ts=end_ts),
+        },
+        "chunks": {
+            "total": len(chunks),
+            "cached": len(chunks) - len(missing),
+            "backend_requests": len(shards),
+        },
+    }
+
+
+async def prom_query_instant(prom_url: str, query: str, at: datetime) -> Dict[str, Any]:
+    at_ts = _align(to_unix(at), max(1, PROM_CACHE_INSTANT_ALIGN_SEC))
+    params = {
+        "query": query,
+        "time": at_ts,
+    }
+    key = _cache_key(prom_url, "/api/v1/query", query, at_ts)
+    return await _prom_get_json_cached(key, prom_url, "/api/v1/query", params, ttl=_ttl_for_window_end(at_ts))
+
+
+async def prom_label_values(prom_url: str, label: str, match: Optional[str] = None) -> List[str]:
+    params: Dict[str, Any] = {}
+    if match:
+        params["match[]"] = match
+    path = f"/api/v1/label/{label}/values"
+    key = _cache_key(prom_url, path, match)
+    data = await _prom_get_json_cached(key, prom_url, path, params, ttl=PROM_CACHE_TTL_SEC)
+    return data.get("data", [])
+
+
+async def prom_alerts(prom_url: str) -> Dict[str, Any]:
+    return await _prom_get_json(prom_url, "/api/v1/alerts")
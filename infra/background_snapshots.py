@@ -0,0 +1,95 @@
+"""Per-key snapshots of backend state, rebuilt in the background when stale."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Generic, Iterator, Optional, Protocol, Tuple, TypeVar
+
+from core.metrics import metrics
+
+logger = logging.getLogger("prom-mcp")
+
+
+class Snapshot(Protocol):
+    built_at: float
+
+
+S = TypeVar("S", bound=Snapshot)
+
+# refresh(key, url, previous snapshot or None) -> new snapshot
+Refresh = Callable[[str, str, Optional[S]], Awaitable[S]]
+
+
+class BackgroundSnapshots(Generic[S]):
+    """
+    Latest snapshot per key (an environment), with stale-while-revalidate refresh.
+
+    The first lookup for a key waits for the initial build. Later lookups
+    return the current snapshot immediately and, once it is older than
+    `refresh_sec`, start at most one background refresh for that key. A failed
+    background refresh is logged and the previous snapshot keeps being served,
+    but only up to `max_age_sec` (default `2 * refresh_sec`): an older snapshot,
+    e.g. after an idle period, is never served and the lookup waits for the
+    refresh instead (raising if it fails).
+    `refresh_sec <= 0` disables reuse: every lookup rebuilds inline.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        refresh: Refresh,
+        *,
+        refresh_sec: float,
+        max_age_sec: Optional[float] = None,
+    ) -> None:
+        self.name = name
+        self.refresh_sec = refresh_sec
+        self.max_age_sec = 2 * refresh_sec if max_age_sec is None else max_age_sec
+        self._refresh = refresh
+        self._snapshots: Dict[str, S] = {}
+        self._tasks: Dict[str, "asyncio.Task[S]"] = {}
+
+    async def get(self, key: str, url: str) -> S:
+        current = self._snapshots.get(key)
+        if current is None or self.refresh_sec <= 0:
+            return await asyncio.shield(self.refresh(key, url))
+        age = time.time() - current.built_at
+        if age >= self.max_age_sec:
+            return await asyncio.shield(self.refresh(key, url))
+        if age >= self.refresh_sec:
+            self.refresh(key, url)
+        return current
+
+    def refresh(self, key: str, url: str) -> "asyncio.Task[S]":
+        """Start (or join) the refresh of `key` on the running loop."""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._run_refresh(key, url))
+            task.add_done_callback(lambda t: self._log_failure(key, t))
+            self._tasks[key] = task
+        return task
+
+    async def _run_refresh(self, key: str, url: str) -> S:
+        with metrics.timer("mcp_index_refresh_seconds", index=self.name):
+            snapshot = await self._refresh(key, url, self._snapshots.get(key))
+        self._snapshots[key] = snapshot
+        metrics.inc("mcp_index_refresh_total", index=self.name)
+        return snapshot
+
+    def _log_failure(self, key: str, task: "asyncio.Task[S]") -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        metrics.inc("mcp_index_refresh_errors_total", index=self.name)
+        logger.warning("%s refresh failed for %s: %s", self.name, key, task.exception())
+
+    def current(self, key: str) -> Optional[S]:
+        return self._snapshots.get(key)
+
+    def items(self) -> Iterator[Tuple[str, S]]:
+        return iter(sorted(self._snapshots.items()))
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self._tasks.clear()
@@ -0,0 +1,155 @@
+"""Connection pools shared by the async Prometheus/Loki clients."""
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import (
+    HTTP_KEEPALIVE_EXPIRY_SEC,
+    LOKI_POOL_MAX_CONNECTIONS,
+    LOKI_POOL_MAX_KEEPALIVE,
+    PROM_POOL_MAX_CONNECTIONS,
+    PROM_POOL_MAX_KEEPALIVE,
+)
+
+TRANSPORT_RETRIES = 3
+
+
+@dataclass(frozen=True)
+class PoolLimits:
+    max_connections: int
+    max_keepalive: int
+    keepalive_expiry: float
+
+    def to_httpx(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+BACKEND_LIMITS: Dict[str, PoolLimits] = {
+    "prometheus": PoolLimits(PROM_POOL_MAX_CONNECTIONS, PROM_POOL_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY_SEC),
+    "loki": PoolLimits(LOKI_POOL_MAX_CONNECTIONS, LOKI_POOL_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY_SEC),
+}
+
+PoolKey = Tuple[str, str]
+
+
+@dataclass
+class _PoolStats:
+    requests: int = 0
+    checkouts: int = 0
+    connections_opened: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    saturated_requests: int = 0
+    pool_wait_sec: float = 0.0
+
+
+class PoolManager:
+    """
+    One httpx client per (backend, host) and event loop, each with its own limits.
+
+    Sizing per host keeps one busy Prometheus from starving the others, and
+    separate backends keep Loki scans from occupying Prometheus connections.
+    httpx pools are bound to the loop that opened them, hence the per-loop map.
+
+    Stats are shared across loops: `saturated_requests` counts requests that
+    started while every connection of the pool was busy, and `pool_wait_sec`
+    is the time spent before the request got a connection. Reuse is derived
+    from the httpx trace events of each connection checkout.
+    """
+
+    def __init__(self, limits: Dict[str, PoolLimits]) -> None:
+        self.limits = limits
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[PoolKey, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats: Dict[PoolKey, _PoolStats] = {}
+        self._lock = threading.Lock()
+
+    def limits_for(self, backend: str) -> PoolLimits:
+        return self.limits.get(backend, self.limits["prometheus"])
+
+    def client_for(self, url: str, backend: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        key = (backend, _host(url))
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            transport = httpx.AsyncHTTPTransport(
+                retries=TRANSPORT_RETRIES,
+                limits=self.limits_for(backend).to_httpx(),
+            )
+            client = clients[key] = httpx.AsyncClient(transport=transport)
+        return client
+
+    @contextmanager
+    def track(self, url: str, backend: str) -> Iterator[None]:
+        key = (backend, _host(url))
+        max_connections = self.limits_for(backend).max_connections
+        with self._lock:
+            stats = self._stats.setdefault(key, _PoolStats())
+            stats.requests += 1
+            if stats.in_flight >= max_connections:
+                stats.saturated_requests += 1
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                stats.in_flight -= 1
+
+    def record_connection(self, url: str, backend: str, *, opened: bool, pool_wait_sec: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((backend, _host(url)), _PoolStats())
+            stats.checkouts += 1
+            if opened:
+                stats.connections_opened += 1
+            stats.pool_wait_sec += pool_wait_sec
+
+    def stats(self) -> Dict[str, Any]:
+        pools = []
+        with self._lock:
+            for (backend, host), s in sorted(self._stats.items()):
+                limits = self.limits_for(backend)
+                reused = max(0, s.checkouts - s.connections_opened)
+                pools.append(
+                    {
+                        "backend": backend,
+                        "host": host,
+                        "max_connections": limits.max_connections,
+                        "max_keepalive": limits.max_keepalive,
+                        "requests": s.requests,
+                        "connections_opened": s.connections_opened,
+                        "connections_reused": reused,
+                        "reuse_ratio": (reused / s.checkouts) if s.checkouts else None,
+                        "in_flight": s.in_flight,
+                        "peak_in_flight": s.peak_in_flight,
+                        "saturated_requests": s.saturated_requests,
+                        "pool_wait_ms_total": round(s.pool_wait_sec * 1000, 3),
+                    }
+                )
+        return {"pools": pools}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+pool_manager = PoolManager(BACKEND_LIMITS)
+
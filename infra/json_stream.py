@@ -0,0 +1,116 @@
+"""Incremental decoding of Prometheus API responses."""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List
+
+from core import json_codec
+
+_RESULT_START_RE = re.compile(rb'"result"\s*:\s*\[')
+_RESULT_TYPE_RE = re.compile(rb'"resultType"\s*:\s*"(?P<type>\w+)"')
+_STATUS_RE = re.compile(rb'"status"\s*:\s*"(?P<status>\w+)"')
+_SEPARATORS = b" \t\r\n,"
+_STREAMABLE_TYPES = ("matrix", "vector")
+
+
+class ResultStreamDecoder:
+    """
+    Decode the `data.result` array of a Prometheus response one element at a time.
+
+    Feed raw body chunks with `feed()`; every series whose JSON object is complete
+    is returned immediately and dropped from the internal buffer, so memory is
+    bounded by the largest single series rather than the whole response.
+    Non-streamable bodies (errors, scalar/string results) are buffered and
+    decoded in full by `close()`. Elements are decoded with `core.json_codec`;
+    the body is kept as bytes, so UTF-8 is never decoded outside the codec.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+        self._hint_from = 0
+        self._state = "prefix"
+        self.result_type: str = ""
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        if self._state == "tail":
+            return []
+        self._buf.extend(chunk)
+        return self._process()
+
+    def close(self) -> List[Dict[str, Any]]:
+        items = self._process()
+        if self._state == "tail":
+            return items
+        if self._state == "items":
+            raise ValueError("Truncated Prometheus response body")
+
+        data = json_codec.loads(bytes(self._buf))
+        if data.get("status") != "success":
+            raise RuntimeError(f"Prometheus error: {data}")
+        result = data.get("data", {}).get("result", [])
+        self.result_type = data.get("data", {}).get("resultType", "")
+        return result if isinstance(result, list) and self.result_type in _STREAMABLE_TYPES else []
+
+    def _process(self) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        if self._state == "prefix":
+            self._read_prefix()
+        if self._state == "items":
+            self._read_items(items)
+        self._compact()
+        return items
+
+    def _read_prefix(self) -> None:
+        status = _STATUS_RE.search(self._buf)
+        if status and status.group("status") != b"success":
+            return
+        start = _RESULT_START_RE.search(self._buf)
+        if not start:
+            return
+        result_type = _RESULT_TYPE_RE.search(self._buf, 0, start.start())
+        self.result_type = result_type.group("type").decode("ascii") if result_type else ""
+        if self.result_type not in _STREAMABLE_TYPES:
+            return
+        self._pos = start.end()
+        self._hint_from = self._pos
+        self._state = "items"
+
+    def _read_items(self, items: List[Dict[str, Any]]) -> None:
+        buf = self._buf
+        while True:
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in _SEPARATORS:
+                pos += 1
+            self._pos = pos
+            if pos >= len(buf):
+                return
+            if buf[pos] == ord("]"):
+                self._state = "tail"
+                return
+
+            # Only attempt a decode once a closing brace has arrived past the last
+            # failed attempt; this keeps large series from being re-parsed per chunk.
+            # A brace that closes a nested object or sits inside a string fails to
+            # decode and moves the hint on, so each series is decoded about twice.
+            hint = buf.find(b"}", max(pos, self._hint_from))
+            if hint < 0:
+                self._hint_from = len(buf)
+                return
+            try:
+                item = json_codec.loads(buf[pos : hint + 1])
+            except ValueError:
+                self._hint_from = hint + 1
+                continue
+            items.append(item)
+            self._pos = self._hint_from = hint + 1
+
+    def _compact(self) -> None:
+        if self._state == "tail":
+            self._buf.clear()
+            self._pos = self._hint_from = 0
+        elif self._state == "items" and self._pos:
+            # Deleting a bytearray prefix is amortised O(1) in CPython.
+            del self._buf[: self._pos]
+            self._hint_from -= self._pos
+            self._pos = 0
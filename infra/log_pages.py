@@ -0,0 +1,212 @@
+"""Overlap-free pagination and time-sharded fetching of backward Loki log queries."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from core.config import LOKI_SHARD_PARALLELISM, LOKI_SHARD_SEC
+from core.metrics import metrics
+from infra.async_loki_client import loki_query_range
+
+CURSOR_VERSION = 1
+
+# (timestamp_ns, stream labels, line)
+LogEntry = Tuple[int, Dict[str, str], str]
+
+
+def entry_key(labels: Dict[str, str], line: str) -> str:
+    """Tie-breaker identity of a log line among lines sharing one timestamp."""
+    raw = json.dumps(sorted(labels.items()), ensure_ascii=False) + "\x00" + line
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def query_fingerprint(query: str) -> str:
+    return hashlib.blake2b(query.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass(frozen=True)
+class LogCursor:
+    """
+    Position inside a backward log scan.
+
+    The next request covers `[start_ns, end_ns)`. Lines at the boundary
+    timestamp `end_ns - 1` whose `entry_key` is in `seen` were already returned,
+    so pages never overlap even when many lines share one nanosecond.
+    """
+
+    query: str
+    start_ns: int
+    end_ns: int
+    seen: FrozenSet[str] = field(default_factory=frozenset)
+
+    def encode(self) -> str:
+        payload = {
+            "v": CURSOR_VERSION,
+            "q": query_fingerprint(self.query),
+            "s": self.start_ns,
+            "e": self.end_ns,
+            "k": sorted(self.seen),
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, query: str) -> "LogCursor":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            version, fingerprint = payload["v"], payload["q"]
+            start_ns, end_ns, seen = int(payload["s"]), int(payload["e"]), frozenset(payload["k"])
+        except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        if version != CURSOR_VERSION:
+            raise ValueError("Unsupported cursor version")
+        if fingerprint != query_fingerprint(query):
+            raise ValueError("cursor does not belong to this query; repeat the original filters")
+        return cls(query=query, start_ns=start_ns, end_ns=end_ns, seen=seen)
+
+
+@dataclass(frozen=True)
+class LogPage:
+    entries: List[LogEntry]
+    next_cursor: Optional[LogCursor]
+
+
+def plan_log_shards(start_ns: int, end_ns: int, *, shard_seconds: int, direction: str) -> List[Tuple[int, int]]:
+    """Split `[start_ns, end_ns)` into time shards, ordered in scan `direction`."""
+    shard_ns = shard_seconds * 1_000_000_000
+    if shard_ns <= 0 or end_ns - start_ns <= shard_ns:
+        return [(start_ns, end_ns)]
+    shards = [(s, min(s + shard_ns, end_ns)) for s in range(start_ns, end_ns, shard_ns)]
+    return shards[::-1] if direction == "backward" else shards
+
+
+def merge_streams(streams: Iterable[Dict[str, Any]], *, limit: int, direction: str) -> List[LogEntry]:
+    """
+    k-way merge of Loki stream results by timestamp, stopping after `limit` lines.
+
+    Loki returns each stream's values already ordered in the query direction,
+    so a heap over the stream heads yields the global order without sorting
+    every line. Ties keep input order.
+    """
+    backward = direction == "backward"
+    runs: List[List[LogEntry]] = []
+    for stream in streams:
+        labels = stream.get("stream", {})
+        run = [(int(raw_ts), labels, line) for raw_ts, line in stream.get("values", [])]
+        if any((a[0] < b[0]) if backward else (a[0] > b[0]) for a, b in zip(run, run[1:])):
+            run.sort(key=itemgetter(0), reverse=backward)
+        runs.append(run)
+    return list(islice(heapq.merge(*runs, key=itemgetter(0), reverse=backward), limit))
+
+
+async def fetch_log_entries(
+    loki_url: str,
+    query: str,
+    *,
+    start_ns: int,
+    end_ns: int,
+    limit: int,
+    direction: str = "backward",
+) -> List[LogEntry]:
+    """
+    Fetch the first `limit` lines of `[start_ns, end_ns)` in `direction`.
+
+    Long windows are split into `LOKI_SHARD_SEC` shards queried concurrently
+    (at most `LOKI_SHARD_PARALLELISM` at once), each limited to `limit` lines.
+    Shards are consumed in scan order; once the shards nearest the scan start
+    hold `limit` lines, the remaining shards cannot contribute and are cancelled.
+    """
+    shards = plan_log_shards(start_ns, end_ns, shard_seconds=LOKI_SHARD_SEC, direction=direction)
+    semaphore = asyncio.Semaphore(max(1, LOKI_SHARD_PARALLELISM))
+
+    async def _fetch(shard: Tuple[int, int]) -> List[Dict[str, Any]]:
+        async with semaphore:
+            data = await loki_query_range(
+                loki_url, query, start=shard[0], end=shard[1], limit=limit, direction=direction
+            )
+        return data.get("data", {}).get("result", [])
+
+    if len(shards) == 1:
+        return merge_streams(await _fetch(shards[0]), limit=limit, direction=direction)
+
+    tasks = [asyncio.create_task(_fetch(shard)) for shard in shards]
+    collected: List[Dict[str, Any]] = []
+    lines = 0
+    try:
+        for task in tasks:
+            streams = await task
+            metrics.inc("mcp_loki_shards_total", outcome="fetched")
+            collected.extend(streams)
+            lines += sum(len(stream.get("values", [])) for stream in streams)
+            if lines >= limit:
+                break
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            metrics.inc("mcp_loki_shards_total", len(pending), outcome="cancelled")
+            await asyncio.gather(*pending, return_exceptions=True)
+    return merge_streams(collected, limit=limit, direction=direction)
+
+
+def next_page(cursor: LogCursor, raw: List[LogEntry], *, page_size: int, fetch_limit: int) -> LogPage:
+    """Cut one page out of the newest-first lines fetched for `cursor`."""
+    boundary = cursor.end_ns - 1
+    fresh = [
+        entry
+        for entry in raw
+        if entry[0] < cursor.end_ns and not (entry[0] == boundary and entry_key(entry[1], entry[2]) in cursor.seen)
+    ]
+    page = fresh[:page_size]
+    exhausted = len(raw) < fetch_limit and len(fresh) <= page_size
+    if exhausted:
+        return LogPage(entries=page, next_cursor=None)
+
+    if not page:
+        # Only already-returned boundary lines came back: step past that timestamp.
+        return LogPage(entries=[], next_cursor=LogCursor(cursor.query, cursor.start_ns, boundary))
+
+    last_ts = page[-1][0]
+    seen = {entry_key(labels, line) for ts, labels, line in page if ts == last_ts}
+    if last_ts == boundary:
+        seen |= cursor.seen
+    return LogPage(entries=page, next_cursor=LogCursor(cursor.query, cursor.start_ns, last_ts + 1, frozenset(seen)))
+
+
+async def iter_log_pages(
+    loki_url: str,
+    cursor: LogCursor,
+    *,
+    page_size: int,
+) -> AsyncIterator[LogPage]:
+    """
+    Lazily yield pages of `page_size` lines, newest first, until the window is exhausted.
+
+    Each request asks for `page_size` plus the number of boundary lines to skip,
+    so a full page is returned even right after a timestamp tie.
+    """
+    while cursor.start_ns < cursor.end_ns:
+        fetch_limit = page_size + len(cursor.seen)
+        raw = await fetch_log_entries(
+            loki_url,
+            cursor.query,
+            start_ns=cursor.start_ns,
+            end_ns=cursor.end_ns,
+            limit=fetch_limit,
+        )
+        page = next_page(cursor, raw, page_size=page_size, fetch_limit=fetch_limit)
+        if page.entries or page.next_cursor is None:
+            yield page
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
@@ -1,3 +1,10 @@
+"""
+Legacy blocking Loki client on `requests`.
+
+The tools use `infra.async_loki_client`; the connection pool sizing of
+`infra.http_pool` applies there only, and this module keeps its default
+urllib3 pool.
+"""
 from __future__ import annotations
 
 from datetime import datetime
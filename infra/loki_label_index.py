@@ -0,0 +1,147 @@
+"""In-memory env/host/app index of Loki streams, refreshed in the background."""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import LOKI_LABEL_INDEX_REFRESH_SEC, LOKI_LABEL_INDEX_WINDOW_SEC
+from core.time_utils import iso
+from infra.async_loki_client import loki_series
+from infra.background_snapshots import BackgroundSnapshots
+
+# Incremental refreshes re-read this much of the previous slice, so streams
+# whose entries land late at the ingester are not missed.
+REFRESH_OVERLAP_SEC = 30
+# The first build asks for the window in this many slices, so every tuple's
+# last-seen time is known to within `window_sec / FULL_BUILD_SLICES`.
+FULL_BUILD_SLICES = 6
+# `match[]` selectors are OR-ed: streams with a host, and streams with an app
+# but no host, which `list_loki_apps` must still see.
+SERIES_SELECTORS = ('{host=~".+"}', '{app=~".+"}')
+
+# (env, host, app)
+LabelTuple = Tuple[str, str, str]
+# (env or None, app or host or None) -> sorted values
+_Lookup = Dict[Tuple[Optional[str], Optional[str]], List[str]]
+
+
+@dataclass(frozen=True)
+class LabelSnapshot:
+    """
+    Immutable view of the streams active in `[built_at - window_sec, built_at]`.
+
+    `hosts` and `apps` are precomputed for every filter combination (a filter
+    left unset is keyed as None), so lookups are a dict access and a slice.
+    """
+
+    built_at: float
+    window_sec: float
+    last_seen: Dict[LabelTuple, float]
+    hosts: _Lookup
+    apps: _Lookup
+
+    def age_sec(self, now: Optional[float] = None) -> float:
+        return max(0.0, (time.time() if now is None else now) - self.built_at)
+
+    def hosts_for(self, log_env: Optional[str] = None, app: Optional[str] = None) -> List[str]:
+        return self.hosts.get((log_env or None, app or None), [])
+
+    def apps_for(self, log_env: Optional[str] = None, host: Optional[str] = None) -> List[str]:
+        return self.apps.get((log_env or None, host or None), [])
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "source": "memory",
+            "age_sec": round(self.age_sec(), 3),
+            "built_at": iso(_dt(self.built_at)),
+            "window_sec": self.window_sec,
+            "streams": len(self.last_seen),
+        }
+
+
+def build_snapshot(last_seen: Dict[LabelTuple, float], *, built_at: float, window_sec: float) -> LabelSnapshot:
+    hosts: Dict[Tuple[Optional[str], Optional[str]], set] = {}
+    apps: Dict[Tuple[Optional[str], Optional[str]], set] = {}
+    for env, host, app in last_seen:
+        for env_key in (env or None, None):
+            if host:
+                for app_key in (app or None, None):
+                    hosts.setdefault((env_key, app_key), set()).add(host)
+            if app:
+                for host_key in (host or None, None):
+                    apps.setdefault((env_key, host_key), set()).add(app)
+    return LabelSnapshot(
+        built_at=built_at,
+        window_sec=window_sec,
+        last_seen=last_seen,
+        hosts={key: sorted(values) for key, values in hosts.items()},
+        apps={key: sorted(values) for key, values in apps.items()},
+    )
+
+
+class LokiLabelIndex:
+    """
+    Per-environment snapshot of (env, host, app) tuples from `/loki/api/v1/series`.
+
+    The first build covers the whole window in `FULL_BUILD_SLICES` concurrent
+    slices; each background refresh only asks Loki for streams seen since the
+    previous refresh. A tuple's last-seen time is the start of the latest
+    slice it appeared in (the series API has no timestamps), and tuples not
+    seen for `window_sec` are dropped, matching a live query over the window.
+    """
+
+    def __init__(self, *, window_sec: float, refresh_sec: float) -> None:
+        self.window_sec = window_sec
+        self.refresh_sec = refresh_sec
+        self._snapshots: BackgroundSnapshots[LabelSnapshot] = BackgroundSnapshots(
+            "loki_labels", self._refresh, refresh_sec=refresh_sec
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.refresh_sec > 0 and self.window_sec > 0
+
+    async def snapshot(self, env_key: str, loki_url: str) -> LabelSnapshot:
+        return await self._snapshots.get(env_key, loki_url)
+
+    async def _refresh(self, env_key: str, loki_url: str, previous: Optional[LabelSnapshot]) -> LabelSnapshot:
+        now = time.time()
+        horizon = now - self.window_sec
+        if previous is None:
+            width = self.window_sec / FULL_BUILD_SLICES
+            slices = [(horizon + i * width, horizon + (i + 1) * width) for i in range(FULL_BUILD_SLICES)]
+            last_seen: Dict[LabelTuple, float] = {}
+        else:
+            slices = [(max(horizon, previous.built_at - REFRESH_OVERLAP_SEC), now)]
+            last_seen = {k: ts for k, ts in previous.last_seen.items() if ts >= horizon}
+
+        answers = await asyncio.gather(
+            *(loki_series(loki_url, selectors=SERIES_SELECTORS, start=_dt(a), end=_dt(b)) for a, b in slices)
+        )
+        for (slice_start, _), series in zip(slices, answers):
+            for labels in series:
+                key = (labels.get("env", ""), labels.get("host", ""), labels.get("app", ""))
+                # The series API has no timestamps: the stream was active somewhere in the slice.
+                last_seen[key] = max(last_seen.get(key, slice_start), slice_start)
+        return build_snapshot(last_seen, built_at=now, window_sec=self.window_sec)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "window_sec": self.window_sec,
+            "refresh_sec": self.refresh_sec,
+            "environments": {env: snap.describe() for env, snap in self._snapshots.items()},
+        }
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+
+def _dt(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+loki_label_index = LokiLabelIndex(window_sec=LOKI_LABEL_INDEX_WINDOW_SEC, refresh_sec=LOKI_LABEL_INDEX_REFRESH_SEC)
@@ -0,0 +1,96 @@
+"""Step-aligned chunking helpers for incremental range-query caching."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SeriesKey = Tuple[Tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    One step-aligned slice of a range query.
+
+    `start`..`last` are the first and last evaluation timestamps fetched for the
+    chunk. Every chunk except the final one spans the full chunk interval so its
+    cache key is stable across sliding windows.
+    """
+
+    start: int
+    last: int
+
+
+def chunk_seconds_for_step(step_seconds: int, target_seconds: int) -> int:
+    # Chunk length must be a multiple of the step so chunk boundaries stay on the step grid.
+    return max(1, target_seconds // step_seconds) * step_seconds
+
+
+def plan_chunks(start_ts: int, end_ts: int, *, step_seconds: int, chunk_seconds: int) -> List[Chunk]:
+    chunks: List[Chunk] = []
+    chunk_start = (start_ts // chunk_seconds) * chunk_seconds
+    while chunk_start <= end_ts:
+        full_last = chunk_start + chunk_seconds - step_seconds
+        chunks.append(Chunk(start=chunk_start, last=min(full_last, end_ts)))
+        chunk_start += chunk_seconds
+    return chunks
+
+
+def contiguous_runs(missing: Sequence[int]) -> List[Tuple[int, int]]:
+    """Group sorted chunk indexes into inclusive `(first, last)` runs."""
+    runs: List[Tuple[int, int]] = []
+    for idx in missing:
+        if runs and runs[-1][1] == idx - 1:
+            runs[-1] = (runs[-1][0], idx)
+        else:
+            runs.append((idx, idx))
+    return runs
+
+
+def series_key(metric: Dict[str, Any]) -> SeriesKey:
+    return tuple(sorted((str(k), str(v)) for k, v in metric.items()))
+
+
+def split_matrix(result: Iterable[Dict[str, Any]], chunks: Sequence[Chunk]) -> List[List[Dict[str, Any]]]:
+    """Partition a matrix covering `chunks` into one matrix per chunk."""
+    parts: List[List[Dict[str, Any]]] = [[] for _ in chunks]
+    for series in result:
+        metric = series.get("metric", {})
+        buckets: List[List[Any]] = [[] for _ in chunks]
+        idx = 0
+        for sample in series.get("values", []):
+            ts = float(sample[0])
+            while idx < len(chunks) - 1 and ts > chunks[idx].last:
+                idx += 1
+            buckets[idx].append(sample)
+        for i, values in enumerate(buckets):
+            if values:
+                parts[i].append({"metric": metric, "values": values})
+    return parts
+
+
+def stitch_matrices(
+    parts: Iterable[Optional[List[Dict[str, Any]]]],
+    *,
+    start_ts: float,
+    end_ts: float,
+) -> List[Dict[str, Any]]:
+    """
+    Concatenate per-chunk matrices by label set and trim to `[start_ts, end_ts]`.
+
+    Output is sorted by label set, matching Prometheus' own matrix ordering.
+    """
+    merged: Dict[SeriesKey, Dict[str, Any]] = {}
+    for part in parts:
+        for series in part or []:
+            metric = series.get("metric", {})
+            values = [s for s in series.get("values", []) if start_ts <= float(s[0]) <= end_ts]
+            if not values:
+                continue
+            key = series_key(metric)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {"metric": metric, "values": values}
+            else:
+                existing["values"].extend(values)
+    return [merged[key] for key in sorted(merged)]
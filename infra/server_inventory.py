@@ -0,0 +1,227 @@
+"""Per-environment inventory of scrape targets, used for discovery and filter checks."""
+from __future__ import annotations
+
+import asyncio
+import difflib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.config import PROM_INVENTORY_REFRESH_SEC
+from core.time_utils import iso
+from infra.async_prom_client import prom_label_values, prom_query_instant
+from infra.background_snapshots import BackgroundSnapshots
+
+INVENTORY_QUERY = 'up{server_name!=""}'
+PROCESS_GROUP_MATCH = 'namedprocess_namegroup_cpu_seconds_total{job="process_monitoring"}'
+MAX_SUGGESTIONS = 3
+# The inventory describes current targets, so filters are only checked against
+# it for windows ending at most this long before now.
+CURRENT_END_SLACK_SEC = 300
+
+logger = logging.getLogger("prom-mcp")
+
+
+@dataclass(frozen=True)
+class InventorySnapshot:
+    """Targets of one Prometheus at `built_at`, unique by `(instance, job)`."""
+
+    built_at: float
+    servers: List[Dict[str, Any]]
+    process_groups: List[str]
+    instances_by_server: Dict[str, List[str]]
+
+    @property
+    def server_names(self) -> List[str]:
+        return sorted(self.instances_by_server)
+
+    @property
+    def instances(self) -> List[str]:
+        return sorted({s["instance"] for s in self.servers if s["instance"]})
+
+    def age_sec(self, now: Optional[float] = None) -> float:
+        return max(0.0, (time.time() if now is None else now) - self.built_at)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "age_sec": round(self.age_sec(), 3),
+            "built_at": iso(datetime.fromtimestamp(self.built_at, tz=timezone.utc)),
+            "servers": len(self.servers),
+        }
+
+
+def build_inventory(series: Sequence[Dict[str, Any]], groups: Sequence[str], *, built_at: float) -> InventorySnapshot:
+    servers: List[Dict[str, Any]] = []
+    instances_by_server: Dict[str, set] = {}
+    seen = set()
+    for s in series:
+        m = s.get("metric", {})
+        server_name = m.get("server_name")
+        if not server_name:
+            continue
+        key = (m.get("instance"), m.get("job"))
+        if key in seen:
+            continue
+        seen.add(key)
+        value = s.get("value") or [None, None]
+        servers.append(
+            {
+                "instance": m.get("instance"),
+                "job": m.get("job"),
+                "server_name": server_name,
+                "up": float(value[1]) if value[1] is not None else None,
+            }
+        )
+        if m.get("instance"):
+            instances_by_server.setdefault(server_name, set()).add(m["instance"])
+        else:
+            instances_by_server.setdefault(server_name, set())
+    return InventorySnapshot(
+        built_at=built_at,
+        servers=servers,
+        process_groups=sorted({g for g in groups if g}),
+        instances_by_server={name: sorted(values) for name, values in instances_by_server.items()},
+    )
+
+
+class UnknownTargetError(ValueError):
+    """The inventory has no entry for a filter value."""
+
+
+def _suggest(value: str, candidates: Sequence[str]) -> str:
+    by_lower = {c.lower(): c for c in candidates}
+    close = difflib.get_close_matches(value.lower(), list(by_lower), n=MAX_SUGGESTIONS, cutoff=0.6)
+    return f" Did you mean: {', '.join(by_lower[c] for c in close)}?" if close else ""
+
+
+def _resolve_one(value: str, candidates: Sequence[str], label: str) -> str:
+    if value in candidates:
+        return value
+    folded = [c for c in candidates if c.lower() == value.lower()]
+    if len(folded) == 1:
+        return folded[0]
+    raise UnknownTargetError(f"Unknown {label} '{value}'.{_suggest(value, candidates)}")
+
+
+def resolve_target(
+    snapshot: InventorySnapshot,
+    *,
+    server_name: Optional[str],
+    instance: Optional[str],
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return canonical `(server_name, instance)` filters, or raise ValueError.
+
+    Exact and case-insensitive matches are accepted; an `instance` without a
+    port resolves when exactly one target on that host exists. Unknown values
+    raise `UnknownTargetError` with the closest known values as suggestions.
+    """
+    if server_name:
+        server_name = _resolve_one(server_name, snapshot.server_names, "server_name")
+    if instance:
+        candidates = snapshot.instances_by_server[server_name] if server_name else snapshot.instances
+        if ":" not in instance:
+            on_host = [c for c in candidates if c.rsplit(":", 1)[0].lower() == instance.lower()]
+            if len(on_host) == 1:
+                return server_name, on_host[0]
+            if len(on_host) > 1:
+                raise ValueError(f"instance '{instance}' matches several targets: {', '.join(on_host)}; pick one")
+        try:
+            instance = _resolve_one(instance, candidates, "instance")
+        except UnknownTargetError:
+            if server_name and instance in snapshot.instances:
+                raise ValueError(
+                    f"instance '{instance}' does not belong to server_name '{server_name}' "
+                    f"(its instances: {', '.join(candidates) or 'none'})"
+                ) from None
+            raise
+    return server_name, instance
+
+
+@dataclass(frozen=True)
+class TargetFilter:
+    server_name: Optional[str]
+    instance: Optional[str]
+    # Set when the inventory has no entry for the filter, which is passed through.
+    note: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Optional[str]]:
+        return {"server_name": self.server_name, "instance": self.instance}
+
+
+class ServerInventory:
+    """
+    Per-environment `up{server_name!=""}` targets and process group names.
+
+    Built from one instant query plus one label-values call and refreshed in
+    the background every `refresh_sec`, so discovery tools answer from memory
+    and check tools can canonicalize a filter (or flag a likely typo) before
+    querying a range.
+    """
+
+    def __init__(self, *, refresh_sec: float) -> None:
+        self.refresh_sec = refresh_sec
+        self._snapshots: BackgroundSnapshots[InventorySnapshot] = BackgroundSnapshots(
+            "server_inventory", self._refresh, refresh_sec=refresh_sec
+        )
+
+    async def snapshot(self, env_key: str, prom_url: str) -> InventorySnapshot:
+        return await self._snapshots.get(env_key, prom_url)
+
+    async def _refresh(self, env_key: str, prom_url: str, previous: Optional[InventorySnapshot]) -> InventorySnapshot:
+        now = time.time()
+        result, groups = await asyncio.gather(
+            prom_query_instant(prom_url, INVENTORY_QUERY, datetime.fromtimestamp(now, tz=timezone.utc)),
+            prom_label_values(prom_url, label="groupname", match=PROCESS_GROUP_MATCH),
+        )
+        return build_inventory(result.get("data", {}).get("result", []), groups, built_at=now)
+
+    async def resolve_filter(
+        self,
+        env_key: str,
+        prom_url: str,
+        *,
+        server_name: Optional[str],
+        instance: Optional[str],
+        end: Optional[datetime] = None,
+    ) -> TargetFilter:
+        """
+        Resolve target filters against one environment's inventory.
+
+        The inventory only lists current targets with a `server_name`, so a
+        value it has no entry for (a decommissioned server, a target without
+        `server_name`, or a typo) is passed through unchanged with a `note`
+        carrying suggestions, and windows ending more than
+        `CURRENT_END_SLACK_SEC` before now are not checked at all. Ambiguous
+        or contradictory filters raise ValueError. An inventory that cannot be
+        loaded keeps the filters as given, so an outage never blocks a check.
+        Callers fanning out resolve each environment inside its own run, so a
+        slow inventory is bounded by that environment's timeout.
+        """
+        requested = TargetFilter(server_name, instance)
+        historical = end is not None and end.timestamp() < time.time() - CURRENT_END_SLACK_SEC
+        if (not server_name and not instance) or historical:
+            return requested
+        try:
+            snapshot = await self.snapshot(env_key, prom_url)
+        except Exception as exc:
+            logger.warning("Server inventory unavailable for %s: %s", env_key, exc)
+            return requested
+        try:
+            return TargetFilter(*resolve_target(snapshot, server_name=server_name, instance=instance))
+        except UnknownTargetError as exc:
+            return TargetFilter(server_name, instance, note=str(exc))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "refresh_sec": self.refresh_sec,
+            "environments": {env: snap.describe() for env, snap in self._snapshots.items()},
+        }
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+
+server_inventory = ServerInventory(refresh_sec=PROM_INVENTORY_REFRESH_SEC)
@@ -0,0 +1,153 @@
+"""Coalescing of identical concurrent backend requests (single-flight)."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple, TypeVar
+
+from core.metrics import metrics
+
+T = TypeVar("T")
+
+# Result a `Lead` resolves with when it has nothing to share; waiting callers
+# then run their own call.
+_DECLINED = object()
+
+
+def request_key(
+    url: str,
+    params: Optional[Mapping[str, Any]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Tuple[Any, ...]:
+    """Canonical key for a GET: URL plus sorted params and headers, values as sent."""
+    return (
+        url,
+        tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+        tuple(sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items())),
+    )
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers with the same key.
+
+    The first caller (the leader) runs `fn` as a task; callers arriving while
+    it is pending await the same task and receive the same result object or
+    exception, so results must be treated as read-only (as with cached
+    responses). The key is forgotten once the call completes, so this never
+    serves stale data; caching is `ResponseCache`'s job. A cancelled caller
+    does not cancel the shared call for the others.
+
+    A caller that consumes the response itself (e.g. a streamed body) can
+    register as leader with `lead()` instead of passing a function.
+    """
+
+    def __init__(self, *, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._followers: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], *, backend: str) -> T:
+        if not self.enabled:
+            return await fn()
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._calls.get(key)
+            if task is not None and task.get_loop() is loop and not task.done():
+                self.coalesced += 1
+                self._followers[key] = self._followers.get(key, 0) + 1
+                leader = False
+            else:
+                task = loop.create_task(fn())
+                self._calls[key] = task
+                self.leaders += 1
+                leader = True
+        if leader:
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            metrics.inc("mcp_backend_coalesced_total", backend=backend)
+        result = await asyncio.shield(task)
+        if result is _DECLINED:
+            return await fn()
+        return result
+
+    def lead(self, key: Hashable) -> Optional["Lead"]:
+        """
+        Register the caller as leader for `key` without running a function.
+
+        Returns None when a call for `key` is already in flight; join it with
+        `do()` instead. Callers arriving later through `do()` wait until the
+        leader resolves the returned `Lead`. When disabled, the `Lead` is not
+        shared with anyone.
+        """
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Any]" = loop.create_future()
+        if self.enabled:
+            with self._lock:
+                task = self._calls.get(key)
+                if task is not None and task.get_loop() is loop and not task.done():
+                    return None
+                self._calls[key] = future
+                self.leaders += 1
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return Lead(self, key, future)
+
+    def followers(self, key: Hashable) -> int:
+        with self._lock:
+            return self._followers.get(key, 0)
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        with self._lock:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+                self._followers.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter was cancelled.
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.leaders + self.coalesced
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": (self.coalesced / calls) if calls else 0.0,
+            }
+
+
+class Lead:
+    """
+    Leadership of one `SingleFlight` key taken with `SingleFlight.lead()`.
+
+    Resolve it exactly once: `share()` hands the result to every waiting
+    caller, `fail()` raises the error in them, and `decline()` lets each of
+    them run its own call. Later calls are ignored, so `decline()` can sit in
+    a `finally` block.
+    """
+
+    def __init__(self, group: SingleFlight, key: Hashable, future: "asyncio.Future[Any]") -> None:
+        self._group = group
+        self._key = key
+        self._future = future
+
+    @property
+    def followers(self) -> int:
+        """Callers currently waiting for this leader."""
+        return self._group.followers(self._key)
+
+    def share(self, result: Any) -> None:
+        if not self._future.done():
+            self._future.set_result(result)
+
+    def fail(self, exc: BaseException) -> None:
+        if not self._future.done():
+            self._future.set_exception(exc)
+
+    def decline(self) -> None:
+        self.share(_DECLINED)
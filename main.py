@@ -1,16 +1,22 @@
 from __future__ import annotations
 
-from core.server import mcp
+from core.config import MCP_METRICS_HOST, MCP_METRICS_PORT
+from core.metrics import start_metrics_server
+from core.server import logger, mcp
 
 # Import tools for side-effect registration on `mcp`
 from tools import catalog as _catalog  # noqa: F401
 from tools import alerts_runner as _alerts_runner  # noqa: F401
 from tools import checks_runner as _checks_runner  # noqa: F401
+from tools import diagnostics as _diagnostics  # noqa: F401
 from tools import loki_query as _loki_query  # noqa: F401
 from tools import promql as _promql  # noqa: F401
 
 
 def run() -> None:
+    if MCP_METRICS_PORT > 0:
+        start_metrics_server(MCP_METRICS_PORT, MCP_METRICS_HOST)
+        logger.info("Serving self-metrics on %s:%d/metrics", MCP_METRICS_HOST, MCP_METRICS_PORT)
     mcp.run()
 
 
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import itertools
+import unittest
+from unittest import mock
+
+from infra import alert_snapshots
+from infra.alert_snapshots import AlertPoller, build_alert_snapshot, decode_since, encode_since, matches
+
+
+def _alert(name: str, server: str, severity: str = "critical", state: str = "firing") -> dict:
+    return {
+        "labels": {"alertname": name, "server_name": server, "severity": severity, "job": "node"},
+        "annotations": {"summary": f"{name} on {server}"},
+        "state": state,
+        "activeAt": "2026-03-24T01:00:00Z",
+        "value": "1",
+    }
+
+
+def _alerts() -> list:
+    names, servers, severities = ("HighCPU", "DiskFull"), ("web-01", "web-02", "db-01"), ("warning", "critical")
+    alerts = [_alert(n, s, sev) for n, s, sev in itertools.product(names, servers, severities)]
+    alerts.append(_alert("InstanceDown", "db-01", state="pending"))
+    alerts.append({"labels": {"alertname": "NoLabels"}, "state": "firing"})
+    return alerts
+
+
+class AlertSnapshotTests(unittest.TestCase):
+    def test_indexed_select_matches_a_linear_scan(self) -> None:
+        snapshot = build_alert_snapshot(_alerts(), built_at=0.0, previous=None)
+        cases = [
+            {},
+            {"severity": "critical"},
+            {"severity": "critical", "alertname": "DiskFull", "server_name": "db-01"},
+            {"state": "pending"},
+            {"job": "missing"},
+        ]
+        for filters in cases:
+            with self.subTest(filters=filters):
+                expected = [a for a in snapshot.alerts if matches(a, filters)]
+                selected = snapshot.select(filters)
+                self.assertEqual(selected, expected)
+                counts = snapshot.counts(filters, selected)
+                self.assertEqual(sum(counts["severity"].values()), len(expected))
+        self.assertEqual(snapshot.counts({}, snapshot.alerts)["severity"]["unknown"], 1)
+
+    def test_changes_since_nets_fired_and_resolved_alerts(self) -> None:
+        v1 = build_alert_snapshot([_alert("A", "x"), _alert("B", "x", state="pending")], built_at=1.0, previous=None)
+        v2 = build_alert_snapshot([_alert("B", "x"), _alert("C", "x")], built_at=2.0, previous=v1)
+        v3 = build_alert_snapshot([_alert("B", "x")], built_at=3.0, previous=v2)
+
+        fired, resolved = v3.changes_since(1)
+        self.assertEqual([a["labels"]["alertname"] for a in fired], ["B"])
+        self.assertEqual(sorted(a["labels"]["alertname"] for a in resolved), ["A", "C"])
+        self.assertEqual(v3.changes_since(3), ([], []))
+
+        trimmed = build_alert_snapshot([], built_at=4.0, previous=v3, history=1)
+        self.assertIsNone(trimmed.changes_since(1))
+        self.assertIsNotNone(trimmed.changes_since(3))
+
+    def test_pending_alerts_that_disappear_are_not_reported_as_resolved(self) -> None:
+        v1 = build_alert_snapshot([_alert("A", "x", state="pending"), _alert("B", "x")], built_at=1.0, previous=None)
+        v2 = build_alert_snapshot([], built_at=2.0, previous=v1)
+
+        fired, resolved = v2.changes_since(1)
+        self.assertEqual(fired, [])
+        self.assertEqual([a["labels"]["alertname"] for a in resolved], ["B"])
+
+    def test_since_token_round_trips_and_detects_restarts(self) -> None:
+        self.assertEqual(decode_since(encode_since({"prod": 4})), {"prod": 4})
+        with mock.patch.object(alert_snapshots, "_BOOT_ID", "other"):
+            token = encode_since({"prod": 4})
+        self.assertIsNone(decode_since(token))
+        with self.assertRaisesRegex(ValueError, "Invalid since token"):
+            decode_since("garbage")
+
+    def test_get_alerts_reports_changes_since_previous_call(self) -> None:
+        module = importlib.import_module("tools.alerts_runner")
+        polls = [[_alert("A", "web-01"), _alert("B", "db-01")], [_alert("B", "db-01"), _alert("C", "web-01")]]
+
+        async def fake_prom_alerts(prom_url):
+            return {"data": {"alerts": polls.pop(0)}}
+
+        with (
+            mock.patch.object(module, "alert_poller", AlertPoller(poll_sec=0)),
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(alert_snapshots, "prom_alerts", new=fake_prom_alerts),
+        ):
+            first = asyncio.run(module.get_alerts(server_name="web-01"))
+            second = asyncio.run(module.get_alerts(server_name="web-01", since=first["next_since"]))
+
+        self.assertNotIn("changes", first)
+        self.assertEqual(first["summary"]["total_alerts"], 1)
+        changes = second["changes"]
+        self.assertFalse(changes["reset"])
+        self.assertEqual([a["labels"]["alertname"] for a in changes["fired"]], ["C"])
+        self.assertEqual([a["labels"]["alertname"] for a in changes["resolved"]], ["A"])
+        self.assertEqual(second["snapshot"]["version"], 2)
+
+    def test_get_alerts_polls_inline_once_the_snapshot_is_older_than_poll_sec(self) -> None:
+        module = importlib.import_module("tools.alerts_runner")
+        clock = [10_000.0]
+        polls = [[_alert("A", "web-01")], [_alert("C", "web-01")]]
+        prom_alerts = mock.AsyncMock(side_effect=lambda prom_url: {"data": {"alerts": polls.pop(0)}})
+
+        async def run():
+            first = await module.get_alerts()
+            clock[0] += 10
+            cached = await module.get_alerts()
+            clock[0] += 10
+            return first, cached, await module.get_alerts()
+
+        with (
+            mock.patch.object(module, "alert_poller", AlertPoller(poll_sec=15)),
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(alert_snapshots, "prom_alerts", new=prom_alerts),
+            mock.patch.object(alert_snapshots.time, "time", side_effect=lambda: clock[0]),
+        ):
+            first, cached, stale = asyncio.run(run())
+
+        self.assertEqual(prom_alerts.await_count, 2)
+        self.assertEqual(cached["snapshot"]["version"], first["snapshot"]["version"])
+        self.assertEqual(stale["snapshot"]["version"], 2)
+        self.assertEqual(stale["snapshot"]["age_sec"], 0)
+        self.assertEqual([a["labels"]["alertname"] for a in stale["alerts"]], ["C"])
+
+
+    def test_background_polling_catches_alerts_that_fire_and_resolve_between_lookups(self) -> None:
+        polls = [[], [_alert("Flap", "web-01")]]
+
+        async def fake_prom_alerts(prom_url):
+            return {"data": {"alerts": polls.pop(0) if polls else []}}
+
+        poller = AlertPoller(poll_sec=0.02)
+
+        async def run():
+            first = await poller.snapshot("prod", "http://prom.prod:9090")
+            await asyncio.sleep(0.15)
+            return first, await poller.snapshot("prod", "http://prom.prod:9090")
+
+        with mock.patch.object(alert_snapshots, "prom_alerts", new=fake_prom_alerts):
+            first, later = asyncio.run(run())
+
+        self.assertGreater(later.version, first.version + 1)
+        fired, resolved = later.changes_since(first.version)
+        self.assertEqual(fired, [])
+        self.assertEqual([a["labels"]["alertname"] for a in resolved], ["Flap"])
+
+    def test_background_polling_stops_for_idle_environments(self) -> None:
+        prom_alerts = mock.AsyncMock(return_value={"data": {"alerts": []}})
+        poller = AlertPoller(poll_sec=0.01, idle_polls=2)
+
+        async def run():
+            await poller.snapshot("prod", "http://prom.prod:9090")
+            await asyncio.sleep(0.1)
+            return poller.stats()["polling"], prom_alerts.await_count
+
+        with mock.patch.object(alert_snapshots, "prom_alerts", new=prom_alerts):
+            polling, polls = asyncio.run(run())
+
+        self.assertEqual(polling, [])
+        self.assertLessEqual(polls, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,460 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+import httpx
+
+import infra.async_http as async_http
+import infra.async_prom_client as async_prom_client
+from infra.async_loki_client import loki_series
+from infra.async_prom_client import (
+    iter_range_series,
+    prom_alerts,
+    prom_query_instant,
+    prom_query_range,
+    query_cache,
+)
+from utils.downsample import SampleBudget
+from utils.query_plan import CHECK_ID_LABEL, split_check_tag
+from utils.summarize import summarize_matrix
+
+
+def _mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class AsyncClientTests(unittest.TestCase):
+    def setUp(self) -> None:
+        query_cache.clear()
+
+    def test_prom_query_range_sends_expected_request(self) -> None:
+        captured = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            captured["url"] = str(request.url.copy_with(query=None))
+            captured["params"] = dict(request.url.params)
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": []}})
+
+        start = datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc)
+
+        async def run():
+            with mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)):
+                return await prom_query_range("http://prom.example/", "up", start=start, end=end, step="5m")
+
+        result = asyncio.run(run())
+
+        self.assertEqual(result["data"]["resultType"], "matrix")
+        self.assertEqual(captured["url"], "http://prom.example/api/v1/query_range")
+        self.assertEqual(captured["params"]["query"], "up")
+        self.assertEqual(captured["params"]["step"], "5m")
+        self.assertAlmostEqual(float(captured["params"]["start"]), start.timestamp())
+
+    def test_get_json_retries_retryable_status(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            if len(calls) < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"status": "success", "data": {"alerts": []}})
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_http, "RETRY_BACKOFF_SEC", 0),
+            ):
+                return await prom_alerts("http://prom.example")
+
+        result = asyncio.run(run())
+
+        self.assertEqual(result["data"]["alerts"], [])
+        self.assertEqual(len(calls), 3)
+
+    def test_loki_error_status_raises(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"status": "error", "error": "bad selector"})
+
+        async def run():
+            with mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)):
+                return await loki_series("http://loki.example", selectors=['{env="prod"}'])
+
+        with self.assertRaisesRegex(RuntimeError, "Loki error"):
+            asyncio.run(run())
+
+    def test_prom_query_range_reuses_cached_response_for_aligned_window(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(dict(request.url.params))
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": []}})
+
+        start = datetime(2026, 3, 24, 1, 0, 10, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 2, 0, 10, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 0),
+            ):
+                await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+                await prom_query_range(
+                    "http://prom.example",
+                    "up",
+                    start=start.replace(second=40),
+                    end=end.replace(second=40),
+                    step="5m",
+                )
+
+        before = query_cache.stats()
+        asyncio.run(run())
+        after = query_cache.stats()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0]["start"], str(int(datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc).timestamp())))
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+    def test_chunked_range_query_fetches_only_missing_tail(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            params = dict(request.url.params)
+            calls.append(params)
+            start_ts, end_ts = int(params["start"]), int(params["end"])
+            values = [[ts, str(ts % 7)] for ts in range(start_ts, end_ts + 1, 300)]
+            return httpx.Response(
+                200,
+                json={
+                    "status": "success",
+                    "data": {"resultType": "matrix", "result": [{"metric": {"instance": "a"}, "values": values}]},
+                },
+            )
+
+        start = datetime(2026, 3, 24, 0, 30, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 3, 10, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 3600),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_POINTS", 12),
+            ):
+                first = await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+                second = await prom_query_range(
+                    "http://prom.example",
+                    "up",
+                    start=start.replace(minute=40),
+                    end=end.replace(minute=20),
+                    step="5m",
+                )
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(int(calls[0]["start"]), int(datetime(2026, 3, 24, 0, 0, tzinfo=timezone.utc).timestamp()))
+        self.assertEqual(int(calls[1]["start"]), int(datetime(2026, 3, 24, 3, 0, tzinfo=timezone.utc).timestamp()))
+        self.assertEqual(first["chunks"]["backend_requests"], 1)
+        self.assertEqual(second["chunks"], {"total": 4, "cached": 3, "backend_requests": 1})
+        values = second["data"]["result"][0]["values"]
+        self.assertEqual(values[0][0], int(start.replace(minute=40).timestamp()))
+        self.assertEqual(values[-1][0], int(end.replace(minute=20).timestamp()))
+        self.assertEqual(len(values), (160 // 5) + 1)
+
+    def test_long_window_is_sharded_and_failed_shard_is_retried_alone(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            params = dict(request.url.params)
+            calls.append(params)
+            start_ts, end_ts = int(params["start"]), int(params["end"])
+            if len(calls) == 2:
+                return httpx.Response(500)
+            values = [[ts, "1"] for ts in range(start_ts, end_ts + 1, 3600)]
+            return httpx.Response(
+                200,
+                json={
+                    "status": "success",
+                    "data": {"resultType": "matrix", "result": [{"metric": {"instance": "a"}, "values": values}]},
+                },
+            )
+
+        start = datetime(2026, 3, 1, 0, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 4, 23, 0, tzinfo=timezone.utc)
+        promql = "max_over_time(up[4d:])"
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_http, "RETRY_TOTAL", 0),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 0),
+                mock.patch.object(async_prom_client, "PROM_SHARD_MAX_POINTS", 24),
+                mock.patch.object(async_prom_client, "SHARD_RETRY_BACKOFF_SEC", 0),
+            ):
+                return await prom_query_range("http://prom.example", promql, start=start, end=end, step="1h")
+
+        result = asyncio.run(run())
+
+        shard_starts = sorted({int(c["start"]) for c in calls})
+        self.assertEqual(len(shard_starts), 4)
+        self.assertEqual(len(calls), 5)
+        self.assertEqual({c["query"] for c in calls}, {promql})
+        self.assertEqual(result["shards"], {"total": 4})
+        values = result["data"]["result"][0]["values"]
+        self.assertEqual(len(values), 96)
+        self.assertEqual([v[0] for v in values], sorted(v[0] for v in values))
+
+    def test_missing_chunk_runs_are_split_into_shards(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(dict(request.url.params))
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": []}})
+
+        start = datetime(2026, 3, 1, 0, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 1, 5, 55, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 3600),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_POINTS", 12),
+                mock.patch.object(async_prom_client, "PROM_SHARD_MAX_POINTS", 24),
+            ):
+                return await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+
+        result = asyncio.run(run())
+
+        self.assertEqual(result["chunks"], {"total": 6, "cached": 0, "backend_requests": 3})
+        self.assertEqual(len(calls), 3)
+
+    def test_chunk_and_shard_responses_are_stream_decoded(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(dict(request.url.params))
+            start_ts = int(request.url.params["start"])
+            result = [{"metric": {"instance": "a"}, "values": [[start_ts, "1"]]}]
+            body = b'{"status":"success","data":{"resultType":"matrix","result":' + json.dumps(result).encode() + b"}}"
+            return httpx.Response(200, stream=httpx.ByteStream(body))
+
+        start = datetime(2026, 3, 1, 0, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 1, 5, 55, tzinfo=timezone.utc)
+
+        async def run(chunk_sec: int):
+            query_cache.clear()
+            calls.clear()
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", chunk_sec),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_POINTS", 12),
+                mock.patch.object(async_prom_client, "PROM_SHARD_MAX_POINTS", 24),
+                mock.patch.object(
+                    async_prom_client,
+                    "ResultStreamDecoder",
+                    wraps=async_prom_client.ResultStreamDecoder,
+                ) as decoder,
+            ):
+                result = await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+            return result, decoder
+
+        for chunk_sec in (3600, 0):
+            with self.subTest(chunk_sec=chunk_sec):
+                result, decoder = asyncio.run(run(chunk_sec))
+
+                self.assertEqual(len(calls), 3)
+                self.assertEqual(decoder.call_count, 3)
+                self.assertEqual(len(result["data"]["result"][0]["values"]), 3)
+
+    def test_chunking_skips_short_windows_and_windows_beyond_cache_share(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(dict(request.url.params))
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": []}})
+
+        short_start = datetime(2026, 3, 24, 1, 10, tzinfo=timezone.utc)
+        short_end = datetime(2026, 3, 24, 1, 40, tzinfo=timezone.utc)
+        long_start = datetime(2026, 2, 22, 0, 0, tzinfo=timezone.utc)
+        long_end = datetime(2026, 3, 24, 0, 0, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 3600),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_POINTS", 12),
+                mock.patch.object(async_prom_client, "PROM_SHARD_MAX_POINTS", 100_000),
+            ):
+                short = await prom_query_range("http://prom.example", "up", start=short_start, end=short_end, step="1m")
+                long = await prom_query_range("http://prom.example", "up", start=long_start, end=long_end, step="5m")
+            return short, long
+
+        short, long = asyncio.run(run())
+
+        # 30 minutes at 1m fits in one chunk: fetched from the window start, not the chunk boundary.
+        self.assertNotIn("chunks", short)
+        self.assertEqual(int(calls[0]["start"]), int(short_start.timestamp()))
+        # 30 days of 1h chunks would exceed a quarter of the cache entries.
+        self.assertNotIn("chunks", long)
+        self.assertEqual(len(calls), 2)
+        self.assertLessEqual(query_cache.stats()["entries"], 2)
+
+    def test_chunk_length_follows_step(self) -> None:
+        with (
+            mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 3600),
+            mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_POINTS", 240),
+        ):
+            self.assertEqual(async_prom_client._chunk_seconds(15), 3600)
+            self.assertEqual(async_prom_client._chunk_seconds(300), 72000)
+
+    def test_range_end_is_rounded_up_to_keep_newest_step(self) -> None:
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(dict(request.url.params))
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": []}})
+
+        start = datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 2, 3, 20, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 0),
+            ):
+                await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+
+        asyncio.run(run())
+
+        self.assertEqual(int(calls[0]["end"]), int(end.replace(minute=5, second=0).timestamp()))
+
+    def test_cached_range_result_is_not_mutated_by_summarization(self) -> None:
+        values = [[1711242000 + i * 300, str(i)] for i in range(12)]
+        series = [{"metric": {"instance": "a", CHECK_ID_LABEL: "cpu_avg_pct"}, "values": values}]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": series}})
+
+        start = datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(async_prom_client, "PROM_RANGE_CHUNK_SEC", 0),
+            ):
+                first = await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+                snapshot = copy.deepcopy(first)
+                untagged = [split_check_tag(s)[1] for s in first["data"]["result"]]
+                summarize_matrix(untagged, True, budget=SampleBudget(4))
+                second = await prom_query_range("http://prom.example", "up", start=start, end=end, step="5m")
+            return first, snapshot, second
+
+        first, snapshot, second = asyncio.run(run())
+
+        self.assertIs(second, first)
+        self.assertEqual(second, snapshot)
+
+    def test_iter_range_series_streams_when_cache_is_disabled(self) -> None:
+        result = [{"metric": {"instance": str(i)}, "values": [[1711249200, "1"]]} for i in range(3)]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = b'{"status":"success","data":{"resultType":"matrix","result":' + json.dumps(result).encode() + b"}}"
+            return httpx.Response(200, stream=httpx.ByteStream(body))
+
+        start = datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(query_cache, "max_entries", 0),
+                mock.patch.object(
+                    async_prom_client,
+                    "ResultStreamDecoder",
+                    wraps=async_prom_client.ResultStreamDecoder,
+                ) as decoder,
+            ):
+                items = [s async for s in iter_range_series("http://prom.example", "up", start=start, end=end, step="5m")]
+            return items, decoder
+
+        items, decoder = asyncio.run(run())
+
+        self.assertEqual(items, result)
+        decoder.assert_called_once()
+
+    def test_iter_range_series_streams_into_cache_when_enabled(self) -> None:
+        result = [{"metric": {"instance": str(i)}, "values": [[1711249200, "1"]]} for i in range(3)]
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            body = b'{"status":"success","data":{"resultType":"matrix","result":' + json.dumps(result).encode() + b"}}"
+            return httpx.Response(200, stream=httpx.ByteStream(body))
+
+        start = datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 24, 1, 30, tzinfo=timezone.utc)
+
+        async def collect():
+            return [s async for s in iter_range_series("http://prom.example", "up", start=start, end=end, step="1m")]
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(
+                    async_prom_client,
+                    "ResultStreamDecoder",
+                    wraps=async_prom_client.ResultStreamDecoder,
+                ) as decoder,
+            ):
+                first = await collect()
+                with mock.patch.object(query_cache, "max_bytes", 10):
+                    query_cache.clear()
+                    oversized = await collect()
+                    self.assertEqual(query_cache.stats()["entries"], 0)
+                query_cache.clear()
+                await collect()
+                second = await collect()
+            return first, oversized, second, decoder
+
+        first, oversized, second, decoder = asyncio.run(run())
+
+        self.assertEqual(first, result)
+        self.assertEqual(oversized, result)
+        self.assertEqual(second, result)
+        self.assertEqual(decoder.call_count, 3)
+        self.assertEqual(len(calls), 3)
+
+    def test_open_window_uses_short_ttl(self) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"status": "success", "data": {"resultType": "vector", "result": []}})
+
+        now = datetime.now(timezone.utc)
+        ttls = []
+        real_put = query_cache.put
+
+        def spy_put(key, value, *, size, ttl):
+            ttls.append(ttl)
+            real_put(key, value, size=size, ttl=ttl)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_mock_client(handler)),
+                mock.patch.object(query_cache, "put", side_effect=spy_put),
+            ):
+                await prom_query_instant("http://prom.example", "up", at=now)
+                await prom_query_instant("http://prom.example", "up", at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+        asyncio.run(run())
+
+        self.assertLess(ttls[0], ttls[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
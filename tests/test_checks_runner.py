@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import re
+import unittest
+from unittest import mock
+
+
+def _series(value: str) -> dict:
+    return {"metric": {"instance": "a:9100"}, "values": [[1711249200, value]]}
+
+
+def _tagged_metrics(promql: str) -> list:
+    """One metric per check tagged in a coalesced query, or one untagged metric."""
+    ids = re.findall(r'"mcp_check_id", "(\w+)"', promql)
+    return [{"instance": "a:9100", "mcp_check_id": check_id} for check_id in ids] or [{"instance": "a:9100"}]
+
+
+def _vector(promql: str, ts: float, value: str) -> dict:
+    return {"data": {"resultType": "vector", "result": [{"metric": m, "value": [ts, value]} for m in _tagged_metrics(promql)]}}
+
+
+async def _fake_instant(prom_url, promql, at):
+    return _vector(promql, at.timestamp(), "1")
+
+
+class ChecksRunnerTests(unittest.TestCase):
+    def test_run_all_checks_isolates_failing_checks(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            if "node_load15" in promql:
+                raise RuntimeError("boom")
+            await asyncio.sleep(0)
+            yield _series("1")
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=_fake_instant),
+        ):
+            result = asyncio.run(module.run_all_checks(hours=1))
+
+        by_id = {item["check"]["id"]: item for item in result["checks"]}
+        self.assertEqual(list(by_id), list(module.CHECKS))
+        self.assertEqual(result["failed_checks"], 1)
+        self.assertEqual(by_id["load15_avg"]["error"], "boom")
+        self.assertEqual(by_id["up"]["series_count"], 1)
+
+    def test_run_all_checks_coalesces_and_demultiplexes_check_families(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        queries = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            queries.append(promql)
+            for check_id in re.findall(r'"mcp_check_id", "(\w+)"', promql):
+                yield {"metric": {"instance": "a:9100", "mcp_check_id": check_id}, "values": [[1711249200, "1"]]}
+            if " or " not in promql:
+                yield _series("1")
+
+        async def fake_instant(prom_url, promql, at):
+            queries.append(promql)
+            return await _fake_instant(prom_url, promql, at)
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=fake_instant),
+            mock.patch.object(module, "PROM_COALESCE_MAX_CHECKS", 8),
+        ):
+            result = asyncio.run(module.run_all_checks(hours=1))
+
+        by_id = {item["check"]["id"]: item for item in result["checks"]}
+        self.assertEqual(result["failed_checks"], 0)
+        self.assertEqual(len(queries), result["query_plan"]["backend_queries"])
+        self.assertEqual(result["query_plan"]["requests_saved"], len(module.CHECKS) - len(queries))
+        batches = result["query_plan"]["coalesced_batches"]
+        self.assertIn(["tcp_retrans_per_sec", "tcp_established"], batches)
+        self.assertIn(["tcp_time_wait", "tcp_inuse", "tcp_orphan"], batches)
+        self.assertIn(["cpu_avg_pct", "cpu_iowait_pct"], batches)
+        self.assertEqual(result["query_plan"]["fallback_queries"], 0)
+        self.assertEqual(by_id["tcp_orphan"]["results"][0]["metric"], {"instance": "a:9100"})
+        self.assertTrue(all(item["series_count"] == 1 for item in result["checks"]))
+
+    def test_failed_coalesced_batch_falls_back_to_single_checks(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        queries = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            queries.append(promql)
+            if " or " in promql or "node_sockstat_TCP_orphan" in promql:
+                raise RuntimeError("bad batch")
+            yield _series("1")
+
+        async def fake_instant(prom_url, promql, at):
+            queries.append(promql)
+            if " or " in promql:
+                raise RuntimeError("bad batch")
+            return await _fake_instant(prom_url, promql, at)
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=fake_instant),
+        ):
+            result = asyncio.run(module.run_all_checks(hours=1))
+
+        by_id = {item["check"]["id"]: item for item in result["checks"]}
+        self.assertEqual(by_id["tcp_orphan"]["error"], "bad batch")
+        self.assertEqual(by_id["tcp_inuse"]["series_count"], 1)
+        self.assertEqual(result["failed_checks"], 1)
+        plan = result["query_plan"]
+        self.assertEqual(plan["backend_queries"], len(queries))
+        self.assertEqual(plan["fallback_queries"], sum(len(b) for b in plan["coalesced_batches"]))
+        self.assertEqual(plan["requests_saved"], 0)
+
+    def test_run_all_checks_caps_auto_step_at_sustain_window(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        steps = set()
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            steps.add(step)
+            yield _series("1")
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=_fake_instant),
+            mock.patch.object(module, "PROM_COALESCE_MAX_CHECKS", 1),
+        ):
+            result = asyncio.run(module.run_all_checks(days=30))
+
+        by_id = {item["check"]["id"]: item for item in result["checks"]}
+        self.assertEqual(result["failed_checks"], 0)
+        self.assertEqual(steps, {"5m"})
+        self.assertEqual(result["range"]["step"], "5m")
+        self.assertEqual(by_id["cpu_avg_pct"]["alert_config"]["step_seconds"], module.SUSTAIN_SECONDS)
+
+    def test_run_check_caps_auto_step_only_for_sustain_checks(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            yield _series("1")
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            load = asyncio.run(module.run_check("load15_avg", days=30))
+            cpu = asyncio.run(module.run_check("cpu_avg_pct", days=30))
+
+        self.assertEqual(load["range"]["step"], "3h")
+        self.assertEqual(cpu["range"]["step"], "5m")
+        self.assertEqual(cpu["alert_config"]["step_seconds"], module.SUSTAIN_SECONDS)
+
+    def test_run_promql_caps_auto_step_when_alert_pct_is_set(self) -> None:
+        module = importlib.import_module("tools.promql")
+        steps = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            steps.append(step)
+            yield _series("1")
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            plain = asyncio.run(module.run_promql("up", approved=True, days=30))
+            alert = asyncio.run(module.run_promql("up", approved=True, days=30, alert_pct=True))
+            samples = asyncio.run(module.run_promql("up", approved=True, days=30, alert_pct=True, include_samples=True))
+
+        self.assertEqual(steps, ["3h", "5m", "10m"])
+        self.assertEqual(plain["range"]["step"], "3h")
+        self.assertEqual(alert["alert_config"]["step_seconds"], 300)
+        self.assertEqual(samples["alert_config"]["step_seconds"], 600)
+
+    def test_instant_checks_are_evaluated_once_at_window_end(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        instant_queries = []
+        range_queries = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            range_queries.append(promql)
+            yield _series("1")
+
+        async def fake_instant(prom_url, promql, at):
+            instant_queries.append((promql, at))
+            return _vector(promql, 1711249200, "0")
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=fake_instant),
+        ):
+            single = asyncio.run(module.run_check("up", hours=24))
+            everything = asyncio.run(module.run_all_checks(hours=24))
+
+        self.assertEqual(single["check"]["kind"], "instant")
+        self.assertIsNone(single["alert_config"])
+        summary = {"count": 1, "min": 0.0, "max": 0.0, "avg": 0.0, "last": 0.0, "last_ts": 1711249200.0}
+        self.assertEqual(single["results"], [{"metric": {"instance": "a:9100"}, "summary": summary}])
+        self.assertEqual(instant_queries[0][0], "up")
+        self.assertEqual(module.iso(instant_queries[0][1]), single["range"]["end"])
+
+        instant_ids = {c.id for c in module.CHECKS.values() if c.kind == "instant"}
+        self.assertEqual(instant_ids, {"cpu_peak_pct", "fs_readonly", "up", "pg_up"})
+        # `up` and `pg_up` both select `up` and share one coalesced query.
+        self.assertEqual(len(instant_queries), 1 + len(instant_ids) - 1)
+        self.assertFalse(any("node_filesystem_readonly" in q or "[24h:]" in q for q in range_queries))
+        by_id = {item["check"]["id"]: item for item in everything["checks"]}
+        self.assertEqual(everything["failed_checks"], 0)
+        self.assertTrue(all(by_id[check_id]["series_count"] == 1 for check_id in instant_ids))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import math
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from core.runtime import resolve_step, validate_sample_volume
+from utils.downsample import SampleBudget, lttb, minmax, sample_budget
+from utils.summarize import stats_from_values, summarize_series
+
+
+def _wave(n: int) -> list:
+    values = [[1711249200 + i * 15, str(round(50 + 40 * math.sin(i / 50), 3))] for i in range(n)]
+    values[1234][1] = "99.9"  # isolated spike
+    values[4321][1] = "0.1"  # isolated dip
+    values[777][1] = "NaN"
+    return values
+
+
+class DownsampleTests(unittest.TestCase):
+    def test_minmax_keeps_endpoints_and_every_extreme(self) -> None:
+        values = _wave(10_000)
+        reduced = minmax(values, 200)
+
+        self.assertLessEqual(len(reduced), 200)
+        self.assertIs(reduced[0], values[0])
+        self.assertIs(reduced[-1], values[-1])
+        self.assertIn(values[1234], reduced)
+        self.assertIn(values[4321], reduced)
+        self.assertEqual([s[0] for s in reduced], sorted(s[0] for s in reduced))
+        self.assertNotIn(values[777], reduced)
+
+    def test_lttb_returns_exactly_max_points_in_order(self) -> None:
+        values = _wave(10_000)
+        reduced = lttb(values, 300)
+
+        self.assertEqual(len(reduced), 300)
+        self.assertIs(reduced[0], values[0])
+        self.assertIs(reduced[-1], values[-1])
+        self.assertEqual([s[0] for s in reduced], sorted(s[0] for s in reduced))
+        self.assertIn(values[1234], reduced)
+
+    def test_short_series_pass_through(self) -> None:
+        values = [[1, "1"], [2, "2"], [3, "3"]]
+
+        self.assertEqual(SampleBudget(10).apply(values), (values, None))
+
+    def test_sample_budget_validates_inputs(self) -> None:
+        self.assertIsNone(sample_budget(None))
+        self.assertEqual(sample_budget(100, "lttb"), SampleBudget(100, "lttb"))
+        for max_points, method in ((2, "minmax"), (10**9, "minmax"), (100, "average")):
+            with self.subTest(max_points=max_points, method=method):
+                with self.assertRaises(ValueError):
+                    sample_budget(max_points, method)
+
+    def test_summary_uses_full_resolution_samples(self) -> None:
+        values = _wave(10_000)
+        item = summarize_series({"metric": {}, "values": values}, True, budget=SampleBudget(100))
+
+        self.assertEqual(item["summary"], stats_from_values(values))
+        self.assertLessEqual(len(item["values"]), 100)
+        self.assertEqual(item["downsampled"], {"method": "minmax", "points": len(item["values"]), "original_points": 10_000})
+
+    def test_max_points_coarsens_the_fetch_step_instead_of_rejecting(self) -> None:
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 31, tzinfo=timezone.utc)
+
+        step = resolve_step("1m", start=start, end=end, include_samples=True, max_points=500)
+        self.assertEqual(step, "10m")
+        validate_sample_volume(include_samples=True, start=start, end=end, step=step, max_points=500)
+        self.assertEqual(resolve_step("1m", start=start, end=end, include_samples=True), "1m")
+        for max_points in (None, 500):
+            with self.subTest(max_points=max_points), self.assertRaises(ValueError):
+                validate_sample_volume(include_samples=True, start=start, end=end, step="1m", max_points=max_points)
+
+    def test_run_check_downsamples_in_one_call(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        values = _wave(10_000)
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            yield {"metric": {"instance": "a:9100"}, "values": values}
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            result = asyncio.run(
+                module.run_check("cpu_avg_pct", days=7, step="1m", include_samples=True, max_points=500)
+            )
+
+        item = result["results"][0]
+        self.assertEqual(result["range"]["step"], "5m")
+        self.assertEqual(item["summary"]["max"], 99.9)
+        self.assertEqual(item["summary"]["min"], 0.1)
+        self.assertLessEqual(len(item["values"]), 500)
+        self.assertEqual(item["downsampled"]["original_points"], 10_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
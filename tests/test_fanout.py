@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import unittest
+from unittest import mock
+
+import core.runtime as runtime
+from core.fanout import fan_out_environments
+
+ENVS = {"prod": "http://prom.prod:9090", "dr": "http://prom.dr:9090", "dev_test": "http://prom.dev:9090"}
+
+
+class EnvironmentFanOutTests(unittest.TestCase):
+    def test_resolve_prom_urls_accepts_all_lists_and_comma_strings(self) -> None:
+        with mock.patch.dict(runtime.ENV_URLS, ENVS, clear=True):
+            self.assertEqual([key for key, _ in runtime.resolve_prom_urls("all")], ["dev_test", "dr", "prod"])
+            self.assertEqual(
+                runtime.resolve_prom_urls(["production", "dr", "prod"]),
+                [("prod", ENVS["prod"]), ("dr", ENVS["dr"])],
+            )
+            self.assertEqual([key for key, _ in runtime.resolve_prom_urls("prod, dev-test")], ["prod", "dev_test"])
+            with self.assertRaises(ValueError):
+                runtime.resolve_prom_urls(["prod", "staging"])
+
+        self.assertTrue(runtime.is_multi_environment("ALL"))
+        self.assertTrue(runtime.is_multi_environment(["prod"]))
+        self.assertFalse(runtime.is_multi_environment("prod"))
+        self.assertFalse(runtime.is_multi_environment(None))
+
+    def test_slow_and_failing_environments_do_not_block_healthy_ones(self) -> None:
+        async def run(env_key: str, prom_url: str) -> dict:
+            if env_key == "dr":
+                await asyncio.sleep(10)
+            if env_key == "dev_test":
+                raise RuntimeError("connection refused")
+            return {"value": prom_url}
+
+        result = asyncio.run(fan_out_environments(sorted(ENVS.items()), run, timeout=0.05))
+
+        by_env = {item["environment"]: item for item in result["results"]}
+        self.assertEqual(result["environments"], ["dev_test", "dr", "prod"])
+        self.assertEqual(result["failed_environments"], ["dev_test", "dr"])
+        self.assertEqual(by_env["prod"]["value"], ENVS["prod"])
+        self.assertEqual(by_env["dev_test"]["error"], "connection refused")
+        self.assertIn("Timed out", by_env["dr"]["error"])
+        self.assertLess(result["elapsed_ms"], 5000)
+
+    def test_run_check_merges_results_per_environment(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        seen_urls = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            seen_urls.append(prom_url)
+            if prom_url == ENVS["dr"]:
+                raise RuntimeError("dr down")
+            yield {"metric": {"instance": "a:9100"}, "values": [[1711249200, "1"]]}
+
+        with (
+            mock.patch.dict(runtime.ENV_URLS, ENVS, clear=True),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            result = asyncio.run(module.run_check("load15_avg", hours=1, environment=["prod", "dr"]))
+
+        self.assertEqual(sorted(seen_urls), sorted([ENVS["prod"], ENVS["dr"]]))
+        self.assertEqual(result["check"]["id"], "load15_avg")
+        self.assertEqual(result["failed_environments"], ["dr"])
+        prod, dr = result["results"]
+        self.assertEqual((prod["environment"], prod["series_count"]), ("prod", 1))
+        self.assertEqual(dr["error"], "dr down")
+
+
+if __name__ == "__main__":
+    unittest.main()
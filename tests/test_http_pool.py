@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from infra.http_pool import PoolLimits, PoolManager
+
+
+class _SlowJsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self) -> None:  # noqa: N802
+        time.sleep(self.delay)
+        body = json.dumps({"status": "success", "data": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        return
+
+
+class HttpPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.async_http = importlib.import_module("infra.async_http")
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SlowJsonHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def tearDown(self) -> None:
+        _SlowJsonHandler.delay = 0.0
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _manager(self, max_connections: int) -> PoolManager:
+        limits = PoolLimits(max_connections=max_connections, max_keepalive=max_connections, keepalive_expiry=30)
+        return PoolManager({"prometheus": limits, "loki": limits})
+
+    def test_sequential_requests_reuse_one_keepalive_connection(self) -> None:
+        manager = self._manager(4)
+
+        async def run():
+            for _ in range(3):
+                await self.async_http.fetch_json(f"{self.base}/api/v1/label/job/values", timeout=5)
+            await self.async_http.fetch_json(f"{self.base}/loki/api/v1/labels", timeout=5)
+
+        with mock.patch.object(self.async_http, "pool_manager", manager):
+            asyncio.run(run())
+
+        pools = {pool["backend"]: pool for pool in manager.stats()["pools"]}
+        self.assertEqual(pools["prometheus"]["requests"], 3)
+        self.assertEqual(pools["prometheus"]["connections_opened"], 1)
+        self.assertEqual(pools["prometheus"]["connections_reused"], 2)
+        # Loki gets its own pool even on the same host.
+        self.assertEqual(pools["loki"]["connections_opened"], 1)
+
+    def test_saturated_pool_is_reported(self) -> None:
+        manager = self._manager(1)
+        _SlowJsonHandler.delay = 0.05
+
+        async def run():
+            await asyncio.gather(
+                *(
+                    self.async_http.fetch_json(f"{self.base}/api/v1/query", params={"query": f"q{i}"}, timeout=5)
+                    for i in range(3)
+                )
+            )
+
+        with mock.patch.object(self.async_http, "pool_manager", manager):
+            asyncio.run(run())
+
+        pool = manager.stats()["pools"][0]
+        self.assertEqual(pool["peak_in_flight"], 3)
+        self.assertEqual(pool["saturated_requests"], 2)
+        self.assertEqual(pool["connections_opened"], 1)
+        self.assertGreater(pool["pool_wait_ms_total"], 40)
+        self.assertEqual(pool["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import unittest
+from decimal import Decimal
+
+from core.json_codec import available_codecs, get_codec
+
+
+class JsonCodecTests(unittest.TestCase):
+    def test_every_installed_codec_round_trips_from_bytes(self) -> None:
+        doc = {"status": "success", "data": {"result": [{"metric": {"host": "한글"}, "values": [[1.5, "0.25"]]}]}}
+        body = json.dumps(doc).encode("utf-8")
+        for name, codec in available_codecs().items():
+            with self.subTest(codec=name):
+                self.assertEqual(codec.loads(body), doc)
+                self.assertEqual(json.loads(codec.dumps(doc)), doc)
+                self.assertNotIn(" ", codec.dumps({"a": [1, 2]}))
+
+    def test_unknown_values_fall_back_to_str(self) -> None:
+        for name, codec in available_codecs().items():
+            with self.subTest(codec=name):
+                self.assertEqual(json.loads(codec.dumps({"v": Decimal("1.5")})), {"v": "1.5"})
+
+    def test_auto_prefers_an_installed_fast_codec(self) -> None:
+        expected = next(name for name in ("orjson", "msgspec", "json") if name in available_codecs())
+        self.assertEqual(get_codec("auto").name, expected)
+        with self.assertRaises(ValueError):
+            get_codec("simdjson")
+
+    def test_dict_tool_results_skip_fastmcp_revalidation(self) -> None:
+        importlib.import_module("tools.catalog")
+        server = importlib.import_module("core.server")
+
+        unstructured, structured = asyncio.run(server.mcp.call_tool("list_checks", {}))
+
+        self.assertEqual(json.loads(unstructured[0].text), structured["result"])
+        self.assertIn("checks", structured["result"])
+
+
+if __name__ == "__main__":
+    unittest.main()
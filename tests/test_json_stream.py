@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import unittest
+from unittest import mock
+
+from core import json_codec
+from infra.json_stream import ResultStreamDecoder
+
+
+def _body(result: list, result_type: str = "matrix") -> bytes:
+    return json.dumps(
+        {"status": "success", "data": {"resultType": result_type, "result": result}, "warnings": ["x"]},
+        separators=(",", ":"),
+    ).encode()
+
+
+def _feed_in_chunks(decoder: ResultStreamDecoder, body: bytes, size: int) -> list:
+    batches = []
+    for i in range(0, len(body), size):
+        batches.append(decoder.feed(body[i : i + size]))
+    batches.append(decoder.close())
+    return batches
+
+
+class ResultStreamDecoderTests(unittest.TestCase):
+    def test_yields_each_series_as_soon_as_it_is_complete(self) -> None:
+        result = [
+            {"metric": {"instance": f"host-{i}", "note": 'a}b]c\\"ü'}, "values": [[1711249200 + j, str(j)] for j in range(20)]}
+            for i in range(5)
+        ]
+        body = _body(result)
+        decoder = ResultStreamDecoder()
+
+        batches = _feed_in_chunks(decoder, body, 7)
+
+        self.assertEqual([item for batch in batches for item in batch], result)
+        self.assertGreater(sum(1 for batch in batches if batch), 1)
+        self.assertEqual(decoder.result_type, "matrix")
+
+    def test_buffer_is_released_after_each_series(self) -> None:
+        result = [{"metric": {"i": str(i)}, "values": [[1, "1"]] * 50} for i in range(3)]
+        body = _body(result)
+        first_series_end = body.index(b"]]}") + 3
+        decoder = ResultStreamDecoder()
+
+        items = decoder.feed(body[:first_series_end])
+
+        self.assertEqual(items, result[:1])
+        self.assertLess(len(decoder._buf), 10)
+
+    def test_series_are_decoded_with_the_configured_codec(self) -> None:
+        result = [{"metric": {"i": str(i), "name": "ü}"}, "values": [[1, "1"]]} for i in range(3)]
+        decoder = ResultStreamDecoder()
+
+        with mock.patch.object(json_codec, "loads", wraps=json_codec.loads) as loads:
+            items = [item for batch in _feed_in_chunks(decoder, _body(result), 5) for item in batch]
+
+        self.assertEqual(items, result)
+        self.assertGreaterEqual(loads.call_count, len(result))
+        self.assertIsInstance(decoder._buf, bytearray)
+
+    def test_error_status_raises_on_close(self) -> None:
+        decoder = ResultStreamDecoder()
+        decoder.feed(b'{"status":"error","errorType":"timeout","error":"query timed out"}')
+
+        with self.assertRaisesRegex(RuntimeError, "Prometheus error"):
+            decoder.close()
+
+    def test_truncated_body_raises(self) -> None:
+        decoder = ResultStreamDecoder()
+        decoder.feed(_body([{"metric": {}, "values": [[1, "1"]]}])[:-20])
+
+        with self.assertRaises(ValueError):
+            decoder.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
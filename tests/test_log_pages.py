@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from infra import log_pages
+from infra.log_pages import LogCursor, iter_log_pages
+
+BASE_NS = 1_774_314_000_000_000_000
+
+
+def _fake_loki(entries):
+    """Backward Loki `query_range` over `(ts_ns, labels, line)` with `[start, end)` semantics."""
+    calls = []
+
+    async def query_range(loki_url, query, *, start, end, limit, direction):
+        calls.append({"start": start, "end": end, "limit": limit})
+        selected = sorted((e for e in entries if start <= e[0] < end), key=lambda e: e[0], reverse=True)[:limit]
+        streams = {}
+        for ts, labels, line in selected:
+            streams.setdefault(tuple(sorted(labels.items())), []).append([str(ts), line])
+        return {
+            "status": "success",
+            "data": {"result": [{"stream": dict(key), "values": values} for key, values in streams.items()]},
+        }
+
+    return query_range, calls
+
+
+def _entries():
+    a, b = {"host": "a"}, {"host": "b"}
+    entries = [(BASE_NS + i * 1000, a if i % 2 else b, f"line {i}") for i in range(20)]
+    # Five lines sharing one nanosecond, so a page boundary falls inside the tie.
+    entries += [(BASE_NS + 7_500, a if i % 2 else b, f"tie {i}") for i in range(5)]
+    return entries
+
+
+def _micro_shards(start_ns, end_ns, *, shard_seconds, direction):
+    shards = [(s, min(s + 1000, end_ns)) for s in range(start_ns, end_ns, 1000)][:40]
+    if shards[-1][1] < end_ns:
+        shards.append((shards[-1][1], end_ns))
+    return shards[::-1] if direction == "backward" else shards
+
+
+class LogPagesTests(unittest.TestCase):
+    def _walk(self, entries, page_size):
+        fake, calls = _fake_loki(entries)
+        cursor = LogCursor(query='{app="x"}', start_ns=BASE_NS, end_ns=BASE_NS + 10**9)
+
+        async def run():
+            return [page async for page in iter_log_pages("http://loki", cursor, page_size=page_size)]
+
+        with mock.patch.object(log_pages, "loki_query_range", new=fake):
+            return asyncio.run(run()), calls
+
+    def test_pages_cover_every_line_once_across_timestamp_ties(self) -> None:
+        entries = _entries()
+        for page_size in (1, 2, 3, 4, 7, 100):
+            with self.subTest(page_size=page_size):
+                pages, _ = self._walk(entries, page_size)
+                seen = [(ts, line) for page in pages for ts, _, line in page.entries]
+                self.assertEqual(sorted(seen, key=lambda e: e[0], reverse=True), seen)
+                self.assertEqual(sorted(seen), sorted((ts, line) for ts, _, line in entries))
+                self.assertTrue(all(len(page.entries) <= page_size for page in pages))
+                self.assertIsNone(pages[-1].next_cursor)
+
+    def test_next_request_resumes_just_after_the_boundary(self) -> None:
+        pages, calls = self._walk(_entries(), 13)
+        boundary_ts = pages[0].entries[-1][0]
+        self.assertEqual(calls[1]["end"], boundary_ts + 1)
+        self.assertEqual(calls[1]["limit"], 13 + len(pages[0].next_cursor.seen))
+
+    def test_plan_log_shards_orders_shards_in_scan_direction(self) -> None:
+        sec = 1_000_000_000
+        self.assertEqual(log_pages.plan_log_shards(0, 5 * sec, shard_seconds=2, direction="forward"),
+                         [(0, 2 * sec), (2 * sec, 4 * sec), (4 * sec, 5 * sec)])
+        self.assertEqual(log_pages.plan_log_shards(0, 5 * sec, shard_seconds=2, direction="backward")[0],
+                         (4 * sec, 5 * sec))
+        self.assertEqual(log_pages.plan_log_shards(0, 5 * sec, shard_seconds=0, direction="backward"), [(0, 5 * sec)])
+
+    def test_merge_streams_interleaves_streams_by_timestamp(self) -> None:
+        streams = [
+            {"stream": {"host": "a"}, "values": [["9", "a9"], ["5", "a5"], ["1", "a1"]]},
+            {"stream": {"host": "b"}, "values": [["8", "b8"], ["6", "b6"]]},
+        ]
+        merged = log_pages.merge_streams(streams, limit=4, direction="backward")
+        self.assertEqual([line for _, _, line in merged], ["a9", "b8", "b6", "a5"])
+        forward = log_pages.merge_streams(
+            [{"stream": s["stream"], "values": s["values"][::-1]} for s in streams], limit=10, direction="forward"
+        )
+        self.assertEqual([ts for ts, _, _ in forward], [1, 5, 6, 8, 9])
+
+    def test_sharded_pages_match_unsharded_pages(self) -> None:
+        entries = _entries()
+        with mock.patch.object(log_pages, "LOKI_SHARD_SEC", 0):
+            expected, _ = self._walk(entries, 4)
+        # Shards of 1µs: every page spans several shards.
+        with mock.patch.object(log_pages, "plan_log_shards", _micro_shards):
+            pages, calls = self._walk(entries, 4)
+        flat = [(ts, line) for page in pages for ts, _, line in page.entries]
+        self.assertEqual([ts for ts, _ in flat], [ts for page in expected for ts, _, _ in page.entries])
+        self.assertEqual(sorted(flat), sorted((ts, line) for ts, _, line in entries))
+        self.assertGreater(len(calls), len(pages))
+
+    def test_older_shards_are_cancelled_once_newer_shards_fill_the_limit(self) -> None:
+        sec = 1_000_000_000
+        entries = [(BASE_NS + i * sec, {"host": "a"}, f"line {i}") for i in range(10)]
+        fake, calls = _fake_loki(entries)
+        started = []
+
+        async def slow_for_old_shards(loki_url, query, *, start, end, limit, direction):
+            started.append(start)
+            if start < BASE_NS + 8 * sec:
+                await asyncio.sleep(10)
+            return await fake(loki_url, query, start=start, end=end, limit=limit, direction=direction)
+
+        async def run():
+            return await log_pages.fetch_log_entries(
+                "http://loki", '{app="x"}', start_ns=BASE_NS, end_ns=BASE_NS + 10 * sec, limit=2
+            )
+
+        with (
+            mock.patch.object(log_pages, "loki_query_range", new=slow_for_old_shards),
+            mock.patch.object(log_pages, "LOKI_SHARD_SEC", 2),
+            mock.patch.object(log_pages, "LOKI_SHARD_PARALLELISM", 2),
+        ):
+            merged = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+        self.assertEqual([line for _, _, line in merged], ["line 9", "line 8"])
+        self.assertEqual(len(calls), 1)
+        self.assertLess(len(started), 5)
+
+    def test_cursor_round_trips_and_is_bound_to_its_query(self) -> None:
+        cursor = LogCursor(query='{app="x"}', start_ns=1, end_ns=5, seen=frozenset({"ab", "cd"}))
+        self.assertEqual(LogCursor.decode(cursor.encode(), '{app="x"}'), cursor)
+        with self.assertRaisesRegex(ValueError, "does not belong"):
+            LogCursor.decode(cursor.encode(), '{app="y"}')
+        with self.assertRaisesRegex(ValueError, "Invalid cursor"):
+            LogCursor.decode("not-a-cursor", '{app="x"}')
+
+    def test_find_logs_follows_next_cursor_without_overlap(self) -> None:
+        module = importlib.import_module("tools.loki_query")
+        labels = {"env": "prod", "host": "cms-01", "app": "cms"}
+        entries = [(BASE_NS + i * 1000, labels, f"line {i}") for i in range(5)]
+        fake, _ = _fake_loki(entries)
+        window = (
+            datetime.fromtimestamp(BASE_NS / 1e9, tz=timezone.utc),
+            datetime.fromtimestamp(BASE_NS / 1e9 + 60, tz=timezone.utc),
+        )
+        kwargs = dict(loki_environment="prod", log_env="prod", host="cms-01", app="cms", limit=2)
+
+        with (
+            mock.patch.object(module, "resolve_loki_url", return_value=("prod", "http://loki.prod:3100")),
+            mock.patch.object(module, "resolve_time_range", return_value=window),
+            mock.patch.object(log_pages, "loki_query_range", new=fake),
+        ):
+            lines = []
+            result = asyncio.run(module.find_logs(**kwargs))
+            lines += [log["line"] for log in result["logs"]]
+            while result["has_more"]:
+                result = asyncio.run(module.find_logs(**kwargs, cursor=result["next_cursor"]))
+                lines += [log["line"] for log in result["logs"]]
+
+        self.assertEqual(lines, [f"line {i}" for i in reversed(range(5))])
+        self.assertIsNone(result["next_cursor"])
+
+
+if __name__ == "__main__":
+    unittest.main()
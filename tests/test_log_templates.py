@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from infra import log_pages
+from utils.log_templates import TemplateMiner, mask
+
+BASE_NS = 1_774_314_000_000_000_000
+
+
+class LogTemplateTests(unittest.TestCase):
+    def test_mask_replaces_variable_fields(self) -> None:
+        line = (
+            "2026-03-24T01:02:03.456Z req 3f2a8c1e-1d2b-4c3d-9e8f-0a1b2c3d4e5f from 10.1.2.3:8080 "
+            "took 12.5ms addr=0x7ffe token=deadbeef1234 user42"
+        )
+        self.assertEqual(
+            mask(line),
+            "<TS> req <UUID> from <IP> took <NUM>ms addr=<HEX> token=<HEX> user42",
+        )
+
+    def test_near_identical_lines_share_one_template(self) -> None:
+        miner = TemplateMiner()
+        for i in range(100):
+            miner.add(f"ERROR order {i} failed for user u{i % 7} after {i * 3}ms", ts_ns=BASE_NS + i)
+        miner.add("INFO started in 5 seconds", ts_ns=BASE_NS + 500)
+
+        top = miner.top()
+        self.assertEqual(len(top), 2)
+        self.assertEqual(top[0].count, 100)
+        self.assertEqual(top[0].template, "ERROR order <NUM> failed for user <*> after <NUM>ms")
+        self.assertEqual((top[0].first_ns, top[0].last_ns), (BASE_NS, BASE_NS + 99))
+        self.assertEqual(top[0].example, "ERROR order 0 failed for user u0 after 0ms")
+        self.assertEqual(top[1].template, "INFO started in <NUM> seconds")
+
+    def test_dissimilar_lines_with_equal_length_stay_apart(self) -> None:
+        miner = TemplateMiner()
+        miner.add("connection refused by upstream api")
+        miner.add("connection reset by peer socket")
+        miner.add("disk quota exceeded on volume data")
+        self.assertEqual(len(miner.clusters), 3)
+
+    def test_cluster_cap_counts_overflow_lines(self) -> None:
+        miner = TemplateMiner(max_clusters=2)
+        for word in ("alpha beta", "gamma delta", "epsilon zeta"):
+            miner.add(word)
+        self.assertEqual(len(miner.clusters), 2)
+        self.assertEqual((miner.lines, miner.unclustered), (3, 1))
+
+
+class FindLogsSummaryTests(unittest.TestCase):
+    def test_summarize_scans_several_pages_and_returns_templates(self) -> None:
+        module = importlib.import_module("tools.loki_query")
+        labels = {"env": "prod", "host": "cms-01", "app": "cms"}
+        entries = [(BASE_NS + i * 1000, labels, f"timeout calling svc after {i}ms") for i in range(30)]
+        entries += [(BASE_NS + i * 1000 + 500, labels, f"user {i} logged in") for i in range(10)]
+        calls = []
+
+        async def query_range(loki_url, query, *, start, end, limit, direction):
+            calls.append(limit)
+            selected = sorted((e for e in entries if start <= e[0] < end), key=lambda e: e[0], reverse=True)[:limit]
+            values = [[str(ts), line] for ts, _, line in selected]
+            return {"data": {"result": [{"stream": labels, "values": values}] if values else []}}
+
+        window = (
+            datetime.fromtimestamp(BASE_NS / 1e9, tz=timezone.utc),
+            datetime.fromtimestamp(BASE_NS / 1e9 + 60, tz=timezone.utc),
+        )
+        kwargs = dict(loki_environment="prod", log_env="prod", host="cms-01", app="cms", summarize=True)
+        with (
+            mock.patch.object(module, "resolve_loki_url", return_value=("prod", "http://loki.prod:3100")),
+            mock.patch.object(module, "resolve_time_range", return_value=window),
+            mock.patch.object(module, "SUMMARY_PAGE_SIZE", 8),
+            mock.patch.object(log_pages, "loki_query_range", new=query_range),
+        ):
+            full = asyncio.run(module.find_logs(**kwargs))
+            partial = asyncio.run(module.find_logs(**kwargs, scan_limit=16, limit=1))
+            rest = asyncio.run(module.find_logs(**kwargs, cursor=partial["next_cursor"]))
+            uneven = asyncio.run(module.find_logs(**kwargs, scan_limit=13))
+            uneven_rest = asyncio.run(module.find_logs(**kwargs, cursor=uneven["next_cursor"]))
+
+        self.assertEqual(full["mode"], "templates")
+        self.assertEqual(full["lines_scanned"], 40)
+        self.assertFalse(full["has_more"])
+        self.assertEqual(
+            [(t["template"], t["count"]) for t in full["templates"]],
+            [("timeout calling svc after <NUM>ms", 30), ("user <NUM> logged in", 10)],
+        )
+        self.assertTrue(full["templates"][0]["first_timestamp"].endswith("Z"))
+        self.assertGreater(len(calls), 5)
+
+        self.assertEqual(partial["lines_scanned"], 16)
+        self.assertEqual(len(partial["templates"]), 1)
+        self.assertTrue(partial["has_more"])
+        self.assertEqual(rest["lines_scanned"], 24)
+
+        self.assertEqual(uneven["lines_scanned"], 13)
+        self.assertEqual(uneven_rest["lines_scanned"], 27)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest import mock
+
+from infra import loki_label_index as index
+from infra.loki_label_index import LokiLabelIndex
+
+
+class LokiLabelIndexTests(unittest.TestCase):
+    def test_snapshot_precomputes_every_filter_combination(self) -> None:
+        snapshot = index.build_snapshot(
+            {
+                ("prod", "cms-01", "cms"): 0.0,
+                ("prod", "api-01", "api"): 0.0,
+                ("dev", "cms-09", "cms"): 0.0,
+                ("prod", "", "x"): 0.0,
+            },
+            built_at=100.0,
+            window_sec=3600,
+        )
+        self.assertEqual(snapshot.hosts_for(), ["api-01", "cms-01", "cms-09"])
+        self.assertEqual(snapshot.hosts_for("prod"), ["api-01", "cms-01"])
+        self.assertEqual(snapshot.hosts_for(app="cms"), ["cms-01", "cms-09"])
+        self.assertEqual(snapshot.apps_for("prod"), ["api", "cms", "x"])
+        self.assertEqual(snapshot.apps_for("prod", "cms-01"), ["cms"])
+        self.assertEqual(snapshot.hosts_for("staging"), [])
+
+    def test_refresh_is_incremental_and_drops_streams_outside_the_window(self) -> None:
+        clock = [10_000.0]
+        calls = []
+
+        async def fake_series(loki_url, *, selectors, start, end):
+            calls.append((start.timestamp(), end.timestamp()))
+            if end.timestamp() <= 10_000:
+                # Initial build: old-01 only logged at the start of the window.
+                hosts = ["old-01", "cms-01"] if start.timestamp() == 9_400 else ["cms-01"]
+            else:
+                hosts = ["cms-01", "new-01"]
+            return [{"env": "prod", "host": host, "app": "cms"} for host in hosts]
+
+        idx = LokiLabelIndex(window_sec=600, refresh_sec=60)
+
+        async def run():
+            first = await idx.snapshot("prod", "http://loki")
+            clock[0] += 700
+            await idx._snapshots.refresh("prod", "http://loki")
+            return first, await idx.snapshot("prod", "http://loki")
+
+        with (
+            mock.patch.object(index, "loki_series", new=fake_series),
+            mock.patch.object(index.time, "time", side_effect=lambda: clock[0]),
+        ):
+            first, refreshed = asyncio.run(run())
+
+        self.assertEqual(first.hosts_for("prod"), ["cms-01", "old-01"])
+        self.assertEqual(refreshed.hosts_for("prod"), ["cms-01", "new-01"])
+        self.assertEqual(sorted(calls[:6]), [(9_400 + i * 100, 9_500 + i * 100) for i in range(6)])
+        self.assertEqual(calls[6], (10_700 - 600, 10_700))
+
+    def test_apps_from_streams_without_a_host_label_are_indexed(self) -> None:
+        selectors_seen = []
+
+        async def fake_series(loki_url, *, selectors, start, end):
+            selectors_seen.append(tuple(selectors))
+            streams = [{"env": "prod", "host": "cms-01", "app": "cms"}]
+            if '{app=~".+"}' in selectors:
+                streams.append({"env": "prod", "app": "batch"})
+            return streams
+
+        idx = LokiLabelIndex(window_sec=600, refresh_sec=60)
+        with mock.patch.object(index, "loki_series", new=fake_series):
+            snapshot = asyncio.run(idx.snapshot("prod", "http://loki"))
+
+        self.assertEqual(len(selectors_seen), index.FULL_BUILD_SLICES)
+        self.assertEqual(snapshot.apps_for("prod"), ["batch", "cms"])
+        self.assertEqual(snapshot.hosts_for("prod"), ["cms-01"])
+
+    def test_first_incremental_refresh_keeps_streams_seen_late_in_the_initial_build(self) -> None:
+        clock = [10_000.0]
+
+        async def fake_series(loki_url, *, selectors, start, end):
+            if end.timestamp() > 10_000:
+                return [{"env": "prod", "host": "b", "app": "cms"}]
+            hosts = {9_400: ["old", "b"], 9_900: ["a", "b"]}.get(int(start.timestamp()), ["b"])
+            return [{"env": "prod", "host": host, "app": "cms"} for host in hosts]
+
+        idx = LokiLabelIndex(window_sec=600, refresh_sec=60)
+
+        async def run():
+            first = await idx.snapshot("prod", "http://loki")
+            clock[0] += 60
+            await idx._snapshots.refresh("prod", "http://loki")
+            return first, await idx.snapshot("prod", "http://loki")
+
+        with (
+            mock.patch.object(index, "loki_series", new=fake_series),
+            mock.patch.object(index.time, "time", side_effect=lambda: clock[0]),
+        ):
+            first, refreshed = asyncio.run(run())
+
+        self.assertEqual(first.hosts_for("prod"), ["a", "b", "old"])
+        # `a` logged in the last slice of the build and stays; `old` aged out of the window.
+        self.assertEqual(refreshed.hosts_for("prod"), ["a", "b"])
+
+    def test_failed_background_refresh_keeps_previous_snapshot(self) -> None:
+        clock = [10_000.0]
+        fetch = mock.AsyncMock(
+            side_effect=[[{"env": "prod", "host": "cms-01", "app": "cms"}]] * index.FULL_BUILD_SLICES + [RuntimeError("down")]
+        )
+        idx = LokiLabelIndex(window_sec=600, refresh_sec=60)
+
+        async def run():
+            await idx.snapshot("prod", "http://loki")
+            clock[0] += 90
+            await idx.snapshot("prod", "http://loki")
+            await asyncio.gather(idx._snapshots.refresh("prod", "http://loki"), return_exceptions=True)
+            return await idx.snapshot("prod", "http://loki")
+
+        with (
+            mock.patch.object(index, "loki_series", new=fetch),
+            mock.patch.object(index.time, "time", side_effect=lambda: clock[0]),
+            self.assertLogs("prom-mcp", level="WARNING"),
+        ):
+            snapshot = asyncio.run(run())
+
+        self.assertEqual(snapshot.hosts_for(), ["cms-01"])
+        self.assertEqual(snapshot.age_sec(10_090), 90)
+
+    def test_snapshot_older_than_max_age_waits_for_the_refresh(self) -> None:
+        clock = [10_000.0]
+        fetch = mock.AsyncMock(
+            side_effect=[[{"env": "prod", "host": "cms-01", "app": "cms"}]] * index.FULL_BUILD_SLICES
+            + [[{"env": "prod", "host": "cms-02", "app": "cms"}]]
+        )
+        idx = LokiLabelIndex(window_sec=600, refresh_sec=60)
+
+        async def run():
+            await idx.snapshot("prod", "http://loki")
+            clock[0] += 300
+            return await idx.snapshot("prod", "http://loki")
+
+        with (
+            mock.patch.object(index, "loki_series", new=fetch),
+            mock.patch.object(index.time, "time", side_effect=lambda: clock[0]),
+        ):
+            snapshot = asyncio.run(run())
+
+        self.assertEqual(snapshot.hosts_for(), ["cms-01", "cms-02"])
+        self.assertEqual(snapshot.age_sec(clock[0]), 0)
+
+    def test_failed_refresh_past_max_age_raises_instead_of_serving_stale(self) -> None:
+        clock = [10_000.0]
+        fetch = mock.AsyncMock(
+            side_effect=[[{"env": "prod", "host": "cms-01", "app": "cms"}]] * index.FULL_BUILD_SLICES + [RuntimeError("down")]
+        )
+        idx = LokiLabelIndex(window_sec=600, refresh_sec=60)
+
+        async def run():
+            await idx.snapshot("prod", "http://loki")
+            clock[0] += 120
+            await idx.snapshot("prod", "http://loki")
+
+        with (
+            mock.patch.object(index, "loki_series", new=fetch),
+            mock.patch.object(index.time, "time", side_effect=lambda: clock[0]),
+            self.assertLogs("prom-mcp", level="WARNING"),
+            self.assertRaises(RuntimeError),
+        ):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
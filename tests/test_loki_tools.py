@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import importlib
 import unittest
 from datetime import datetime, timezone
@@ -53,15 +54,17 @@ class LokiToolsTests(unittest.TestCase):
                     datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc),
                 ),
             ),
-            mock.patch.object(module, "loki_query_range", return_value=payload),
+            mock.patch("infra.log_pages.loki_query_range", return_value=payload),
         ):
-            result = module.find_logs(
-                loki_environment="prod",
-                log_env="prod",
-                host="cms-01",
-                app="cms",
-                hours=1,
-                contains="timeout",
+            result = asyncio.run(
+                module.find_logs(
+                    loki_environment="prod",
+                    log_env="prod",
+                    host="cms-01",
+                    app="cms",
+                    hours=1,
+                    contains="timeout",
+                )
             )
 
         self.assertEqual(result["line_count"], 1)
@@ -70,7 +73,35 @@ class LokiToolsTests(unittest.TestCase):
         self.assertTrue(result["logs"][0]["timestamp"].endswith("Z"))
         self.assertIn("+07:00", result["logs"][0]["timestamp_jakarta"])
 
-    def test_list_loki_hosts_uses_one_hour_default_window(self) -> None:
+    def test_list_loki_hosts_answers_default_window_from_label_index(self) -> None:
+        module = importlib.import_module("tools.loki_query")
+        index = importlib.import_module("infra.loki_label_index")
+        series = [
+            {"env": "prod", "host": "cms-02", "app": "cms"},
+            {"env": "prod", "host": "cms-01", "app": "cms"},
+            {"env": "prod", "host": "api-01", "app": "api"},
+            {"env": "dev", "host": "cms-09", "app": "cms"},
+        ]
+        fresh = index.LokiLabelIndex(window_sec=3600, refresh_sec=60)
+
+        with (
+            mock.patch.object(module, "resolve_loki_url", return_value=("prod", "http://loki.prod:3100")),
+            mock.patch.object(module, "loki_label_index", fresh),
+            mock.patch.object(index, "loki_series", new=mock.AsyncMock(return_value=series)) as fetch,
+            mock.patch.object(module, "loki_label_values") as live,
+        ):
+            first = asyncio.run(module.list_loki_hosts(loki_environment="prod", log_env="prod", app="cms"))
+            second = asyncio.run(module.list_loki_apps(loki_environment="prod", log_env="prod"))
+
+        self.assertEqual(first["hosts"], ["cms-01", "cms-02"])
+        self.assertEqual(second["apps"], ["api", "cms"])
+        self.assertEqual(first["index"]["source"], "memory")
+        self.assertIn("age_sec", second["index"])
+        # One initial build (in slices); the second call is served from memory.
+        self.assertEqual(fetch.await_count, index.FULL_BUILD_SLICES)
+        live.assert_not_called()
+
+    def test_list_loki_hosts_queries_live_for_custom_window(self) -> None:
         module = importlib.import_module("tools.loki_query")
 
         with (
@@ -85,10 +116,11 @@ class LokiToolsTests(unittest.TestCase):
             ) as resolve_range,
             mock.patch.object(module, "loki_label_values", return_value=["cms-02", "cms-01", "cms-01"]),
         ):
-            result = module.list_loki_hosts(loki_environment="prod", log_env="prod", app="cms")
+            result = asyncio.run(module.list_loki_hosts(loki_environment="prod", log_env="prod", app="cms", hours=6))
 
         self.assertEqual(result["hosts"], ["cms-01", "cms-02"])
-        self.assertEqual(resolve_range.call_args.kwargs["hours"], module.DEFAULT_DISCOVERY_HOURS)
+        self.assertEqual(result["index"], {"source": "live"})
+        self.assertEqual(resolve_range.call_args.kwargs["hours"], 6)
 
     def test_list_loki_apps_uses_label_filters(self) -> None:
         module = importlib.import_module("tools.loki_query")
@@ -105,11 +137,90 @@ class LokiToolsTests(unittest.TestCase):
             ),
             mock.patch.object(module, "loki_label_values", return_value=["api", "web"]),
         ):
-            result = module.list_loki_apps(loki_environment="prod", log_env="prod", host="cms-01")
+            result = asyncio.run(
+                module.list_loki_apps(loki_environment="prod", log_env="prod", host="cms-01", minutes=30)
+            )
 
         self.assertEqual(result["apps"], ["api", "web"])
         self.assertEqual(result["filters"], {"log_env": "prod", "host": "cms-01"})
 
+    def test_aggregate_logs_counts_inside_loki_and_totals_per_group(self) -> None:
+        module = importlib.import_module("tools.loki_query")
+        payload = {
+            "status": "success",
+            "data": {
+                "resultType": "matrix",
+                "result": [
+                    {"metric": {"app": "api"}, "values": [[1711242000, "3"], [1711242300, "5"]]},
+                    {"metric": {"app": "web"}, "values": [[1711242300, "40"]]},
+                ],
+            },
+        }
+
+        with (
+            mock.patch.object(module, "resolve_loki_url", return_value=("prod", "http://loki.prod:3100")),
+            mock.patch.object(
+                module,
+                "resolve_time_range",
+                return_value=(
+                    datetime(2026, 3, 23, 2, 0, tzinfo=timezone.utc),
+                    datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc),
+                ),
+            ),
+            mock.patch.object(module, "loki_query_range", return_value=payload) as query_range,
+        ):
+            result = asyncio.run(
+                module.aggregate_logs(
+                    loki_environment="prod", log_env="prod", days=1, by=["app"], level="error", top_n=1
+                )
+            )
+
+        self.assertEqual(
+            query_range.call_args.args[1],
+            'sum by (app) (count_over_time({env="prod"} |= "error" [5m]))',
+        )
+        self.assertEqual(query_range.call_args.kwargs["step"], "5m")
+        self.assertEqual(result["series_count"], 2)
+        self.assertEqual(result["total_lines"], 48)
+        self.assertEqual(len(result["results"]), 1)
+        self.assertEqual(result["results"][0]["metric"], {"app": "web"})
+        self.assertEqual(result["results"][0]["summary"]["total_lines"], 40)
+
+    def test_aggregate_logs_rate_totals_scale_by_step(self) -> None:
+        module = importlib.import_module("tools.loki_query")
+        payload = {"data": {"result": [{"metric": {}, "values": [[1711242000, "0.5"], [1711242060, "0.25"]]}]}}
+
+        with (
+            mock.patch.object(module, "resolve_loki_url", return_value=("prod", "http://loki.prod:3100")),
+            mock.patch.object(module, "loki_query_range", return_value=payload) as query_range,
+        ):
+            result = asyncio.run(
+                module.aggregate_logs(
+                    loki_environment="prod", log_env="prod", host="cms-01", aggregation="rate", step="1m"
+                )
+            )
+
+        self.assertEqual(query_range.call_args.args[1], 'sum (rate({env="prod",host="cms-01"} [1m]))')
+        self.assertEqual(result["total_lines"], 45)
+
+    def test_aggregate_logs_rejects_bad_inputs_before_querying(self) -> None:
+        module = importlib.import_module("tools.loki_query")
+
+        with (
+            mock.patch.object(module, "resolve_loki_url", return_value=("prod", "http://loki.prod:3100")),
+            mock.patch.object(module, "loki_query_range") as query_range,
+        ):
+            for kwargs in (
+                {"aggregation": "sum"},
+                {"by": ["app) or vector(1"]},
+                {"days": 30, "step": "1m"},
+            ):
+                with self.subTest(**{k: str(v) for k, v in kwargs.items()}):
+                    with self.assertRaises(ValueError):
+                        asyncio.run(module.aggregate_logs(loki_environment="prod", log_env="prod", **kwargs))
+
+        query_range.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import threading
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from core.metrics import MetricsRegistry, Stopwatch, metrics, start_metrics_server
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        body = json.dumps({"status": "success", "data": {"resultType": "vector", "result": []}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        return
+
+
+def _labels(entries, **labels):
+    return [entry for entry in entries if all(entry["labels"].get(k) == v for k, v in labels.items())]
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_counters_gauges_and_histograms(self) -> None:
+        registry = MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+        registry.inc("calls_total", tool="a")
+        registry.inc("calls_total", tool="a")
+        with registry.in_flight("in_flight", tool="a"):
+            self.assertEqual(registry.snapshot()["gauges"]["in_flight"][0]["value"], 1)
+        for seconds in (0.005, 0.05, 0.05, 0.5):
+            registry.observe("stage_seconds", seconds, stage="x")
+
+        snap = registry.snapshot()
+        self.assertEqual(snap["counters"]["calls_total"], [{"labels": {"tool": "a"}, "value": 2.0}])
+        self.assertEqual(snap["gauges"]["in_flight"][0]["value"], 0)
+        hist = snap["histograms"]["stage_seconds"][0]
+        self.assertEqual(hist["count"], 4)
+        self.assertAlmostEqual(hist["avg_ms"], 151.25)
+        self.assertTrue(10 <= hist["p50_ms"] <= 100)
+
+        text = registry.render_prometheus()
+        self.assertIn('calls_total{tool="a"} 2', text)
+        self.assertIn('stage_seconds_bucket{stage="x",le="0.1"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="x",le="+Inf"} 4', text)
+        self.assertIn('stage_seconds_count{stage="x"} 4', text)
+
+    def test_stopwatch_records_one_observation_for_many_sections(self) -> None:
+        registry = MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+        clock = Stopwatch("processing_seconds", stage="x")
+        for n in range(5):
+            self.assertEqual(clock.call(pow, n, 2), n * n)
+        clock.record(registry)
+
+        hist = registry.snapshot()["histograms"]["processing_seconds"][0]
+        self.assertEqual(hist["labels"], {"stage": "x"})
+        self.assertEqual(hist["count"], 1)
+
+    def test_run_check_records_summarize_time_once_per_check(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            for i in range(10):
+                yield {"metric": {"instance": f"{i}:9100"}, "values": [[1711249200, "1"]]}
+
+        metrics.reset()
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            result = asyncio.run(module.run_check("cpu_avg_pct", hours=1))
+
+        self.assertEqual(result["series_count"], 10)
+        hist = _labels(metrics.snapshot()["histograms"]["mcp_processing_seconds"], stage="summarize_series")
+        self.assertEqual(hist[0]["count"], 1)
+
+    def test_tool_calls_record_execute_and_serialize_stages(self) -> None:
+        importlib.import_module("tools.catalog")
+        server = importlib.import_module("core.server")
+        metrics.reset()
+
+        asyncio.run(server.mcp.call_tool("list_checks", {}))
+
+        snap = metrics.snapshot()
+        self.assertEqual(
+            _labels(snap["counters"]["mcp_tool_calls_total"], tool="list_checks")[0]["labels"]["outcome"], "ok"
+        )
+        stages = {entry["labels"]["stage"] for entry in _labels(snap["histograms"]["mcp_tool_stage_seconds"], tool="list_checks")}
+        self.assertEqual(stages, {"execute", "serialize", "total"})
+
+    def test_backend_requests_are_traced_by_stage(self) -> None:
+        async_http = importlib.import_module("infra.async_http")
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), _JsonHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/api/v1/query"
+        metrics.reset()
+        try:
+            asyncio.run(async_http.fetch_json(url, timeout=5))
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+        snap = metrics.snapshot()
+        self.assertEqual(
+            snap["counters"]["mcp_backend_requests_total"],
+            [{"labels": {"backend": "prometheus", "status": "200"}, "value": 1.0}],
+        )
+        stages = {entry["labels"]["stage"] for entry in snap["histograms"]["mcp_backend_stage_seconds"]}
+        self.assertTrue({"connect", "server", "download", "decode", "request"} <= stages)
+        self.assertEqual(snap["gauges"]["mcp_backend_in_flight"][0]["value"], 0)
+
+    def test_metrics_server_binds_loopback_by_default(self) -> None:
+        metrics.inc("mcp_test_scrapes_total")
+        server = start_metrics_server(0)
+        try:
+            host, port = server.server_address[:2]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(host, "127.0.0.1")
+        self.assertIn("mcp_test_scrapes_total", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
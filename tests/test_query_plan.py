@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import unittest
+
+from domain.checks import CHECKS
+from utils.query_plan import CHECK_ID_LABEL, metric_families, plan_check_batches, split_check_tag
+
+
+class QueryPlanTests(unittest.TestCase):
+    def test_groups_checks_by_metric_family(self) -> None:
+        checks = [CHECKS[i] for i in ("tcp_established", "tcp_time_wait", "up", "tcp_inuse", "tcp_retrans_per_sec")]
+
+        batches = plan_check_batches(checks, lambda c: c.promql, max_batch_size=8)
+
+        self.assertEqual(
+            [b.check_ids for b in batches],
+            [("tcp_established", "tcp_retrans_per_sec"), ("tcp_time_wait", "tcp_inuse"), ("up",)],
+        )
+        self.assertEqual(batches[2].promql, "up")
+        self.assertEqual(batches[1].promql.count(" or "), 1)
+        self.assertIn(
+            f'label_replace({CHECKS["tcp_inuse"].promql}, "{CHECK_ID_LABEL}", "tcp_inuse", "", "")',
+            batches[1].promql,
+        )
+
+    def test_metric_families_ignore_functions_labels_and_ranges(self) -> None:
+        self.assertEqual(metric_families(CHECKS["pg_cache_hit_pct"].promql), ("pg_stat",))
+        self.assertEqual(metric_families(CHECKS["cpu_peak_pct"].promql), ("node_cpu",))
+        self.assertEqual(metric_families(CHECKS["mem_used_pct"].promql), ("node_memory",))
+        self.assertEqual(metric_families("rate(a_b_total[5m]) / on (instance) c_d"), ("a_b", "c_d"))
+
+    def test_respects_max_batch_size(self) -> None:
+        checks = [CHECKS[i] for i in ("tcp_established", "tcp_time_wait", "tcp_inuse", "tcp_orphan")]
+
+        batches = plan_check_batches(checks, lambda c: c.promql, max_batch_size=1)
+
+        self.assertEqual(len(batches), 4)
+        self.assertFalse(any(b.coalesced for b in batches))
+
+    def test_split_check_tag_does_not_mutate_input(self) -> None:
+        series = {"metric": {"instance": "a", CHECK_ID_LABEL: "tcp_inuse"}, "values": [[1, "2"]]}
+
+        check_id, untagged = split_check_tag(series)
+
+        self.assertEqual(check_id, "tcp_inuse")
+        self.assertEqual(untagged, {"metric": {"instance": "a"}, "values": [[1, "2"]]})
+        self.assertIn(CHECK_ID_LABEL, series["metric"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import unittest
+
+from infra.range_chunks import (
+    Chunk,
+    chunk_seconds_for_step,
+    contiguous_runs,
+    plan_chunks,
+    split_matrix,
+    stitch_matrices,
+)
+
+
+class RangeChunkTests(unittest.TestCase):
+    def test_chunk_seconds_is_multiple_of_step(self) -> None:
+        self.assertEqual(chunk_seconds_for_step(300, 3600), 3600)
+        self.assertEqual(chunk_seconds_for_step(420, 3600), 3360)
+        self.assertEqual(chunk_seconds_for_step(86400, 3600), 86400)
+
+    def test_plan_chunks_extends_leading_chunk_and_caps_trailing_chunk(self) -> None:
+        chunks = plan_chunks(1800, 9000, step_seconds=300, chunk_seconds=3600)
+
+        self.assertEqual(chunks, [Chunk(0, 3300), Chunk(3600, 6900), Chunk(7200, 9000)])
+
+    def test_contiguous_runs(self) -> None:
+        self.assertEqual(contiguous_runs([0, 1, 3, 5, 6]), [(0, 1), (3, 3), (5, 6)])
+
+    def test_split_and_stitch_round_trip_by_label_set(self) -> None:
+        chunks = [Chunk(0, 60), Chunk(120, 180)]
+        matrix = [
+            {"metric": {"b": "2"}, "values": [[0, "1"], [60, "2"], [120, "3"]]},
+            {"metric": {"a": "1"}, "values": [[180, "9"]]},
+        ]
+
+        parts = split_matrix(matrix, chunks)
+        self.assertEqual(len(parts[0]), 1)
+        self.assertEqual(len(parts[1]), 2)
+
+        stitched = stitch_matrices(parts, start_ts=60, end_ts=180)
+        self.assertEqual(
+            stitched,
+            [
+                {"metric": {"a": "1"}, "values": [[180, "9"]]},
+                {"metric": {"b": "2"}, "values": [[60, "2"], [120, "3"]]},
+            ],
+        )
+        self.assertEqual(parts[0][0]["values"], [[0, "1"], [60, "2"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
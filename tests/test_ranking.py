@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import random
+import unittest
+from unittest import mock
+
+from utils.ranking import TopN, rank_value, validate_ranking
+
+
+def _item(name: str, **summary) -> dict:
+    return {"metric": {"instance": name}, "summary": {"count": 1, **summary}}
+
+
+class TopNTests(unittest.TestCase):
+    def test_keeps_only_the_worst_series_in_descending_order(self) -> None:
+        rng = random.Random(7)
+        items = [_item(f"h{i}", max=rng.uniform(0, 100)) for i in range(500)]
+        ranking = TopN(5, "max")
+        for item in items:
+            ranking.push(item)
+
+        expected = sorted(items, key=lambda item: item["summary"]["max"], reverse=True)[:5]
+        self.assertEqual(ranking.items(), expected)
+        self.assertEqual(ranking.total, 500)
+        self.assertEqual(ranking.describe(), {"top_n": 5, "order_by": "max", "returned": 5})
+
+    def test_ties_prefer_earlier_series_and_empty_series_rank_last(self) -> None:
+        ranking = TopN(2, "avg")
+        for item in (_item("a", avg=1.0), {"metric": {}, "summary": {"count": 0}}, _item("b", avg=1.0), _item("c", avg=1.0)):
+            ranking.push(item)
+
+        self.assertEqual([item["metric"]["instance"] for item in ranking.items()], ["a", "b"])
+
+    def test_sustain_orders_by_critical_then_warning_duration(self) -> None:
+        def sustained(warn: float, crit: float) -> dict:
+            return _item(
+                "x",
+                sustain={"warning": {"max_duration_sec": warn}, "critical": {"max_duration_sec": crit}},
+            )
+
+        self.assertGreater(rank_value(sustained(0, 60), "sustain"), rank_value(sustained(3600, 0), "sustain"))
+        self.assertGreater(rank_value(sustained(600, 60), "sustain"), rank_value(sustained(300, 60), "sustain"))
+        # Long critical breaches must not swallow warning tie-breaks.
+        long_crit = 200 * 86400
+        self.assertGreater(rank_value(sustained(61, long_crit), "sustain"), rank_value(sustained(60, long_crit), "sustain"))
+
+    def test_without_limit_keeps_everything_in_arrival_order(self) -> None:
+        ranking = TopN(None)
+        items = [_item("a", max=1), _item("b", max=5)]
+        for item in items:
+            ranking.push(item)
+        self.assertEqual(ranking.items(), items)
+        self.assertIsNone(ranking.describe())
+
+    def test_validation(self) -> None:
+        with self.assertRaises(ValueError):
+            validate_ranking(0, "max", has_sustain=False)
+        with self.assertRaises(ValueError):
+            validate_ranking(5, "median", has_sustain=False)
+        with self.assertRaises(ValueError):
+            validate_ranking(5, "sustain", has_sustain=False)
+        validate_ranking(None, "median", has_sustain=False)
+
+    def test_run_check_returns_top_n_with_total_series_count(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            for i in range(50):
+                yield {"metric": {"instance": f"h{i}:9100"}, "values": [[1711249200, str(i)]]}
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            result = asyncio.run(module.run_check("cpu_avg_pct", hours=1, top_n=3, order_by="last"))
+
+        self.assertEqual(result["series_count"], 50)
+        self.assertEqual(result["ranking"], {"top_n": 3, "order_by": "last", "returned": 3})
+        self.assertEqual([item["summary"]["last"] for item in result["results"]], [49.0, 48.0, 47.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
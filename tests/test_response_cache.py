@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+import infra.response_cache as response_cache
+from infra.response_cache import ResponseCache
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used_entry_when_entry_limit_is_exceeded(self) -> None:
+        cache = ResponseCache(max_entries=2, max_bytes=1000)
+        cache.put("a", 1, size=10, ttl=60)
+        cache.put("b", 2, size=10, ttl=60)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3, size=10, ttl=60)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_evicts_until_byte_budget_fits(self) -> None:
+        cache = ResponseCache(max_entries=10, max_bytes=100)
+        cache.put("a", 1, size=40, ttl=60)
+        cache.put("b", 2, size=40, ttl=60)
+        cache.put("c", 3, size=50, ttl=60)
+
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["bytes"], 90)
+        self.assertIsNone(cache.get("a"))
+
+    def test_skips_values_larger_than_byte_budget(self) -> None:
+        cache = ResponseCache(max_entries=10, max_bytes=100)
+        cache.put("a", 1, size=101, ttl=60)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_expired_entries_count_as_miss(self) -> None:
+        cache = ResponseCache(max_entries=10, max_bytes=100)
+        with mock.patch.object(response_cache.time, "monotonic", return_value=100.0):
+            cache.put("a", 1, size=1, ttl=5)
+        with mock.patch.object(response_cache.time, "monotonic", return_value=106.0):
+            self.assertIsNone(cache.get("a"))
+
+        stats = cache.stats()
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
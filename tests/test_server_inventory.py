@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from core.fanout import fan_out_environments
+from infra import server_inventory as inventory
+from infra.server_inventory import ServerInventory, TargetFilter, build_inventory, resolve_target
+
+UP_SERIES = [
+    {"metric": {"instance": "10.0.0.1:9100", "job": "node", "server_name": "web-01"}, "value": [0, "1"]},
+    {"metric": {"instance": "10.0.0.1:9256", "job": "process", "server_name": "web-01"}, "value": [0, "1"]},
+    {"metric": {"instance": "10.0.0.2:9100", "job": "node", "server_name": "db-01"}, "value": [0, "0"]},
+    {"metric": {"instance": "10.0.0.2:9100", "job": "node", "server_name": "db-01"}, "value": [0, "0"]},
+    {"metric": {"instance": "10.0.0.3:9100", "job": "node", "server_name": ""}, "value": [0, "1"]},
+]
+
+
+def _fake_backend(series=UP_SERIES, groups=("java", "nginx")):
+    calls = []
+
+    async def query_instant(prom_url, query, at):
+        calls.append(prom_url)
+        return {"data": {"result": list(series)}}
+
+    async def label_values(prom_url, label, match=None):
+        return list(groups)
+
+    return calls, mock.patch.multiple(inventory, prom_query_instant=query_instant, prom_label_values=label_values)
+
+
+class ServerInventoryTests(unittest.TestCase):
+    def test_build_inventory_dedupes_targets_and_skips_unnamed(self) -> None:
+        snapshot = build_inventory(UP_SERIES, ["java", "", "java"], built_at=0.0)
+        self.assertEqual(len(snapshot.servers), 3)
+        self.assertEqual(snapshot.server_names, ["db-01", "web-01"])
+        self.assertEqual(snapshot.servers[2]["up"], 0.0)
+        self.assertEqual(snapshot.process_groups, ["java"])
+
+    def test_resolve_target_canonicalizes_and_suggests(self) -> None:
+        snapshot = build_inventory(UP_SERIES, [], built_at=0.0)
+        self.assertEqual(resolve_target(snapshot, server_name="WEB-01", instance=None), ("web-01", None))
+        self.assertEqual(resolve_target(snapshot, server_name=None, instance="10.0.0.2"), (None, "10.0.0.2:9100"))
+        self.assertEqual(
+            resolve_target(snapshot, server_name="web-01", instance="10.0.0.1:9100"), ("web-01", "10.0.0.1:9100")
+        )
+        with self.assertRaisesRegex(ValueError, "Did you mean: web-01"):
+            resolve_target(snapshot, server_name="web-1", instance=None)
+        with self.assertRaisesRegex(ValueError, "several targets"):
+            resolve_target(snapshot, server_name=None, instance="10.0.0.1")
+        with self.assertRaisesRegex(ValueError, "does not belong to server_name 'web-01'"):
+            resolve_target(snapshot, server_name="web-01", instance="10.0.0.2:9100")
+
+    def test_resolve_filter_passes_unknown_targets_through(self) -> None:
+        idx = ServerInventory(refresh_sec=60)
+
+        async def query_instant(prom_url, query, at):
+            series = UP_SERIES if "prod" in prom_url else []
+            return {"data": {"result": series}}
+
+        async def label_values(prom_url, label, match=None):
+            return []
+
+        def resolve(env_key, **filters):
+            return asyncio.run(idx.resolve_filter(env_key, f"http://prom.{env_key}", **filters))
+
+        with mock.patch.multiple(inventory, prom_query_instant=query_instant, prom_label_values=label_values):
+            canonical = resolve("prod", server_name="Web-01", instance=None)
+            missing_env = resolve("dr", server_name="Web-01", instance=None)
+            unknown = resolve("prod", server_name="web-1", instance=None)
+            unnamed = resolve("prod", server_name=None, instance="10.0.0.3:9100")
+            with self.assertRaisesRegex(ValueError, "several targets"):
+                resolve("prod", server_name=None, instance="10.0.0.1")
+
+        self.assertEqual(canonical, TargetFilter("web-01", None))
+        self.assertEqual(missing_env, TargetFilter("Web-01", None, note="Unknown server_name 'Web-01'."))
+        self.assertEqual(unknown.server_name, "web-1")
+        self.assertIn("Did you mean: web-01", unknown.note)
+        self.assertEqual(unnamed.as_dict(), {"server_name": None, "instance": "10.0.0.3:9100"})
+
+    def test_historical_window_is_not_checked_against_inventory(self) -> None:
+        idx = ServerInventory(refresh_sec=60)
+        calls, patch_backend = _fake_backend()
+        end = datetime.now(timezone.utc) - timedelta(days=30)
+        with patch_backend:
+            target = asyncio.run(idx.resolve_filter("prod", "http://p", server_name="WEB-01", instance=None, end=end))
+
+        self.assertEqual(calls, [])
+        self.assertEqual(target, TargetFilter("WEB-01", None))
+
+    def test_inventory_outage_keeps_requested_filters(self) -> None:
+        idx = ServerInventory(refresh_sec=60)
+        failing = mock.AsyncMock(side_effect=RuntimeError("down"))
+        with (
+            mock.patch.object(inventory, "prom_query_instant", new=failing),
+            mock.patch.object(inventory, "prom_label_values", new=mock.AsyncMock(return_value=[])),
+            self.assertLogs("prom-mcp", level="WARNING"),
+        ):
+            target = asyncio.run(idx.resolve_filter("prod", "http://p", server_name="web-1", instance=None))
+        self.assertEqual(target.server_name, "web-1")
+
+    def test_slow_inventory_is_bounded_by_its_environment_timeout(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+
+        async def query_instant(prom_url, query, at):
+            if "dr" in prom_url:
+                await asyncio.sleep(1)
+            return {"data": {"result": list(UP_SERIES)}}
+
+        async def label_values(prom_url, label, match=None):
+            return []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            yield {"metric": {"instance": "10.0.0.2:9100"}, "values": [[1711249200, "1"]]}
+
+        with (
+            mock.patch.multiple(inventory, prom_query_instant=query_instant, prom_label_values=label_values),
+            mock.patch.object(module, "server_inventory", ServerInventory(refresh_sec=60)),
+            mock.patch.object(
+                module, "resolve_prom_urls", return_value=[("prod", "http://prom.prod"), ("dr", "http://prom.dr")]
+            ),
+            mock.patch.object(module, "fan_out_environments", functools.partial(fan_out_environments, timeout=0.1)),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            t0 = time.perf_counter()
+            result = asyncio.run(module.run_check("load15_avg", hours=1, server_name="db-01", environment="all"))
+            elapsed = time.perf_counter() - t0
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(result["failed_environments"], ["dr"])
+        prod = next(item for item in result["results"] if item["environment"] == "prod")
+        self.assertEqual(prod["series_count"], 1)
+
+    def test_list_servers_and_process_groups_answer_from_memory(self) -> None:
+        module = importlib.import_module("tools.catalog")
+        calls, patch_backend = _fake_backend()
+        with (
+            patch_backend,
+            mock.patch.object(module, "server_inventory", ServerInventory(refresh_sec=60)),
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+        ):
+
+            async def run():
+                return await module.list_servers(environment="prod"), await module.list_process_groups("prod")
+
+            servers, groups = asyncio.run(run())
+
+        self.assertEqual(calls, ["http://prom.prod:9090"])
+        self.assertEqual([s["server_name"] for s in servers["servers"]], ["web-01", "web-01", "db-01"])
+        self.assertIn("age_sec", servers["inventory"])
+        self.assertEqual(groups["groups"], ["java", "nginx"])
+
+    def test_run_check_queries_unknown_server_with_suggestion(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        _, patch_backend = _fake_backend()
+        queries = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            queries.append(promql)
+            return
+            yield
+
+        with (
+            patch_backend,
+            mock.patch.object(module, "server_inventory", ServerInventory(refresh_sec=60)),
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            result = asyncio.run(module.run_check("load15_avg", hours=1, server_name="db-1"))
+
+        self.assertIn('server_name="db-1"', queries[0])
+        self.assertIn("Did you mean: db-01", result["filter_note"])
+        self.assertNotIn("resolved_filter", result)
+
+    def test_run_check_applies_resolved_filter(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        _, patch_backend = _fake_backend()
+        queries = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            queries.append(promql)
+            yield {"metric": {"instance": "10.0.0.2:9100"}, "values": [[1711249200, "1"]]}
+
+        with (
+            patch_backend,
+            mock.patch.object(module, "server_inventory", ServerInventory(refresh_sec=60)),
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+        ):
+            result = asyncio.run(module.run_check("load15_avg", hours=1, instance="10.0.0.2"))
+
+        self.assertEqual(result["resolved_filter"], {"server_name": None, "instance": "10.0.0.2:9100"})
+        self.assertIn('instance="10.0.0.2:9100"', queries[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+import httpx
+
+import infra.async_http as async_http
+from infra.async_prom_client import iter_range_series, prom_query_instant, prom_query_range, query_cache
+from infra.single_flight import SingleFlight, request_key
+
+START = datetime(2026, 3, 24, 1, 0, tzinfo=timezone.utc)
+END = datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc)
+
+
+def _slow_prometheus(requests: list) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(dict(request.url.params))
+        await asyncio.sleep(0.05)
+        result = [{"metric": {"instance": "a:9100"}, "values": [[1711242000, "1"]]}]
+        return httpx.Response(200, json={"status": "success", "data": {"resultType": "matrix", "result": result}})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class SingleFlightTests(unittest.TestCase):
+    def setUp(self) -> None:
+        query_cache.clear()
+
+    def test_identical_concurrent_range_queries_share_one_request(self) -> None:
+        requests: list = []
+        flights = SingleFlight()
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_slow_prometheus(requests)),
+                mock.patch.object(async_http, "backend_flights", flights),
+            ):
+                return await asyncio.gather(
+                    *(prom_query_range("http://prom.example", "up", start=START, end=END, step="1m") for _ in range(5))
+                )
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(requests), 1)
+        self.assertTrue(all(r == results[0] for r in results))
+        self.assertEqual(flights.stats()["coalesced"], 4)
+        self.assertEqual(flights.stats()["in_flight"], 0)
+
+    def test_identical_concurrent_streamed_range_queries_share_one_request(self) -> None:
+        for cache_entries in (0, query_cache.max_entries):
+            requests: list = []
+            flights = SingleFlight()
+
+            async def collect():
+                return [s async for s in iter_range_series("http://prom.example", "up", start=START, end=END, step="1m")]
+
+            async def run():
+                with (
+                    mock.patch.object(async_http, "get_async_client", return_value=_slow_prometheus(requests)),
+                    mock.patch.object(async_http, "backend_flights", flights),
+                    mock.patch.object(query_cache, "max_entries", cache_entries),
+                ):
+                    return await asyncio.gather(*(collect() for _ in range(5)))
+
+            with self.subTest(cache_entries=cache_entries):
+                query_cache.clear()
+                results = asyncio.run(run())
+
+                self.assertEqual(len(requests), 1)
+                self.assertTrue(all(r == results[0] and len(r) == 1 for r in results))
+                self.assertEqual(flights.stats()["leaders"], 1)
+                self.assertEqual(flights.stats()["coalesced"], 4)
+                self.assertEqual(flights.stats()["in_flight"], 0)
+
+    def test_followers_send_their_own_request_when_the_stream_leader_stops_early(self) -> None:
+        requests: list = []
+        flights = SingleFlight()
+
+        async def first_series():
+            series = iter_range_series("http://prom.example", "up", start=START, end=END, step="1m")
+            try:
+                return await series.__anext__()
+            finally:
+                await series.aclose()
+
+        async def collect():
+            return [s async for s in iter_range_series("http://prom.example", "up", start=START, end=END, step="1m")]
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_slow_prometheus(requests)),
+                mock.patch.object(async_http, "backend_flights", flights),
+                mock.patch.object(query_cache, "max_entries", 0),
+            ):
+                leader = asyncio.create_task(first_series())
+                await asyncio.sleep(0.01)
+                return await asyncio.gather(leader, collect(), collect())
+
+        leader, *followers = asyncio.run(run())
+
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(followers, [[leader], [leader]])
+        self.assertEqual(flights.stats()["in_flight"], 0)
+
+    def test_different_requests_are_not_shared(self) -> None:
+        requests: list = []
+        flights = SingleFlight()
+        at = datetime(2026, 3, 24, 2, 0, tzinfo=timezone.utc)
+
+        async def run():
+            with (
+                mock.patch.object(async_http, "get_async_client", return_value=_slow_prometheus(requests)),
+                mock.patch.object(async_http, "backend_flights", flights),
+            ):
+                await asyncio.gather(
+                    prom_query_instant("http://prom.example", "up", at=at),
+                    prom_query_instant("http://prom.example", "node_load15", at=at),
+                )
+
+        asyncio.run(run())
+
+        self.assertEqual(sorted(r["query"] for r in requests), ["node_load15", "up"])
+        self.assertEqual(flights.stats()["coalesced"], 0)
+
+    def test_request_key_ignores_param_order(self) -> None:
+        a = request_key("http://p/api/v1/query", {"query": "up", "time": 1}, {"Authorization": "x"})
+        b = request_key("http://p/api/v1/query", {"time": "1", "query": "up"}, {"authorization": "x"})
+
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, request_key("http://p/api/v1/query", {"query": "up", "time": 1}, {"Authorization": "y"}))
+
+    def test_error_reaches_every_waiter_and_is_not_remembered(self) -> None:
+        flights = SingleFlight()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def run():
+            first = await asyncio.gather(
+                *(flights.do("k", failing, backend="prometheus") for _ in range(3)), return_exceptions=True
+            )
+            second = await asyncio.gather(flights.do("k", failing, backend="prometheus"), return_exceptions=True)
+            return first + second
+
+        outcomes = asyncio.run(run())
+
+        self.assertTrue(all(isinstance(o, RuntimeError) for o in outcomes))
+        self.assertEqual(len(calls), 2)
+
+    def test_cancelled_leader_does_not_cancel_followers(self) -> None:
+        flights = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        async def run():
+            leader = asyncio.create_task(flights.do("k", slow, backend="prometheus"))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.do("k", slow, backend="prometheus"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower, leader.cancelled()
+
+        self.assertEqual(asyncio.run(run()), ("ok", True))
+
+    def test_disabled_runs_every_call(self) -> None:
+        flights = SingleFlight(enabled=False)
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return len(calls)
+
+        async def run():
+            return await asyncio.gather(*(flights.do("k", fn, backend="prometheus") for _ in range(3)))
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
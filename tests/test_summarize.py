@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+import utils.summarize as summarize
+from utils.summarize import max_sustain_duration, stats_from_values, summarize_matrix, summarize_values
+
+
+def _series(n: int, *, step: int = 60, start: int = 1711249200) -> list:
+    values = []
+    for i in range(n):
+        ts = start + i * step + (600 if i > n // 2 else 0)
+        if i % 97 == 13:
+            value = "NaN"
+        elif i % 89 == 5:
+            value = "+Inf"
+        else:
+            value = str(80 + (i * 7919 % 23))
+        values.append([ts, value])
+    return values
+
+
+class SummarizeTests(unittest.TestCase):
+    def test_stats_skip_non_finite_values(self) -> None:
+        stats = stats_from_values([[1, "1"], [2, "NaN"], [3, "3"], [4, "+Inf"]])
+
+        self.assertEqual(stats, {"count": 2, "min": 1.0, "max": 3.0, "avg": 2.0, "last": 3.0, "last_ts": 3.0})
+
+    def test_sustain_resets_on_gap_and_invalid_sample(self) -> None:
+        values = [[0, "90"], [60, "90"], [120, "90"], [400, "90"], [460, "NaN"], [520, "90"], [580, "90"]]
+
+        self.assertEqual(max_sustain_duration(values, threshold=85, step_seconds=60), 120.0)
+
+    def test_single_pass_matches_per_threshold_results(self) -> None:
+        values = _series(50)
+        stats, max_dur = summarize_values(values, thresholds=(85.0, 95.0), step_seconds=60)
+
+        self.assertEqual(stats, stats_from_values(values))
+        self.assertEqual(max_dur[0], max_sustain_duration(values, threshold=85.0, step_seconds=60))
+        self.assertEqual(max_dur[1], max_sustain_duration(values, threshold=95.0, step_seconds=60))
+
+    @unittest.skipIf(summarize.np is None, "numpy is not installed")
+    def test_numpy_and_python_paths_produce_identical_output(self) -> None:
+        matrix = [{"metric": {"instance": str(i)}, "values": _series(600 + i)} for i in range(3)]
+        alert_config = {"warn_pct": 85, "crit_pct": 95, "sustain_seconds": 300, "step_seconds": 60}
+
+        with_numpy = summarize_matrix(matrix, False, alert_config=alert_config)
+        with mock.patch.object(summarize, "np", None):
+            without_numpy = summarize_matrix(matrix, False, alert_config=alert_config)
+
+        self.assertEqual(repr(with_numpy), repr(without_numpy))
+
+
+if __name__ == "__main__":
+    unittest.main()
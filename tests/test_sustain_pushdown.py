@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import unittest
+from unittest import mock
+
+from utils.ranking import rank_value
+from utils.summarize import summarize_series
+from utils.sustain_pushdown import STAT_LABEL, assemble_pushdown, pushdown_promql
+
+ALERT_CONFIG = {"warn_pct": 85.0, "crit_pct": 95.0, "sustain_seconds": 300, "step_seconds": 60}
+
+
+def _prometheus_eval(values: list, *, sustain_seconds: int, step_seconds: int) -> dict:
+    """What the push-down query returns for one series sampled at every step."""
+    nums = [float(v) for _, v in values]
+    width = sustain_seconds // step_seconds + 1
+    # Windows reaching back before the first sample are dropped by the clamp.
+    windows = [min(nums[i - width + 1 : i + 1]) for i in range(width - 1, len(nums))]
+    stats = {"breach_0": sum(n >= 85 for n in nums), "breach_1": sum(n >= 95 for n in nums)}
+    if windows:
+        stats["sustained"] = max(windows)
+    return stats
+
+
+def _vector(metric: dict, stats: dict, at: float = 1711252800.0) -> list:
+    return [{"metric": {**metric, STAT_LABEL: stat}, "value": [at, str(value)]} for stat, value in stats.items()]
+
+
+class SustainPushdownTests(unittest.TestCase):
+    def test_query_pushes_down_only_sustain_and_breach_terms(self) -> None:
+        promql = pushdown_promql(
+            "node_mem_pct",
+            range_str="24h",
+            step="1m",
+            step_seconds=60,
+            sustain_seconds=300,
+            thresholds=(85, 95),
+            start_ts=1711249200,
+        )
+
+        parts = promql.split(" or ")
+        self.assertEqual(len(parts), 3)
+        self.assertIn(
+            "max_over_time((min_over_time((node_mem_pct)[360s:1m]) and on() (vector(time()) >= 1711249500))[24h:1m])",
+            promql,
+        )
+        self.assertIn("count_over_time(((node_mem_pct) >= 95.0)[24h:1m])", promql)
+        self.assertNotIn("avg_over_time", promql)
+        self.assertTrue(all(f'"{STAT_LABEL}"' in part for part in parts))
+
+    def test_breach_matches_sample_based_summary(self) -> None:
+        base = 1711249200
+        cases = {
+            "sustained": ["90"] * 6 + ["50"] * 4,
+            "too_short": ["90"] * 5 + ["50"] * 5,
+            "critical": ["50", "96", "97", "96", "99", "98", "96", "50"],
+            "shorter_than_sustain": ["90"] * 4,
+        }
+        for name, raw in cases.items():
+            values = [[base + i * 60, v] for i, v in enumerate(raw)]
+            with self.subTest(name):
+                series = {"metric": {"instance": "a"}, "values": values}
+                expected = summarize_series(series, False, alert_config=ALERT_CONFIG)
+                stats = _prometheus_eval(values, sustain_seconds=300, step_seconds=60)
+                (item,) = assemble_pushdown(
+                    [summarize_series(series, False)],
+                    _vector({"instance": "a"}, stats),
+                    thresholds=(85.0, 95.0),
+                    sustain_seconds=300,
+                    step_seconds=60,
+                )
+                for level in ("warning", "critical"):
+                    self.assertEqual(
+                        item["summary"]["sustain"][level]["breached"],
+                        expected["summary"]["sustain"][level]["breached"],
+                    )
+                for key in ("count", "min", "max", "avg", "last", "last_ts"):
+                    self.assertAlmostEqual(item["summary"][key], expected["summary"][key])
+
+    def test_missing_breach_counts_are_zero_and_series_stay_separate(self) -> None:
+        summaries = [
+            summarize_series({"metric": {"__name__": "m", "instance": name}, "values": [[1, "50"]]}, False)
+            for name in ("a", "b")
+        ]
+        stats = {"sustained": 10}
+        items = assemble_pushdown(
+            summaries,
+            _vector({"instance": "a"}, stats) + _vector({"instance": "b"}, {**stats, "breach_0": 3, "sustained": 90}),
+            thresholds=(85.0, 95.0),
+            sustain_seconds=300,
+            step_seconds=60,
+        )
+
+        self.assertEqual([item["metric"]["instance"] for item in items], ["a", "b"])
+        self.assertEqual(items[0]["summary"]["sustain"]["warning"]["breach_duration_sec"], 0)
+        self.assertEqual(items[1]["summary"]["sustain"]["warning"]["breach_duration_sec"], 180)
+        self.assertTrue(items[1]["summary"]["sustain"]["warning"]["breached"])
+        self.assertGreater(rank_value(items[1], "sustain"), rank_value(items[0], "sustain"))
+
+    def test_run_check_pushdown_adds_one_instant_query_to_the_range_query(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        queries = []
+        range_queries = []
+
+        async def fake_instant(prom_url, promql, at):
+            queries.append(promql)
+            stats = {"sustained": 96, "breach_0": 12, "breach_1": 6}
+            return {"data": {"resultType": "vector", "result": _vector({"instance": "a:9100"}, stats)}}
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            range_queries.append(promql)
+            yield {"metric": {"instance": "a:9100"}, "values": [[1711249200, "40"], [1711249500, "97"]]}
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=fake_instant),
+        ):
+            result = asyncio.run(module.run_check("mem_used_pct", hours=24, pushdown=True, top_n=1, order_by="sustain"))
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(range_queries), 1)
+        self.assertEqual(result["alert_config"]["mode"], "pushdown")
+        summary = result["results"][0]["summary"]
+        self.assertEqual((summary["count"], summary["max"], summary["last_ts"]), (2, 97.0, 1711249500))
+        self.assertNotIn("values", result["results"][0])
+        expected = {"threshold_pct": 95.0, "min_duration_sec": 300, "breach_duration_sec": 1800, "breached": True}
+        self.assertEqual(summary["sustain"]["critical"], expected)
+
+    def test_pushdown_rejects_samples_and_non_percent_checks(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+
+        with mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")):
+            with self.assertRaises(ValueError):
+                asyncio.run(module.run_check("mem_used_pct", hours=1, pushdown=True, include_samples=True))
+            with self.assertRaises(ValueError):
+                asyncio.run(module.run_check("load15_avg", hours=1, pushdown=True))
+
+    def test_run_all_checks_pushes_down_percent_checks_only(self) -> None:
+        module = importlib.import_module("tools.checks_runner")
+        instant_queries = []
+
+        async def fake_iter_range_series(prom_url, promql, start, end, step):
+            yield {"metric": {"instance": "a:9100"}, "values": [[1711249200, "1"]]}
+
+        async def fake_instant(prom_url, promql, at):
+            instant_queries.append(promql)
+            stats = {"sustained": 1}
+            return {"data": {"resultType": "vector", "result": _vector({"instance": "a:9100"}, stats)}}
+
+        with (
+            mock.patch.object(module, "resolve_prom_url", return_value=("prod", "http://prom.prod:9090")),
+            mock.patch.object(module, "iter_range_series", new=fake_iter_range_series),
+            mock.patch.object(module, "prom_query_instant", new=fake_instant),
+        ):
+            result = asyncio.run(module.run_all_checks(hours=24, pushdown=True))
+
+        pushed = result["query_plan"]["pushdown_checks"]
+        self.assertIn("mem_used_pct", pushed)
+        self.assertNotIn("cpu_peak_pct", pushed)
+        self.assertNotIn("tcp_inuse", pushed)
+        self.assertEqual(result["failed_checks"], 0)
+        self.assertTrue(any("node_memory_MemAvailable_bytes" in q and STAT_LABEL in q for q in instant_queries))
+        by_id = {item["check"]["id"]: item for item in result["checks"]}
+        self.assertEqual(list(by_id), list(module.CHECKS))
+        self.assertEqual(by_id["mem_used_pct"]["alert_config"]["mode"], "pushdown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import core.runtime as runtime
+from core.time_utils import auto_step, step_to_seconds
+
+
+class AutoStepTests(unittest.TestCase):
+    def test_points_stay_within_budget_across_windows(self) -> None:
+        for days in (1 / 96, 1 / 24, 1, 7, 30, 90):
+            window = days * 86400
+            with self.subTest(days=days):
+                step = auto_step(window, max_points=300, min_step_seconds=15)
+                self.assertLessEqual(window / step_to_seconds(step), 300)
+
+    def test_snaps_to_friendly_steps(self) -> None:
+        self.assertEqual(auto_step(86400, max_points=300, min_step_seconds=15), "5m")
+        self.assertEqual(auto_step(30 * 86400, max_points=300, min_step_seconds=15), "3h")
+        self.assertEqual(auto_step(86400, max_points=200, min_step_seconds=15), "10m")
+
+    def test_never_finer_than_scrape_interval(self) -> None:
+        self.assertEqual(auto_step(900, max_points=300, min_step_seconds=15), "15s")
+        self.assertEqual(auto_step(900, max_points=300, min_step_seconds=60), "1m")
+
+    def test_max_step_caps_at_the_largest_friendly_step_within_it(self) -> None:
+        self.assertEqual(auto_step(30 * 86400, max_points=300, min_step_seconds=15, max_step_seconds=300), "5m")
+        self.assertEqual(auto_step(30 * 86400, max_points=300, min_step_seconds=15, max_step_seconds=420), "5m")
+        self.assertEqual(auto_step(3600, max_points=300, min_step_seconds=15, max_step_seconds=300), "15s")
+        self.assertEqual(auto_step(30 * 86400, max_points=300, min_step_seconds=60, max_step_seconds=30), "1m")
+
+    def test_point_limit_wins_over_max_step(self) -> None:
+        step = auto_step(30 * 86400, max_points=300, min_step_seconds=15, max_step_seconds=300, point_limit=5000)
+        self.assertEqual(step, "10m")
+        self.assertLessEqual(30 * 86400 // step_to_seconds(step) + 1, 5000)
+        self.assertEqual(
+            auto_step(86400, max_points=300, min_step_seconds=15, max_step_seconds=300, point_limit=5000), "5m"
+        )
+
+    def test_long_windows_fall_back_to_whole_days(self) -> None:
+        self.assertEqual(auto_step(400 * 86400, max_points=300, min_step_seconds=15), "2d")
+
+
+class ResolveStepTests(unittest.TestCase):
+    def test_auto_uses_configured_budget_and_explicit_steps_pass_through(self) -> None:
+        end = datetime(2026, 3, 24, tzinfo=timezone.utc)
+        start = end - timedelta(days=7)
+
+        with mock.patch.object(runtime, "PROM_STEP_POINT_BUDGET", 1000):
+            self.assertEqual(runtime.resolve_step("auto", start=start, end=end), "15m")
+        self.assertEqual(runtime.resolve_step("AUTO", start=start, end=end), "1h")
+        self.assertEqual(runtime.resolve_step("1M", start=start, end=end), "1m")
+        with self.assertRaises(ValueError):
+            runtime.resolve_step("fast", start=start, end=end)
+
+    def test_capped_auto_step_stays_within_the_sample_limit(self) -> None:
+        end = datetime(2026, 3, 24, tzinfo=timezone.utc)
+        start = end - timedelta(days=30)
+
+        for include_samples, max_points, expected in ((False, None, "5m"), (True, None, "10m"), (True, 100, "10m")):
+            with self.subTest(include_samples=include_samples, max_points=max_points):
+                step = runtime.resolve_step(
+                    "auto",
+                    start=start,
+                    end=end,
+                    max_step_seconds=300,
+                    include_samples=include_samples,
+                    max_points=max_points,
+                )
+                self.assertEqual(step, expected)
+                runtime.validate_sample_volume(
+                    include_samples=include_samples, start=start, end=end, step=step, max_points=max_points
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
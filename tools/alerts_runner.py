@@ -2,12 +2,13 @@ from __future__ import annotations
 
 from collections import Counter
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
-from core.runtime import resolve_prom_url
+from core.fanout import fan_out_environments
+from core.runtime import is_multi_environment, resolve_prom_url, resolve_prom_urls
 from core.server import mcp
-from core.time_utils import iso, iso_jakarta, parse_iso_utc
-from infra.prom_client import prom_alerts
+from core.time_utils import iso, iso_jakarta
+from infra.alert_snapshots import AlertSnapshot, alert_poller, decode_since, encode_since, matches
 
 
 def _top(counter: Counter[str], n: int = 10) -> List[Dict[str, Any]]:
@@ -15,7 +16,7 @@ def _top(counter: Counter[str], n: int = 10) -> List[Dict[str, Any]]:
 
 
 @mcp.tool()
-def get_alerts(
+async def get_alerts(
     severity: Optional[str] = None,
     state: Optional[str] = None,
     alertname: Optional[str] = None,
@@ -23,99 +24,115 @@ def get_alerts(
     server_name: Optional[str] = None,
     instance: Optional[str] = None,
     include_alerts: bool = True,
-    environment: Optional[str] = None,
+    environment: Optional[Union[str, List[str]]] = None,
     env_hint: Optional[str] = None,
+    since: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
-    Fetch active alerts from Prometheus `/api/v1/alerts`.
+    Return active alerts from Prometheus `/api/v1/alerts`.
+
+    Alerts come from a per-environment snapshot, re-polled when it is older
+    than `ALERT_POLL_SEC` (`snapshot.age_sec` tells how old it is), and are
+    filtered through label indexes.
 
     Filters (exact-match):
     - severity/state/alertname/job/server_name/instance
+
+    Changes:
+    - Every response carries `next_since`. Pass it back as `since` to also get
+      `changes.fired` / `changes.resolved`: alerts that started firing or
+      disappeared since that earlier response (same filters applied).
+    - `changes.reset` is true when the token is too old or from before a
+      server restart; compare against the full `alerts` list instead.
+
+    `environment="all"` or a list queries every selected environment
+    concurrently and returns one result per environment.
     """
+    filters = {
+        "severity": severity,
+        "state": state,
+        "alertname": alertname,
+        "job": job,
+        "server_name": server_name,
+        "instance": instance,
+        "include_alerts": include_alerts,
+    }
+    since_versions = decode_since(since) if since else None
+
+    async def _run(env_key: str, prom_url: str) -> Dict[str, Any]:
+        return await _fetch_alerts(env_key, prom_url, filters, since=since, since_versions=since_versions)
+
+    if is_multi_environment(environment):
+        fanned = await fan_out_environments(resolve_prom_urls(environment), _run)
+        ok = [item for item in fanned["results"] if "error" not in item]
+        total = sum(item["summary"]["total_alerts"] for item in ok)
+        versions = {item["environment"]: item["snapshot"]["version"] for item in ok}
+        return {"filters": filters, **fanned, "total_alerts": total, "next_since": encode_since(versions)}
+
     env_key, prom_url = resolve_prom_url(environment, env_hint)
-    raw = prom_alerts(prom_url)
-    alerts = raw.get("data", {}).get("alerts", []) or []
-
-    out_alerts: List[Dict[str, Any]] = []
-    sev_counter: Counter[str] = Counter()
-    state_counter: Counter[str] = Counter()
-    alertname_counter: Counter[str] = Counter()
-    job_counter: Counter[str] = Counter()
-    server_counter: Counter[str] = Counter()
-
-    for a in alerts:
-        labels = a.get("labels", {}) or {}
-        annotations = a.get("annotations", {}) or {}
-
-        if severity and labels.get("severity") != severity:
-            continue
-        if state and a.get("state") != state:
-            continue
-        if alertname and labels.get("alertname") != alertname:
-            continue
-        if job and labels.get("job") != job:
-            continue
-        if server_name and labels.get("server_name") != server_name:
-            continue
-        if instance and labels.get("instance") != instance:
-            continue
-
-        sev_counter[str(labels.get("severity") or "unknown")] += 1
-        state_counter[str(a.get("state") or "unknown")] += 1
-        alertname_counter[str(labels.get("alertname") or "unknown")] += 1
-        job_counter[str(labels.get("job") or "unknown")] += 1
-        server_counter[str(labels.get("server_name") or "unknown")] += 1
-
-        if not include_alerts:
-            continue
-
-        active_at_raw = a.get("activeAt")
-        active_at_utc = None
-        active_at_jakarta = None
-        if isinstance(active_at_raw, str) and active_at_raw.strip():
-            try:
-                active_at_utc_dt = parse_iso_utc(active_at_raw)
-                active_at_utc = iso(active_at_utc_dt)
-                active_at_jakarta = iso_jakarta(active_at_utc_dt)
-            except Exception:
-                active_at_utc = None
-                active_at_jakarta = None
-
-        out_alerts.append(
-            {
-                "labels": labels,
-                "annotations": annotations,
-                "state": a.get("state"),
-                "activeAt_raw": active_at_raw,
-                "activeAt_utc": active_at_utc,
-                "activeAt_jakarta": active_at_jakarta,
-                "value": a.get("value"),
-            }
-        )
-
-    now = datetime.now(timezone.utc)
+    result = await _run(env_key, prom_url)
     return {
         "environment": env_key,
         "prom_url": prom_url,
-        "retrieved_at_utc": iso(now),
-        "retrieved_at_jakarta": iso_jakarta(now),
-        "filters": {
-            "severity": severity,
-            "state": state,
-            "alertname": alertname,
-            "job": job,
-            "server_name": server_name,
-            "instance": instance,
-            "include_alerts": include_alerts,
-        },
+        "filters": filters,
+        **result,
+        "next_since": encode_since({env_key: result["snapshot"]["version"]}),
+    }
+
+
+async def _fetch_alerts(
+    env_key: str,
+    prom_url: str,
+    filters: Dict[str, Any],
+    *,
+    since: Optional[str],
+    since_versions: Optional[Dict[str, int]],
+) -> Dict[str, Any]:
+    include_alerts = filters["include_alerts"]
+    label_filters = {k: v for k, v in filters.items() if k != "include_alerts"}
+
+    snapshot = await alert_poller.snapshot(env_key, prom_url)
+    selected = snapshot.select(label_filters)
+    counters = snapshot.counts(label_filters, selected)
+
+    retrieved = datetime.fromtimestamp(snapshot.built_at, tz=timezone.utc)
+    result: Dict[str, Any] = {
+        "retrieved_at_utc": iso(retrieved),
+        "retrieved_at_jakarta": iso_jakarta(retrieved),
+        "snapshot": snapshot.describe(),
         "summary": {
-            "total_alerts": len(out_alerts) if include_alerts else int(sum(sev_counter.values())),
-            "severity": _top(sev_counter, n=20),
-            "state": _top(state_counter, n=20),
-            "alertname": _top(alertname_counter, n=20),
-            "job": _top(job_counter, n=20),
-            "server_name": _top(server_counter, n=20),
+            "total_alerts": len(selected),
+            "severity": _top(counters["severity"], n=20),
+            "state": _top(counters["state"], n=20),
+            "alertname": _top(counters["alertname"], n=20),
+            "job": _top(counters["job"], n=20),
+            "server_name": _top(counters["server_name"], n=20),
         },
-        "alerts": out_alerts if include_alerts else [],
+        "alerts": list(selected) if include_alerts else [],
     }
+    if since:
+        result["changes"] = _changes(snapshot, since_versions, env_key, label_filters, include_alerts)
+    return result
 
+
+def _changes(
+    snapshot: AlertSnapshot,
+    since_versions: Optional[Dict[str, int]],
+    env_key: str,
+    label_filters: Dict[str, Optional[str]],
+    include_alerts: bool,
+) -> Dict[str, Any]:
+    base = since_versions.get(env_key) if since_versions is not None else None
+    delta = snapshot.changes_since(base) if base is not None else None
+    if delta is None:
+        return {"reset": True, "fired_count": 0, "resolved_count": 0, "fired": [], "resolved": []}
+    fired = [a for a in delta[0] if matches(a, label_filters)]
+    resolved = [a for a in delta[1] if matches(a, label_filters)]
+    return {
+        "reset": False,
+        "since_version": base,
+        "fired_count": len(fired),
+        "resolved_count": len(resolved),
+        "fired": fired if include_alerts else [],
+        "resolved": resolved if include_alerts else [],
+    }
@@ -1,27 +1,155 @@
 from __future__ import annotations
 
+import asyncio
 import time
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
-from core.config import ALERT_CRIT_PCT, ALERT_SUSTAIN_MINUTES, ALERT_WARN_PCT, MAX_PARALLEL_CHECKS
-from core.runtime import resolve_prom_url, should_apply_alerts, validate_sample_volume
+from core.config import (
+    ALERT_CRIT_PCT,
+    ALERT_SUSTAIN_MINUTES,
+    ALERT_WARN_PCT,
+    MAX_PARALLEL_CHECKS,
+    PROM_COALESCE_MAX_CHECKS,
+)
+from core.fanout import fan_out_environments
+from core.runtime import (
+    is_multi_environment,
+    resolve_prom_url,
+    resolve_prom_urls,
+    resolve_step,
+    should_apply_alerts,
+    validate_sample_volume,
+)
 from core.server import mcp
-from core.time_utils import format_range, iso, parse_step, resolve_time_range, step_to_seconds
+from core.time_utils import format_range, iso, resolve_time_range, step_to_seconds, to_unix
 from domain.checks import CHECKS, Check
-from infra.prom_client import prom_query_range
+from infra.async_prom_client import iter_range_series, prom_query_instant
+from infra.server_inventory import TargetFilter, server_inventory
+from utils.downsample import SampleBudget, sample_budget
+from utils.query_plan import QueryBatch, plan_check_batches, split_check_tag
 from utils.query_utils import apply_target_filter, render_promql
-from utils.summarize import summarize_matrix
+from utils.ranking import TopN, validate_ranking
+from utils.summarize import summarize_series, summarize_stopwatch
+from utils.sustain_pushdown import assemble_pushdown, pushdown_promql
+
+
+SUSTAIN_SECONDS = ALERT_SUSTAIN_MINUTES * 60
+
+
+def _applies_sustain(c: Check) -> bool:
+    # A single evaluation has no duration to sustain a breach over.
+    return c.kind == "range" and should_apply_alerts(c)
+
+
+def _max_step_for(checks: List[Check]) -> Optional[int]:
+    """Auto step cap: a sustain check must not step over its sustain window."""
+    return SUSTAIN_SECONDS if any(_applies_sustain(c) for c in checks) else None
+
+
+def _alert_config_for(c: Check, step: str) -> Optional[Dict[str, Any]]:
+    if not _applies_sustain(c):
+        return None
+    return {
+        "warn_pct": ALERT_WARN_PCT,
+        "crit_pct": ALERT_CRIT_PCT,
+        "sustain_seconds": SUSTAIN_SECONDS,
+        "step_seconds": step_to_seconds(step),
+    }
+
+
+async def _iter_check_series(
+    kind: str,
+    prom_url: str,
+    promql: str,
+    *,
+    start: datetime,
+    end: datetime,
+    step: str,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Series of one check query as `{"metric", "values"}`, whatever its kind.
+
+    Instant checks are evaluated once at `end`; their vector is reshaped into
+    one-sample series so summaries, ranking and coalescing treat both alike.
+    """
+    if kind == "range":
+        async for series in iter_range_series(prom_url, promql, start=start, end=end, step=step):
+            yield series
+        return
+    data = await prom_query_instant(prom_url, promql, at=end)
+    result_type = data.get("data", {}).get("resultType")
+    result = data.get("data", {}).get("result", [])
+    if result_type == "scalar":
+        result = [{"metric": {}, "value": result}]
+    for sample in result:
+        value = sample.get("value")
+        yield {"metric": sample.get("metric", {}), "values": [value] if value else []}
+
+
+async def _pushdown_series(
+    prom_url: str,
+    promql: str,
+    *,
+    range_str: str,
+    start: datetime,
+    end: datetime,
+    step: str,
+    alert_config: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """
+    Summaries of a percent check whose sustain evaluation is done by Prometheus.
+
+    The window stats come from the streamed range series, summarized without
+    keeping samples; the pushed-down instant query runs concurrently.
+    """
+    thresholds = (alert_config["warn_pct"], alert_config["crit_pct"])
+    query = pushdown_promql(
+        promql,
+        range_str=range_str,
+        step=step,
+        step_seconds=alert_config["step_seconds"],
+        sustain_seconds=alert_config["sustain_seconds"],
+        thresholds=thresholds,
+        # Range queries align the start down to the step grid; so does the clamp.
+        start_ts=int(to_unix(start)) // alert_config["step_seconds"] * alert_config["step_seconds"],
+    )
+
+    async def _summaries() -> List[Dict[str, Any]]:
+        clock = summarize_stopwatch()
+        summarized = [
+            clock.call(summarize_series, series, False)
+            async for series in iter_range_series(prom_url, promql, start=start, end=end, step=step)
+        ]
+        clock.record()
+        return summarized
+
+    summaries, data = await asyncio.gather(_summaries(), prom_query_instant(prom_url, query, at=end))
+    return assemble_pushdown(
+        summaries,
+        data.get("data", {}).get("result", []),
+        thresholds=thresholds,
+        sustain_seconds=alert_config["sustain_seconds"],
+        step_seconds=alert_config["step_seconds"],
+    )
+
+
+def _validate_pushdown(pushdown: bool, *, include_samples: bool) -> None:
+    if pushdown and include_samples:
+        raise ValueError("pushdown returns aggregates only; disable include_samples")
+
+
+def _check_info(c: Check) -> Dict[str, Any]:
+    return {"id": c.id, "name": c.name, "description": c.description, "kind": c.kind}
 
 
 @mcp.tool()
-def run_check(
+async def run_check(
     check_id: str,
     hours: Optional[int] = None,
     minutes: Optional[int] = None,
     days: Optional[int] = None,
-    step: str = "5m",
+    step: str = "auto",
     include_samples: bool = False,
     start_time_utc_iso: Optional[str] = None,
     end_time_utc_iso: Optional[str] = None,
@@ -30,8 +158,13 @@ def run_check(
     end_offset_days: Optional[int] = None,
     server_name: Optional[str] = None,
     instance: Optional[str] = None,
-    environment: Optional[str] = None,
+    environment: Optional[Union[str, List[str]]] = None,
     env_hint: Optional[str] = None,
+    top_n: Optional[int] = None,
+    order_by: str = "max",
+    max_points: Optional[int] = None,
+    downsample: str = "minmax",
+    pushdown: bool = False,
 ) -> Dict[str, Any]:
     """
     Run one allowlisted check via Prometheus `query_range` and return summarized results.
@@ -41,23 +174,56 @@ def run_check(
     - hours/minutes/days: relative lookback window.
     - start_time_utc_iso/end_time_utc_iso: absolute UTC range (if provided, this is used).
     - end_offset_minutes/end_offset_hours/end_offset_days: shift end time to the past.
-    - step: range-query step (example: `1m`, `5m`, `15m`).
+    - step: range-query step (example: `1m`, `5m`, `15m`). The default `auto`
+      picks a step from the window (at most `PROM_STEP_POINT_BUDGET` points per
+      series, never below the scrape interval); `range.step` reports it.
+      Points are instantaneous evaluations, so a coarse step samples long
+      windows rather than aggregating them. For checks with `alert_config`
+      the auto step is capped at the sustain window so a sustained breach
+      cannot fall between points; long windows then cost more points, and
+      `pushdown=True` keeps them out of the response.
     - include_samples: include raw samples in each series summary.
+    - max_points/downsample: with include_samples, cap samples per series by
+      `minmax` (keeps peaks and troughs) or `lttb` bucketing instead of failing
+      on long ranges; summaries are still computed on every fetched sample.
+      The fetch itself stays within `PROM_MAX_SAMPLES_PER_SERIES` points per
+      series: a finer step is coarsened to fit (`range.step` reports it).
     - server_name: label filter for `server_name`.
     - instance: label filter for `instance` (example: `host-or-ip:9100`).
       Use this when targeting one exact exporter endpoint.
     - environment/env_hint: environment selector (`environment` has higher priority).
+      Pass `"all"` or a list (e.g. `["prod", "dr"]`) to run against several
+      environments concurrently; results are then grouped per environment.
+    - top_n/order_by: return only the N worst series ranked by `max`, `avg`,
+      `last`, `min` or `sustain` (longest breach; percent range checks only).
+      `series_count` still reports every matched series.
+    - pushdown: for percent range checks, let Prometheus evaluate sustained
+      breaches in one instant query alongside the range query, which only
+      feeds the window stats (`sustain.*.breach_duration_sec` is the total time
+      above the threshold). The extra query costs Prometheus about three times a
+      `query_range`; sustain windows never reach back before the window start.
+      Not combinable with include_samples.
+
+    Check kinds (`check.kind`):
+    - `range`: evaluated at every `step` of the window.
+    - `instant`: evaluated once at the window end (`up`, `pg_up`, `fs_readonly`,
+      and `cpu_peak_pct`, which aggregates the window in PromQL). Results have
+      the same shape, with one sample per series.
 
     Filter behavior:
     - If both `server_name` and `instance` are provided, both filters are applied.
     - If only one is provided, only that label is applied.
+    - Filters are checked against the environment's target inventory first:
+      case differences and a port-less `instance` are resolved (`resolved_filter`);
+      values the inventory does not list are queried unchanged, with suggestions
+      in `filter_note`. Windows ending well before now are not checked.
     """
     if check_id not in CHECKS:
         raise ValueError(f"Unknown check_id: {check_id}")
 
     c = CHECKS[check_id]
-    step = parse_step(step)
-    env_key, prom_url = resolve_prom_url(environment, env_hint)
+    multi = is_multi_environment(environment)
+    targets = resolve_prom_urls(environment) if multi else [resolve_prom_url(environment, env_hint)]
 
     start, end = resolve_time_range(
         hours=hours,
@@ -69,42 +235,78 @@ def run_check(
         end_offset_hours=end_offset_hours,
         end_offset_days=end_offset_days,
     )
-    validate_sample_volume(include_samples=include_samples, start=start, end=end, step=step)
+    step = resolve_step(
+        step,
+        start=start,
+        end=end,
+        max_step_seconds=_max_step_for([c]),
+        include_samples=include_samples,
+        max_points=max_points,
+    )
+    budget = sample_budget(max_points, downsample)
+    validate_sample_volume(include_samples=include_samples, start=start, end=end, step=step, max_points=max_points)
 
     range_str = format_range(end - start)
-    promql = render_promql(c, range_str)
-    promql = apply_target_filter(promql, server_name=server_name, instance=instance)
+    alert_config = _alert_config_for(c, step)
+    _validate_pushdown(pushdown, include_samples=include_samples)
+    if pushdown:
+        if alert_config is None:
+            raise ValueError("pushdown applies to percent range checks only")
+        alert_config = {**alert_config, "mode": "pushdown"}
+    validate_ranking(top_n, order_by, has_sustain=alert_config is not None)
 
-    alert_config = None
-    if should_apply_alerts(c):
-        alert_config = {
-            "warn_pct": ALERT_WARN_PCT,
-            "crit_pct": ALERT_CRIT_PCT,
-            "sustain_seconds": ALERT_SUSTAIN_MINUTES * 60,
-            "step_seconds": step_to_seconds(step),
+    async def _run(env_key: str, prom_url: str) -> Dict[str, Any]:
+        target = await server_inventory.resolve_filter(
+            env_key, prom_url, server_name=server_name, instance=instance, end=end
+        )
+        promql = apply_target_filter(render_promql(c, range_str), **target.as_dict())
+        ranking = TopN(top_n, order_by)
+        t0 = time.time()
+        if pushdown:
+            for item in await _pushdown_series(
+                prom_url, promql, range_str=range_str, start=start, end=end, step=step, alert_config=alert_config
+            ):
+                ranking.push(item)
+        else:
+            clock = summarize_stopwatch()
+            async for series in _iter_check_series(c.kind, prom_url, promql, start=start, end=end, step=step):
+                ranking.push(
+                    clock.call(summarize_series, series, include_samples, alert_config=alert_config, budget=budget)
+                )
+            clock.record()
+        elapsed_ms = int((time.time() - t0) * 1000)
+        return {
+            **_resolved_filter(target, server_name=server_name, instance=instance),
+            "series_count": ranking.total,
+            "elapsed_ms": elapsed_ms,
+            **({"ranking": ranking.describe()} if top_n is not None else {}),
+            "results": ranking.items(),
         }
 
-    t0 = time.time()
-    data = prom_query_range(prom_url, promql, start=start, end=end, step=step)
-    elapsed_ms = int((time.time() - t0) * 1000)
-
-    result = data.get("data", {}).get("result", [])
-    summarized = summarize_matrix(result, include_samples=include_samples, alert_config=alert_config)
-
-    return {
-        "check": {"id": c.id, "name": c.name, "description": c.description},
-        "environment": env_key,
-        "prom_url": prom_url,
+    check = _check_info(c)
+    header = {
         "filter": {"server_name": server_name, "instance": instance},
         "alert_config": alert_config,
         "range": {"start": iso(start), "end": iso(end), "step": step},
-        "series_count": len(summarized),
-        "elapsed_ms": elapsed_ms,
-        "results": summarized,
     }
+    if multi:
+        fanned = await fan_out_environments(targets, _run)
+        return {"check": check, **header, **fanned}
+
+    env_key, prom_url = targets[0]
+    return {"check": check, "environment": env_key, "prom_url": prom_url, **header, **await _run(env_key, prom_url)}
+
 
+def _resolved_filter(target: TargetFilter, *, server_name: Optional[str], instance: Optional[str]) -> Dict[str, Any]:
+    """`resolved_filter` / `filter_note` entries from inventory resolution, if any."""
+    if target.note:
+        return {"filter_note": target.note}
+    if (target.server_name, target.instance) == (server_name, instance):
+        return {}
+    return {"resolved_filter": target.as_dict()}
 
-def _run_single_check(
+
+async def _run_single_check(
     c: Check,
     *,
     prom_url: str,
@@ -113,34 +315,48 @@ def _run_single_check(
     end: datetime,
     step: str,
     include_samples: bool,
+    budget: Optional[SampleBudget],
     server_name: Optional[str],
     instance: Optional[str],
+    pushdown: bool = False,
 ) -> Dict[str, Any]:
     """
     Internal helper for `run_all_checks`.
 
     This function is intentionally not decorated with `@mcp.tool()` because it is
-    implementation detail used for parallel execution.
+    implementation detail used for concurrent execution.
     """
     promql = render_promql(c, range_str)
     promql = apply_target_filter(promql, server_name=server_name, instance=instance)
 
-    alert_config = None
-    if should_apply_alerts(c):
-        alert_config = {
-            "warn_pct": ALERT_WARN_PCT,
-            "crit_pct": ALERT_CRIT_PCT,
-            "sustain_seconds": ALERT_SUSTAIN_MINUTES * 60,
-            "step_seconds": step_to_seconds(step),
-        }
+    alert_config = _alert_config_for(c, step)
 
     t0 = time.time()
-    data = prom_query_range(prom_url, promql, start=start, end=end, step=step)
+    if pushdown and alert_config is not None:
+        alert_config = {**alert_config, "mode": "pushdown"}
+        summarized = await _pushdown_series(
+            prom_url, promql, range_str=range_str, start=start, end=end, step=step, alert_config=alert_config
+        )
+    else:
+        clock = summarize_stopwatch()
+        summarized = [
+            clock.call(summarize_series, series, include_samples, alert_config=alert_config, budget=budget)
+            async for series in _iter_check_series(c.kind, prom_url, promql, start=start, end=end, step=step)
+        ]
+        clock.record()
     elapsed_ms = int((time.time() - t0) * 1000)
-    result = data.get("data", {}).get("result", [])
-    summarized = summarize_matrix(result, include_samples=include_samples, alert_config=alert_config)
+    return _check_entry(c, summarized, elapsed_ms=elapsed_ms, alert_config=alert_config)
+
+
+def _check_entry(
+    c: Check,
+    summarized: List[Dict[str, Any]],
+    *,
+    elapsed_ms: int,
+    alert_config: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
     return {
-        "check": {"id": c.id, "name": c.name, "description": c.description},
+        "check": _check_info(c),
         "series_count": len(summarized),
         "elapsed_ms": elapsed_ms,
         "alert_config": alert_config,
@@ -148,12 +364,56 @@ def _run_single_check(
     }
 
 
+async def _run_check_batch(
+    batch: QueryBatch,
+    *,
+    prom_url: str,
+    start: datetime,
+    end: datetime,
+    step: str,
+    include_samples: bool,
+    budget: Optional[SampleBudget],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run one coalesced query and demultiplex its series into per-check entries.
+
+    Series are routed by the check tag label and summarized as they arrive.
+    """
+    alert_configs = {check_id: _alert_config_for(CHECKS[check_id], step) for check_id in batch.check_ids}
+    summarized: Dict[str, List[Dict[str, Any]]] = {check_id: [] for check_id in batch.check_ids}
+
+    t0 = time.time()
+    kind = CHECKS[batch.check_ids[0]].kind
+    clock = summarize_stopwatch()
+    async for series in _iter_check_series(kind, prom_url, batch.promql, start=start, end=end, step=step):
+        check_id, untagged = split_check_tag(series)
+        if check_id not in summarized:
+            continue
+        summarized[check_id].append(
+            clock.call(
+                summarize_series, untagged, include_samples, alert_config=alert_configs[check_id], budget=budget
+            )
+        )
+    clock.record()
+    elapsed_ms = int((time.time() - t0) * 1000)
+
+    return {
+        check_id: _check_entry(
+            CHECKS[check_id],
+            summarized[check_id],
+            elapsed_ms=elapsed_ms,
+            alert_config=alert_configs[check_id],
+        )
+        for check_id in batch.check_ids
+    }
+
+
 @mcp.tool()
-def run_all_checks(
+async def run_all_checks(
     hours: Optional[int] = None,
     minutes: Optional[int] = None,
     days: Optional[int] = None,
-    step: str = "5m",
+    step: str = "auto",
     include_samples: bool = False,
     start_time_utc_iso: Optional[str] = None,
     end_time_utc_iso: Optional[str] = None,
@@ -162,22 +422,30 @@ def run_all_checks(
     end_offset_days: Optional[int] = None,
     server_name: Optional[str] = None,
     instance: Optional[str] = None,
-    environment: Optional[str] = None,
+    environment: Optional[Union[str, List[str]]] = None,
     env_hint: Optional[str] = None,
+    max_points: Optional[int] = None,
+    downsample: str = "minmax",
+    pushdown: bool = False,
 ) -> Dict[str, Any]:
     """
-    Run all allowlisted checks in parallel for the same time range and filters.
+    Run all allowlisted checks concurrently for the same time range and filters.
 
     Inputs are equivalent to `run_check`, including:
     - `server_name`: filter by label `server_name`
     - `instance`: filter by label `instance` (single-target filter)
-
-    Note:
-    - `step` is fixed to `5m` in this tool to control payload size.
-      Any provided `step` value is ignored.
+    - `environment`: `"all"` or a list fans out across environments
+    - `step`: `auto` (default) scales with the window like `run_check`, capped
+      at the sustain window because the run includes percent checks: one step
+      is shared by every check, so long windows trade query cost for not
+      stepping over a sustained breach. Pass a coarser explicit step to
+      sample instead, or `pushdown=True` to keep the percent checks' points
+      out of the response.
+    - `pushdown`: percent range checks are evaluated by Prometheus as in
+      `run_check(pushdown=True)`; the other checks run unchanged.
     """
-    step = "5m"
-    env_key, prom_url = resolve_prom_url(environment, env_hint)
+    multi = is_multi_environment(environment)
+    targets = resolve_prom_urls(environment) if multi else [resolve_prom_url(environment, env_hint)]
     start, end = resolve_time_range(
         hours=hours,
         minutes=minutes,
@@ -188,47 +456,148 @@ def run_all_checks(
         end_offset_hours=end_offset_hours,
         end_offset_days=end_offset_days,
     )
-    validate_sample_volume(include_samples=include_samples, start=start, end=end, step=step)
+    step = resolve_step(
+        step,
+        start=start,
+        end=end,
+        max_step_seconds=_max_step_for(list(CHECKS.values())),
+        include_samples=include_samples,
+        max_points=max_points,
+    )
+    budget = sample_budget(max_points, downsample)
+    validate_sample_volume(include_samples=include_samples, start=start, end=end, step=step, max_points=max_points)
+    _validate_pushdown(pushdown, include_samples=include_samples)
+    pushed = tuple(c.id for c in CHECKS.values() if pushdown and _alert_config_for(c, step) is not None)
     range_str = format_range(end - start)
 
+    async def _run(env_key: str, prom_url: str) -> Dict[str, Any]:
+        target = await server_inventory.resolve_filter(
+            env_key, prom_url, server_name=server_name, instance=instance, end=end
+        )
+        batches = plan_check_batches(
+            [c for c in CHECKS.values() if c.id not in pushed],
+            lambda c: apply_target_filter(render_promql(c, range_str), **target.as_dict()),
+            max_batch_size=PROM_COALESCE_MAX_CHECKS,
+        )
+        result = await _run_checks_for_environment(
+            batches,
+            prom_url=prom_url,
+            range_str=range_str,
+            start=start,
+            end=end,
+            step=step,
+            include_samples=include_samples,
+            budget=budget,
+            server_name=target.server_name,
+            instance=target.instance,
+            pushdown_ids=pushed,
+        )
+        return {**_resolved_filter(target, server_name=server_name, instance=instance), **result}
+
+    header = {
+        "filter": {"server_name": server_name, "instance": instance},
+        "range": {"start": iso(start), "end": iso(end), "step": step},
+    }
+    if multi:
+        fanned = await fan_out_environments(targets, _run)
+        return {**header, **fanned}
+
+    env_key, prom_url = targets[0]
+    return {"environment": env_key, "prom_url": prom_url, **header, **await _run(env_key, prom_url)}
+
+
+async def _run_checks_for_environment(
+    batches: List[QueryBatch],
+    *,
+    prom_url: str,
+    range_str: str,
+    start: datetime,
+    end: datetime,
+    step: str,
+    include_samples: bool,
+    budget: Optional[SampleBudget],
+    server_name: Optional[str],
+    instance: Optional[str],
+    pushdown_ids: Tuple[str, ...] = (),
+) -> Dict[str, Any]:
+    """Execute a planned `run_all_checks` against one Prometheus."""
     check_ids: List[str] = list(CHECKS.keys())
-    max_workers = max(1, min(MAX_PARALLEL_CHECKS, len(check_ids)))
-    out_map: Dict[str, Dict[str, Any]] = {}
+    max_concurrency = max(1, min(MAX_PARALLEL_CHECKS, len(check_ids)))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    backend_queries = 0
+    fallback_queries = 0
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {
-            check_id: ex.submit(
-                _run_single_check,
-                CHECKS[check_id],
-                prom_url=prom_url,
-                range_str=range_str,
-                start=start,
-                end=end,
-                step=step,
-                include_samples=include_samples,
-                server_name=server_name,
-                instance=instance,
-            )
-            for check_id in check_ids
-        }
-        for check_id, fut in futures.items():
-            c = CHECKS[check_id]
+    async def _run_guarded(check_id: str, pushdown: bool = False, fallback: bool = False) -> Dict[str, Any]:
+        nonlocal backend_queries, fallback_queries
+        c = CHECKS[check_id]
+        try:
+            async with semaphore:
+                backend_queries += 1
+                fallback_queries += fallback
+                return await _run_single_check(
+                    c,
+                    prom_url=prom_url,
+                    range_str=range_str,
+                    start=start,
+                    end=end,
+                    step=step,
+                    include_samples=include_samples,
+                    budget=budget,
+                    server_name=server_name,
+                    instance=instance,
+                    pushdown=pushdown,
+                )
+        except Exception as exc:
+            return {
+                "check": _check_info(c),
+                "error": str(exc),
+            }
+
+    async def _run_batch(batch: QueryBatch) -> Dict[str, Dict[str, Any]]:
+        nonlocal backend_queries
+        if batch.coalesced:
             try:
-                out_map[check_id] = fut.result()
-            except Exception as exc:
-                out_map[check_id] = {
-                    "check": {"id": c.id, "name": c.name, "description": c.description},
-                    "error": str(exc),
-                }
+                async with semaphore:
+                    backend_queries += 1
+                    return await _run_check_batch(
+                        batch,
+                        prom_url=prom_url,
+                        start=start,
+                        end=end,
+                        step=step,
+                        include_samples=include_samples,
+                        budget=budget,
+                    )
+            except Exception:
+                # Fall back to one query per check so a single bad check is isolated.
+                pass
+        results = await asyncio.gather(
+            *(_run_guarded(check_id, fallback=batch.coalesced) for check_id in batch.check_ids)
+        )
+        return dict(zip(batch.check_ids, results))
+
+    out_map: Dict[str, Dict[str, Any]] = {}
+    batch_results, pushed_results = await asyncio.gather(
+        asyncio.gather(*(_run_batch(batch) for batch in batches)),
+        asyncio.gather(*(_run_guarded(check_id, pushdown=True) for check_id in pushdown_ids)),
+    )
+    for batch_result in batch_results:
+        out_map.update(batch_result)
+    out_map.update(zip(pushdown_ids, pushed_results))
 
     out = [out_map[check_id] for check_id in check_ids]
     failed = sum(1 for item in out if "error" in item)
     return {
-        "environment": env_key,
-        "prom_url": prom_url,
-        "filter": {"server_name": server_name, "instance": instance},
-        "range": {"start": iso(start), "end": iso(end), "step": step},
-        "parallel_workers": max_workers,
+        "parallel_workers": max_concurrency,
+        "query_plan": {
+            "checks": len(check_ids),
+            "batches": len(batches),
+            "coalesced_batches": [list(batch.check_ids) for batch in batches if batch.coalesced],
+            **({"pushdown_checks": list(pushdown_ids)} if pushdown_ids else {}),
+            "backend_queries": backend_queries,
+            "fallback_queries": fallback_queries,
+            "requests_saved": max(0, len(check_ids) - backend_queries),
+        },
         "failed_checks": failed,
         "checks": out,
     }
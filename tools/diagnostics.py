@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from core.metrics import metrics
+from core.server import mcp
+from infra.alert_snapshots import alert_poller
+from infra.async_http import backend_flights
+from infra.async_prom_client import query_cache
+from infra.http_pool import pool_manager
+from infra.loki_label_index import loki_label_index
+from infra.server_inventory import server_inventory
+
+
+@mcp.tool()
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Return in-process Prometheus query cache statistics.
+
+    Response:
+    - prometheus_query_cache: entries/bytes, limits, hit/miss/eviction/expiration counters
+    """
+    return {"prometheus_query_cache": query_cache.stats()}
+
+
+@mcp.tool()
+def get_server_metrics(output_format: str = "json") -> Dict[str, Any]:
+    """
+    Return this server's self-metrics, to tell backend latency from local overhead.
+
+    Metrics:
+    - mcp_tool_calls_total{tool,outcome}, mcp_tool_in_flight{tool}
+    - mcp_tool_stage_seconds{tool,stage}: execute / serialize / total
+    - mcp_backend_requests_total{backend,status}, mcp_backend_in_flight{backend}
+    - mcp_backend_stage_seconds{backend,stage}: pool_wait / connect / server / download / decode / request
+    - mcp_backend_connections_total{backend,reused}
+    - mcp_backend_coalesced_total{backend}: calls that joined an identical in-flight request
+    - mcp_processing_seconds{stage}: local summarization
+    - mcp_index_refresh_seconds{index}, mcp_index_refresh_total, mcp_index_refresh_errors_total
+
+    JSON output also includes per-host connection pool stats (reuse ratio,
+    peak in-flight, saturated requests, pool wait), single-flight and query
+    cache stats.
+
+    Inputs:
+    - output_format: `json` (histograms as count/avg/p50/p90/p99) or `prometheus` (text exposition).
+    """
+    if output_format == "prometheus":
+        return {"format": "prometheus", "text": metrics.render_prometheus()}
+    if output_format != "json":
+        raise ValueError("output_format must be 'json' or 'prometheus'")
+    return {
+        "format": "json",
+        **metrics.snapshot(),
+        "connection_pools": pool_manager.stats()["pools"],
+        "single_flight": backend_flights.stats(),
+        "prometheus_query_cache": query_cache.stats(),
+        "loki_label_index": loki_label_index.stats(),
+        "server_inventory": server_inventory.stats(),
+        "alert_poller": alert_poller.stats(),
+    }
@@ -1,17 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import re
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from core.config import LOKI_ENV_URLS
-from core.runtime import resolve_loki_url
+from core.runtime import resolve_loki_url, resolve_step, validate_sample_volume
 from core.server import mcp
-from core.time_utils import iso, iso_jakarta, resolve_time_range
-from infra.loki_client import build_loki_selector, loki_label_values, loki_query_range
+from core.time_utils import iso, iso_jakarta, parse_step, resolve_time_range, step_to_seconds, to_unix_ns
+from infra.async_loki_client import loki_label_values, loki_query_range
+from infra.log_pages import LogCursor, LogPage, iter_log_pages
+from infra.loki_label_index import LabelSnapshot, loki_label_index
+from infra.loki_client import build_loki_selector
+from utils.downsample import sample_budget
+from utils.log_templates import TemplateMiner
+from utils.ranking import TopN, validate_ranking
+from utils.summarize import summarize_matrix
 
 DEFAULT_DISCOVERY_HOURS = 1
 DEFAULT_LOG_LIMIT = 200
 MAX_LOG_LIMIT = 1000
+DEFAULT_SUMMARY_LINES = 10_000
+MAX_SUMMARY_LINES = 200_000
+# Loki's default `max_entries_limit_per_query`.
+SUMMARY_PAGE_SIZE = 5000
+AGGREGATIONS = ("count_over_time", "rate")
+# Loki's default `max_query_points` per series of a metric query.
+MAX_METRIC_POINTS = 11_000
+_LABEL_NAME_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
 
 
 def _resolve_log_range(
@@ -38,6 +56,34 @@ def _resolve_log_range(
     )
 
 
+def _uses_index_window(
+    *,
+    hours: Optional[int],
+    minutes: Optional[int],
+    days: Optional[int],
+    start_time_utc_iso: Optional[str],
+    end_time_utc_iso: Optional[str],
+    end_offset_minutes: Optional[int],
+    end_offset_hours: Optional[int],
+    end_offset_days: Optional[int],
+) -> bool:
+    """True when the request asks for the trailing window the label index keeps."""
+    if not loki_label_index.enabled:
+        return False
+    if start_time_utc_iso or end_time_utc_iso or end_offset_minutes or end_offset_hours or end_offset_days:
+        return False
+    if minutes or days:
+        return False
+    requested = hours if hours is not None else DEFAULT_DISCOVERY_HOURS
+    return requested * 3600 == loki_label_index.window_sec
+
+
+def _index_range(snapshot: LabelSnapshot) -> Dict[str, str]:
+    end = datetime.fromtimestamp(snapshot.built_at, tz=timezone.utc)
+    start = datetime.fromtimestamp(snapshot.built_at - snapshot.window_sec, tz=timezone.utc)
+    return {"start": iso(start), "end": iso(end)}
+
+
 def _dedupe_sorted(values: List[str], limit: int) -> List[str]:
     return sorted(set(v for v in values if v))[:limit]
 
@@ -51,7 +97,12 @@ def _format_logql(selector: str, contains: Optional[str], level: Optional[str])
     return query
 
 
-def _ns_to_datetime(value: str) -> datetime:
+def _format_metric_logql(log_query: str, *, aggregation: str, step: str, by: List[str]) -> str:
+    grouping = f" by ({', '.join(by)})" if by else ""
+    return f"sum{grouping} ({aggregation}({log_query} [{step}]))"
+
+
+def _ns_to_datetime(value: Union[str, int]) -> datetime:
     return datetime.fromtimestamp(int(value) / 1_000_000_000, tz=timezone.utc)
 
 
@@ -62,7 +113,7 @@ def list_loki_environments() -> Dict[str, Any]:
 
 
 @mcp.tool()
-def list_loki_hosts(
+async def list_loki_hosts(
     loki_environment: str,
     log_env: Optional[str] = None,
     app: Optional[str] = None,
@@ -76,8 +127,15 @@ def list_loki_hosts(
     end_offset_days: Optional[int] = None,
     limit: int = 100,
 ) -> Dict[str, Any]:
+    """
+    List hosts that shipped logs, optionally filtered by `log_env`/`app`.
+
+    The default trailing window is answered from the in-memory label index;
+    `index.age_sec` tells how old that snapshot is. Any other window queries
+    Loki directly (`index.source` = `live`).
+    """
     env_key, loki_url = resolve_loki_url(loki_environment)
-    start, end = _resolve_log_range(
+    window = dict(
         hours=hours,
         minutes=minutes,
         days=days,
@@ -86,22 +144,37 @@ def list_loki_hosts(
         end_offset_minutes=end_offset_minutes,
         end_offset_hours=end_offset_hours,
         end_offset_days=end_offset_days,
-        default_hours=DEFAULT_DISCOVERY_HOURS,
     )
+    filters = {"log_env": log_env, "app": app}
+    if _uses_index_window(**window):
+        snapshot = await loki_label_index.snapshot(env_key, loki_url)
+        hosts = snapshot.hosts_for(log_env, app)[:limit]
+        return {
+            "loki_environment": env_key,
+            "loki_url": loki_url,
+            "filters": filters,
+            "range": _index_range(snapshot),
+            "index": snapshot.describe(),
+            "count": len(hosts),
+            "hosts": hosts,
+        }
+
+    start, end = _resolve_log_range(**window, default_hours=DEFAULT_DISCOVERY_HOURS)
     selector = build_loki_selector(env=log_env, app=app)
-    hosts = _dedupe_sorted(list(loki_label_values(loki_url, "host", selectors=[selector], start=start, end=end)), limit)
+    hosts = _dedupe_sorted(list(await loki_label_values(loki_url, "host", selectors=[selector], start=start, end=end)), limit)
     return {
         "loki_environment": env_key,
         "loki_url": loki_url,
-        "filters": {"log_env": log_env, "app": app},
+        "filters": filters,
         "range": {"start": iso(start), "end": iso(end)},
+        "index": {"source": "live"},
         "count": len(hosts),
         "hosts": hosts,
     }
 
 
 @mcp.tool()
-def list_loki_apps(
+async def list_loki_apps(
     loki_environment: str,
     log_env: Optional[str] = None,
     host: Optional[str] = None,
@@ -115,8 +188,15 @@ def list_loki_apps(
     end_offset_days: Optional[int] = None,
     limit: int = 100,
 ) -> Dict[str, Any]:
+    """
+    List apps that shipped logs, optionally filtered by `log_env`/`host`.
+
+    The default trailing window is answered from the in-memory label index;
+    `index.age_sec` tells how old that snapshot is. Any other window queries
+    Loki directly (`index.source` = `live`).
+    """
     env_key, loki_url = resolve_loki_url(loki_environment)
-    start, end = _resolve_log_range(
+    window = dict(
         hours=hours,
         minutes=minutes,
         days=days,
@@ -125,22 +205,37 @@ def list_loki_apps(
         end_offset_minutes=end_offset_minutes,
         end_offset_hours=end_offset_hours,
         end_offset_days=end_offset_days,
-        default_hours=DEFAULT_DISCOVERY_HOURS,
     )
+    filters = {"log_env": log_env, "host": host}
+    if _uses_index_window(**window):
+        snapshot = await loki_label_index.snapshot(env_key, loki_url)
+        apps = snapshot.apps_for(log_env, host)[:limit]
+        return {
+            "loki_environment": env_key,
+            "loki_url": loki_url,
+            "filters": filters,
+            "range": _index_range(snapshot),
+            "index": snapshot.describe(),
+            "count": len(apps),
+            "apps": apps,
+        }
+
+    start, end = _resolve_log_range(**window, default_hours=DEFAULT_DISCOVERY_HOURS)
     selector = build_loki_selector(env=log_env, host=host)
-    apps = _dedupe_sorted(list(loki_label_values(loki_url, "app", selectors=[selector], start=start, end=end)), limit)
+    apps = _dedupe_sorted(list(await loki_label_values(loki_url, "app", selectors=[selector], start=start, end=end)), limit)
     return {
         "loki_environment": env_key,
         "loki_url": loki_url,
-        "filters": {"log_env": log_env, "host": host},
+        "filters": filters,
         "range": {"start": iso(start), "end": iso(end)},
+        "index": {"source": "live"},
         "count": len(apps),
         "apps": apps,
     }
 
 
 @mcp.tool()
-def find_logs(
+async def find_logs(
     loki_environment: str,
     log_env: str,
     host: str,
@@ -156,9 +251,195 @@ def find_logs(
     limit: int = DEFAULT_LOG_LIMIT,
     contains: Optional[str] = None,
     level: Optional[str] = None,
+    cursor: Optional[str] = None,
+    summarize: bool = False,
+    scan_limit: int = DEFAULT_SUMMARY_LINES,
 ) -> Dict[str, Any]:
+    """
+    Fetch log lines for one host/app, newest first.
+
+    Pagination:
+    - Each response carries `next_cursor` while older lines remain in the window.
+    - Pass it back as `cursor` with the same filters to get the next `limit`
+      lines with no overlap; the time window is taken from the cursor.
+
+    Summarize mode (`summarize=True`):
+    - Scans up to `scan_limit` lines (max 200000) and clusters them into
+      templates with numbers, IDs, IPs and timestamps masked.
+    - Returns the `limit` most frequent templates with count, first/last
+      timestamp and one example line instead of raw lines.
+    - `next_cursor` continues the scan where it stopped.
+    """
     if limit <= 0 or limit > MAX_LOG_LIMIT:
         raise ValueError(f"limit must be between 1 and {MAX_LOG_LIMIT}")
+    if summarize and (scan_limit <= 0 or scan_limit > MAX_SUMMARY_LINES):
+        raise ValueError(f"scan_limit must be between 1 and {MAX_SUMMARY_LINES}")
+
+    env_key, loki_url = resolve_loki_url(loki_environment)
+    selector = build_loki_selector(env=log_env, host=host, app=app)
+    query = _format_logql(selector, contains=contains, level=level)
+    if cursor:
+        position = LogCursor.decode(cursor, query)
+        start, end = _ns_to_datetime(position.start_ns), _ns_to_datetime(position.end_ns)
+    else:
+        start, end = _resolve_log_range(
+            hours=hours,
+            minutes=minutes,
+            days=days,
+            start_time_utc_iso=start_time_utc_iso,
+            end_time_utc_iso=end_time_utc_iso,
+            end_offset_minutes=end_offset_minutes,
+            end_offset_hours=end_offset_hours,
+            end_offset_days=end_offset_days,
+            default_hours=1,
+        )
+        position = LogCursor(query=query, start_ns=to_unix_ns(start), end_ns=to_unix_ns(end))
+
+    header = {
+        "loki_environment": env_key,
+        "loki_url": loki_url,
+        "query": query,
+        "range": {"start": iso(start), "end": iso(end)},
+    }
+    if summarize:
+        return {**header, **await _template_summary(loki_url, position, top=limit, scan_limit=scan_limit)}
+    page = await _first_page(loki_url, position, page_size=limit)
+    return {**header, **_logs_response(page)}
+
+
+async def _first_page(loki_url: str, position: LogCursor, *, page_size: int) -> LogPage:
+    pages = iter_log_pages(loki_url, position, page_size=page_size)
+    try:
+        async for page in pages:
+            return page
+    finally:
+        await pages.aclose()
+    return LogPage(entries=[], next_cursor=None)
+
+
+async def _template_summary(loki_url: str, position: LogCursor, *, top: int, scan_limit: int) -> Dict[str, Any]:
+    """
+    Mine templates over up to `scan_limit` lines, page by page.
+
+    Mining runs in a worker thread and overlaps with fetching the next page.
+    The last page only asks for the lines still left under `scan_limit`.
+    """
+    miner = TemplateMiner()
+    mining: Optional[asyncio.Future] = None
+    cursor: Optional[LogCursor] = position
+    next_cursor: Optional[LogCursor] = None
+    scanned = 0
+    try:
+        while cursor is not None and scanned < scan_limit:
+            page = await _first_page(loki_url, cursor, page_size=min(SUMMARY_PAGE_SIZE, scan_limit - scanned))
+            if mining is not None:
+                await mining
+            mining = asyncio.ensure_future(asyncio.to_thread(miner.add_entries, page.entries))
+            scanned += len(page.entries)
+            cursor = next_cursor = page.next_cursor
+    finally:
+        if mining is not None:
+            await mining
+
+    templates = []
+    for cluster in miner.top(top):
+        first = _ns_to_datetime(cluster.first_ns) if cluster.first_ns is not None else None
+        last = _ns_to_datetime(cluster.last_ns) if cluster.last_ns is not None else None
+        templates.append(
+            {
+                "template": cluster.template,
+                "count": cluster.count,
+                "first_timestamp": iso(first) if first else None,
+                "last_timestamp": iso(last) if last else None,
+                "example": cluster.example,
+                "example_labels": cluster.example_labels,
+            }
+        )
+    return {
+        "mode": "templates",
+        "lines_scanned": scanned,
+        "template_count": len(miner.clusters),
+        "unclustered_lines": miner.unclustered,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor.encode() if next_cursor else None,
+        "templates": templates,
+    }
+
+
+def _logs_response(page: LogPage) -> Dict[str, Any]:
+    logs: List[Dict[str, Any]] = []
+    for ts_ns, labels, line in page.entries:
+        dt = _ns_to_datetime(ts_ns)
+        logs.append(
+            {
+                "timestamp": iso(dt),
+                "timestamp_jakarta": iso_jakarta(dt),
+                "labels": labels,
+                "line": line,
+            }
+        )
+
+    return {
+        "line_count": len(logs),
+        "has_more": page.next_cursor is not None,
+        "next_cursor": page.next_cursor.encode() if page.next_cursor else None,
+        "logs": logs,
+    }
+
+
+@mcp.tool()
+async def aggregate_logs(
+    loki_environment: str,
+    log_env: str,
+    host: Optional[str] = None,
+    app: Optional[str] = None,
+    hours: Optional[int] = 1,
+    minutes: Optional[int] = None,
+    days: Optional[int] = None,
+    start_time_utc_iso: Optional[str] = None,
+    end_time_utc_iso: Optional[str] = None,
+    end_offset_minutes: Optional[int] = None,
+    end_offset_hours: Optional[int] = None,
+    end_offset_days: Optional[int] = None,
+    step: str = "5m",
+    aggregation: str = "count_over_time",
+    by: Optional[List[str]] = None,
+    contains: Optional[str] = None,
+    level: Optional[str] = None,
+    include_samples: bool = False,
+    top_n: Optional[int] = None,
+    order_by: str = "max",
+    max_points: Optional[int] = None,
+    downsample: str = "minmax",
+) -> Dict[str, Any]:
+    """
+    Count log lines per `step` inside Loki with a LogQL metric query.
+
+    Use this instead of `find_logs` for "how many errors per app over the last
+    day": Loki evaluates `sum by (<by>) (<aggregation>({selector} |= ... [step]))`
+    and only the per-step counts come back, so there is no line limit.
+
+    Inputs:
+    - log_env (required), host, app: stream selector; host/app may be omitted
+      to aggregate over every host or app of `log_env`.
+    - aggregation: `count_over_time` (lines per step) or `rate` (lines per second).
+    - by: labels to group by (example: `["app"]`, `["host", "app"]`); empty sums everything.
+    - contains/level: line filters, as in `find_logs`.
+    - top_n/order_by: keep only the N busiest groups by `max`, `avg`, `last` or `min`.
+    - max_points/downsample: cap samples per group with `include_samples`, as in `run_promql`.
+
+    Each result carries the usual summary (min/max/avg/last over steps with
+    lines) plus `total_lines` for the whole window. Steps without any matching
+    line are absent from Loki's result rather than zero.
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {', '.join(AGGREGATIONS)}")
+    by = [label.strip() for label in by or [] if label and label.strip()]
+    for label in by:
+        if not _LABEL_NAME_RE.match(label):
+            raise ValueError(f"Invalid label name in by: {label}")
+    step = parse_step(step)
+    validate_ranking(top_n, order_by, has_sustain=False)
 
     env_key, loki_url = resolve_loki_url(loki_environment)
     start, end = _resolve_log_range(
@@ -172,36 +453,52 @@ def find_logs(
         end_offset_days=end_offset_days,
         default_hours=1,
     )
+    step = resolve_step(step, start=start, end=end, include_samples=include_samples, max_points=max_points)
+    step_seconds = step_to_seconds(step)
+    points = int(max(0.0, (end - start).total_seconds()) // step_seconds) + 1
+    if points > MAX_METRIC_POINTS:
+        raise ValueError(f"Too many points per series ({points}). Increase step (Loki limit={MAX_METRIC_POINTS}).")
+    budget = sample_budget(max_points, downsample)
+    validate_sample_volume(include_samples=include_samples, start=start, end=end, step=step, max_points=max_points)
+
     selector = build_loki_selector(env=log_env, host=host, app=app)
-    query = _format_logql(selector, contains=contains, level=level)
-    data = loki_query_range(
-        loki_url,
-        query,
-        start=start,
-        end=end,
-        limit=limit,
-        direction="backward",
-    )
+    query = _format_metric_logql(_format_logql(selector, contains, level), aggregation=aggregation, step=step, by=by)
 
-    logs: List[Dict[str, Any]] = []
-    for stream in data.get("data", {}).get("result", []):
-        labels = stream.get("stream", {})
-        for raw_ts, line in stream.get("values", []):
-            dt = _ns_to_datetime(raw_ts)
-            logs.append(
-                {
-                    "timestamp": iso(dt),
-                    "timestamp_jakarta": iso_jakarta(dt),
-                    "labels": labels,
-                    "line": line,
-                }
-            )
+    t0 = time.time()
+    data = await loki_query_range(loki_url, query, start=start, end=end, step=step)
+    elapsed_ms = int((time.time() - t0) * 1000)
+
+    # Counts per step sum to the window total; a rate is lines per second of each step.
+    scale = 1 if aggregation == "count_over_time" else step_seconds
+    ranking = TopN(top_n, order_by)
+    total_lines = 0.0
+    matrix = data.get("data", {}).get("result", [])
+    for series, item in zip(matrix, summarize_matrix(matrix, include_samples, budget=budget)):
+        lines = _total_lines(series.get("values", []), scale)
+        item["summary"]["total_lines"] = lines
+        total_lines += lines
+        ranking.push(item)
 
     return {
         "loki_environment": env_key,
         "loki_url": loki_url,
         "query": query,
-        "range": {"start": iso(start), "end": iso(end)},
-        "line_count": len(logs),
-        "logs": logs,
+        "aggregation": aggregation,
+        "by": by,
+        "range": {"start": iso(start), "end": iso(end), "step": step},
+        "series_count": ranking.total,
+        "total_lines": total_lines,
+        "elapsed_ms": elapsed_ms,
+        **({"ranking": ranking.describe()} if top_n is not None else {}),
+        "results": ranking.items(),
     }
+
+
+def _total_lines(values: List[List[Any]], scale: float) -> float:
+    total = 0.0
+    for _, value in values:
+        try:
+            total += float(value) * scale
+        except (TypeError, ValueError):
+            continue
+    return round(total, 3)
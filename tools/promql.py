@@ -4,23 +4,25 @@ import time
 from typing import Any, Dict, List, Optional
 
 from core.config import ALERT_CRIT_PCT, ALERT_SUSTAIN_MINUTES, ALERT_WARN_PCT
-from core.runtime import resolve_prom_url, validate_sample_volume
+from core.runtime import resolve_prom_url, resolve_step, validate_sample_volume
 from core.server import mcp
-from core.time_utils import iso, parse_step, resolve_time_range, step_to_seconds
-from infra.prom_client import prom_query_instant, prom_query_range
+from core.time_utils import iso, resolve_time_range, step_to_seconds
+from infra.async_prom_client import iter_range_series, prom_query_instant
+from utils.downsample import sample_budget
 from utils.query_utils import apply_target_filter
-from utils.summarize import stats_from_values, summarize_matrix
+from utils.ranking import TopN, validate_ranking
+from utils.summarize import stats_from_values, summarize_series, summarize_stopwatch
 
 
 @mcp.tool()
-def run_promql(
+async def run_promql(
     promql: str,
     approved: bool = False,
     instant: bool = False,
     hours: Optional[int] = None,
     minutes: Optional[int] = None,
     days: Optional[int] = None,
-    step: str = "5m",
+    step: str = "auto",
     include_samples: bool = False,
     start_time_utc_iso: Optional[str] = None,
     end_time_utc_iso: Optional[str] = None,
@@ -32,6 +34,10 @@ def run_promql(
     environment: Optional[str] = None,
     env_hint: Optional[str] = None,
     alert_pct: bool = False,
+    top_n: Optional[int] = None,
+    order_by: str = "max",
+    max_points: Optional[int] = None,
+    downsample: str = "minmax",
 ) -> Dict[str, Any]:
     """
     Run custom PromQL.
@@ -41,7 +47,20 @@ def run_promql(
 
     Modes:
     - `instant=True`: use `/api/v1/query` at a single timestamp.
-    - `instant=False`: use `/api/v1/query_range` for a time window.
+    - `instant=False`: use `/api/v1/query_range` for a time window; `step="auto"`
+      (default) scales the step with the window, as in `run_check`. With
+      `alert_pct=True` the auto step is capped at the sustain window, so
+      long windows cost more points (see `run_check`).
+
+    Ranking:
+    - `top_n`/`order_by`: keep only the N worst series by `max`, `avg`, `last`,
+      `min` or `sustain` (range mode with `alert_pct=True`).
+
+    Samples:
+    - `max_points`: with `include_samples`, return at most this many samples
+      per series, reduced by `downsample` (`minmax` keeps every bucket's peak
+      and trough, `lttb` follows the visual shape). Summaries still use every
+      sample at `step`.
     """
     if not promql or not promql.strip():
         raise ValueError("promql is required")
@@ -57,7 +76,6 @@ def run_promql(
             "message": "Set approved=True to execute this custom PromQL.",
         }
 
-    step = parse_step(step)
     env_key, prom_url = resolve_prom_url(environment, env_hint)
 
     start, end = resolve_time_range(
@@ -70,12 +88,24 @@ def run_promql(
         end_offset_hours=end_offset_hours,
         end_offset_days=end_offset_days,
     )
-    validate_sample_volume(include_samples=include_samples and not instant, start=start, end=end, step=step)
+    sustain = alert_pct and not instant
+    step = resolve_step(
+        step,
+        start=start,
+        end=end,
+        max_step_seconds=ALERT_SUSTAIN_MINUTES * 60 if sustain else None,
+        include_samples=include_samples and not instant,
+        max_points=max_points,
+    )
+    budget = sample_budget(max_points, downsample)
+    validate_sample_volume(
+        include_samples=include_samples and not instant, start=start, end=end, step=step, max_points=max_points
+    )
     filtered_promql = apply_target_filter(promql_text, server_name=server_name, instance=instance)
 
     warnings: List[str] = []
     alert_config = None
-    if alert_pct and not instant:
+    if sustain:
         alert_config = {
             "warn_pct": ALERT_WARN_PCT,
             "crit_pct": ALERT_CRIT_PCT,
@@ -84,19 +114,15 @@ def run_promql(
         }
     if alert_pct and instant:
         warnings.append("alert_pct is ignored in instant mode.")
+    validate_ranking(top_n, order_by, has_sustain=alert_config is not None)
+    ranking = TopN(top_n, order_by)
 
     t0 = time.time()
     if instant:
-        data = prom_query_instant(prom_url, filtered_promql, at=end)
-    else:
-        data = prom_query_range(prom_url, filtered_promql, start=start, end=end, step=step)
-    elapsed_ms = int((time.time() - t0) * 1000)
-
-    result_type = data.get("data", {}).get("resultType")
-    result = data.get("data", {}).get("result", [])
-
-    if instant:
-        summarized: List[Dict[str, Any]] = []
+        data = await prom_query_instant(prom_url, filtered_promql, at=end)
+        elapsed_ms = int((time.time() - t0) * 1000)
+        result_type = data.get("data", {}).get("resultType")
+        result = data.get("data", {}).get("result", [])
         if result_type == "vector":
             for series in result:
                 metric = series.get("metric", {})
@@ -105,15 +131,15 @@ def run_promql(
                 item = {"metric": metric, "summary": stats_from_values(samples)}
                 if include_samples and samples:
                     item["value"] = value
-                summarized.append(item)
+                ranking.push(item)
         elif result_type == "scalar":
             samples = [result] if isinstance(result, list) and len(result) == 2 else []
             item = {"metric": {}, "summary": stats_from_values(samples)}
             if include_samples and samples:
                 item["value"] = result
-            summarized.append(item)
+            ranking.push(item)
         else:
-            summarized.append(
+            ranking.push(
                 {
                     "metric": {},
                     "summary": {"count": 0},
@@ -133,12 +159,17 @@ def run_promql(
             "environment": env_key,
             "prom_url": prom_url,
             "time": iso(end),
-            "series_count": len(summarized),
+            "series_count": ranking.total,
             "elapsed_ms": elapsed_ms,
-            "results": summarized,
+            **({"ranking": ranking.describe()} if top_n is not None else {}),
+            "results": ranking.items(),
         }
 
-    summarized = summarize_matrix(result, include_samples=include_samples, alert_config=alert_config)
+    clock = summarize_stopwatch()
+    async for series in iter_range_series(prom_url, filtered_promql, start=start, end=end, step=step):
+        ranking.push(clock.call(summarize_series, series, include_samples, alert_config=alert_config, budget=budget))
+    clock.record()
+    elapsed_ms = int((time.time() - t0) * 1000)
     return {
         "approved": True,
         "executed": True,
@@ -150,7 +181,8 @@ def run_promql(
         "environment": env_key,
         "prom_url": prom_url,
         "range": {"start": iso(start), "end": iso(end), "step": step},
-        "series_count": len(summarized),
+        "series_count": ranking.total,
         "elapsed_ms": elapsed_ms,
-        "results": summarized,
+        **({"ranking": ranking.describe()} if top_n is not None else {}),
+        "results": ranking.items(),
     }
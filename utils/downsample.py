@@ -0,0 +1,120 @@
+"""Shape-preserving downsampling of `[[ts, "value"], ...]` series for `include_samples`."""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.config import MAX_SAMPLES_PER_SERIES
+
+METHODS = ("minmax", "lttb")
+MIN_POINTS = 4
+
+Sample = Sequence[Any]
+
+
+def _finite(values: Sequence[Sample]) -> List[Tuple[float, float, Sample]]:
+    points = []
+    for sample in values:
+        try:
+            t, v = float(sample[0]), float(sample[1])
+        except (TypeError, ValueError, IndexError):
+            continue
+        if math.isfinite(t) and math.isfinite(v):
+            points.append((t, v, sample))
+    return points
+
+
+def minmax(values: Sequence[Sample], max_points: int) -> List[Sample]:
+    """
+    Keep the first and last sample plus the minimum and maximum of each bucket.
+
+    Buckets split the series evenly by position; within a bucket the two
+    extremes are emitted in time order. Every local peak and trough that is a
+    bucket extreme survives, so the global min/max always do.
+    """
+    points = _finite(values)
+    if len(points) <= max_points:
+        return [p[2] for p in points]
+
+    inner = points[1:-1]
+    buckets = max(1, (max_points - 2) // 2)
+    size = len(inner) / buckets
+    out = [points[0][2]]
+    for b in range(buckets):
+        bucket = inner[int(b * size) : int((b + 1) * size)]
+        if not bucket:
+            continue
+        lo = min(range(len(bucket)), key=lambda i: bucket[i][1])
+        hi = max(range(len(bucket)), key=lambda i: bucket[i][1])
+        for i in sorted({lo, hi}):
+            out.append(bucket[i][2])
+    out.append(points[-1][2])
+    return out
+
+
+def lttb(values: Sequence[Sample], max_points: int) -> List[Sample]:
+    """
+    Largest-Triangle-Three-Buckets: per bucket keep the sample forming the
+    largest triangle with the previously kept sample and the next bucket's mean.
+
+    Follows the visual shape closely with exactly `max_points` samples, but an
+    isolated spike can lose to a neighbour; `minmax` guarantees extremes.
+    """
+    points = _finite(values)
+    if len(points) <= max_points:
+        return [p[2] for p in points]
+
+    buckets = max_points - 2
+    size = (len(points) - 2) / buckets
+    out = [points[0][2]]
+    a = 0
+    for b in range(buckets):
+        start = int(b * size) + 1
+        end = int((b + 1) * size) + 1
+        nxt_start, nxt_end = end, min(int((b + 2) * size) + 1, len(points))
+        if nxt_start >= nxt_end:
+            nxt_start, nxt_end = len(points) - 1, len(points)
+        nxt = points[nxt_start:nxt_end]
+        avg_t = sum(p[0] for p in nxt) / len(nxt)
+        avg_v = sum(p[1] for p in nxt) / len(nxt)
+
+        at, av = points[a][0], points[a][1]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            t, v = points[i][0], points[i][1]
+            area = abs((at - avg_t) * (v - av) - (at - t) * (avg_v - av))
+            if area > best_area:
+                best, best_area = i, area
+        out.append(points[best][2])
+        a = best
+    out.append(points[-1][2])
+    return out
+
+
+_REDUCERS = {"minmax": minmax, "lttb": lttb}
+
+
+@dataclass(frozen=True)
+class SampleBudget:
+    """Upper bound on samples returned per series, and how to reduce to it."""
+
+    max_points: int
+    method: str = "minmax"
+
+    def apply(self, values: Sequence[Sample]) -> Tuple[List[Sample], Optional[Dict[str, Any]]]:
+        """Return `(values, downsampled info or None)`; short series pass through untouched."""
+        if len(values) <= self.max_points:
+            return list(values), None
+        reduced = _REDUCERS[self.method](values, self.max_points)
+        return reduced, {"method": self.method, "points": len(reduced), "original_points": len(values)}
+
+
+def sample_budget(max_points: Optional[int], method: str = "minmax") -> Optional[SampleBudget]:
+    if max_points is None:
+        return None
+    if method not in METHODS:
+        raise ValueError(f"downsample must be one of {', '.join(METHODS)}")
+    if max_points < MIN_POINTS or max_points > MAX_SAMPLES_PER_SERIES:
+        raise ValueError(f"max_points must be between {MIN_POINTS} and {MAX_SAMPLES_PER_SERIES}")
+    return SampleBudget(max_points, method)
@@ -0,0 +1,157 @@
+"""Online log template mining (Drain) for summarizing large log result sets."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PARAM = "<*>"
+
+# One pass over the line: every masked value starts at a word boundary with a
+# hex digit, so the lookahead rejects most positions before any branch runs.
+# Branch order decides overlaps (a timestamp is not split into numbers).
+_MASK_RE = re.compile(
+    r"\b(?=[0-9a-fA-F])(?:"
+    r"(?P<TS>\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)"
+    r"|(?P<UUID>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\b"
+    r"|(?P<IP>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}(?::\d{1,5})?)\b"
+    r"|(?P<HEX>0[xX][0-9a-fA-F]+|(?!\d+\b)[0-9a-fA-F]{8,})\b"
+    r"|(?P<NUM>\d+(?:\.\d+)?)"
+    r")"
+)
+_PLACEHOLDERS = {name: f"<{name}>" for name in ("TS", "UUID", "IP", "HEX", "NUM")}
+
+
+def _placeholder(match: "re.Match[str]") -> str:
+    return _PLACEHOLDERS[match.lastgroup]  # type: ignore[index]
+
+
+# Lines are cut to this many tokens; stack traces rarely differ after that.
+MAX_TOKENS = 64
+# Distinct masked lines remembered for the exact-match fast path.
+MAX_EXACT_CACHE = 100_000
+
+
+def mask(line: str) -> str:
+    """Replace timestamps, UUIDs, IPs, hex ids and numbers with `<TS>`, `<UUID>`, ..."""
+    return _MASK_RE.sub(_placeholder, line)
+
+
+@dataclass
+class LogCluster:
+    id: int
+    tokens: List[str]
+    count: int = 0
+    first_ns: Optional[int] = None
+    last_ns: Optional[int] = None
+    example: str = ""
+    example_labels: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def observe(self, ts_ns: Optional[int], line: str, labels: Optional[Dict[str, str]]) -> None:
+        if not self.count:
+            self.example = line
+            self.example_labels = labels or {}
+        self.count += 1
+        if ts_ns is not None:
+            if self.first_ns is None or ts_ns < self.first_ns:
+                self.first_ns = ts_ns
+            if self.last_ns is None or ts_ns > self.last_ns:
+                self.last_ns = ts_ns
+
+
+class TemplateMiner:
+    """
+    Drain-style clustering of log lines into templates, one line at a time.
+
+    Lines are masked (timestamps, UUIDs, IPs, hex ids, numbers), tokenized and
+    routed through a fixed-depth tree keyed by token count and the first
+    `depth - 2` tokens. Within a leaf the most similar template absorbs the
+    line when at least `similarity` of its tokens match, turning differing
+    positions into `<*>`; otherwise a new template starts. Masked lines seen
+    before skip the tree entirely, which is what makes repetitive input
+    (the same stack trace a thousand times) cheap.
+    """
+
+    def __init__(
+        self,
+        *,
+        similarity: float = 0.4,
+        depth: int = 4,
+        max_children: int = 100,
+        max_clusters: int = 5000,
+    ) -> None:
+        if depth < 3:
+            raise ValueError("depth must be >= 3")
+        self.similarity = similarity
+        self.prefix_depth = depth - 2
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.clusters: List[LogCluster] = []
+        self.lines = 0
+        self.unclustered = 0
+        self._root: Dict[int, Dict[str, Any]] = {}
+        self._exact: Dict[str, LogCluster] = {}
+
+    def add(self, line: str, ts_ns: Optional[int] = None, labels: Optional[Dict[str, str]] = None) -> Optional[LogCluster]:
+        self.lines += 1
+        masked = mask(line)
+        cluster = self._exact.get(masked)
+        if cluster is None:
+            cluster = self._match_or_create(masked.split()[:MAX_TOKENS])
+            if cluster is None:
+                self.unclustered += 1
+                return None
+            if len(self._exact) >= MAX_EXACT_CACHE:
+                self._exact.clear()
+            self._exact[masked] = cluster
+        cluster.observe(ts_ns, line, labels)
+        return cluster
+
+    def add_entries(self, entries: Iterable[Tuple[int, Dict[str, str], str]]) -> None:
+        """Feed `(ts_ns, labels, line)` entries as produced by `infra.log_pages`."""
+        for ts_ns, labels, line in entries:
+            self.add(line, ts_ns, labels)
+
+    def _leaf(self, tokens: List[str]) -> List[LogCluster]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[: self.prefix_depth]:
+            key = PARAM if token.startswith("<") and token.endswith(">") else token
+            child = node.get(key)
+            if child is None:
+                key = key if len(node) < self.max_children else PARAM
+                child = node.setdefault(key, {})
+            node = child
+        return node.setdefault("", [])
+
+    def _match_or_create(self, tokens: List[str]) -> Optional[LogCluster]:
+        leaf = self._leaf(tokens)
+        best: Optional[LogCluster] = None
+        best_score = (-1.0, -1)
+        for cluster in leaf:
+            same = params = 0
+            for a, b in zip(cluster.tokens, tokens):
+                if a == PARAM:
+                    params += 1
+                elif a == b:
+                    same += 1
+            score = (same / len(tokens) if tokens else 1.0, params)
+            if score > best_score:
+                best, best_score = cluster, score
+
+        if best is not None and best_score[0] >= self.similarity:
+            best.tokens = [a if a == b else PARAM for a, b in zip(best.tokens, tokens)]
+            return best
+        if len(self.clusters) >= self.max_clusters:
+            return None
+        cluster = LogCluster(id=len(self.clusters) + 1, tokens=list(tokens))
+        self.clusters.append(cluster)
+        leaf.append(cluster)
+        return cluster
+
+    def top(self, n: Optional[int] = None) -> List[LogCluster]:
+        ranked = sorted(self.clusters, key=lambda c: (-c.count, c.id))
+        return ranked if n is None else ranked[:n]
@@ -0,0 +1,87 @@
+"""Execution planning for batched allowlisted checks."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from domain.checks import Check
+
+CHECK_ID_LABEL = "mcp_check_id"
+
+# Parts of a PromQL expression that never contain metric names.
+_NON_METRIC_RE = re.compile(r"\{[^}]*\}|\[[^\]]*\]|\b(?:by|without|on|ignoring|group_left|group_right)\s*\([^)]*\)")
+# Identifiers not followed by `(` (functions and aggregations are).
+_NAME_RE = re.compile(r"(?<![\w:.])([a-zA-Z_:][\w:]*)\b(?!\s*\()")
+_KEYWORDS = frozenset(("and", "or", "unless", "bool", "offset", "inf", "nan"))
+
+
+@dataclass(frozen=True)
+class QueryBatch:
+    check_ids: Tuple[str, ...]
+    promql: str
+
+    @property
+    def coalesced(self) -> bool:
+        return len(self.check_ids) > 1
+
+
+def metric_families(promql: str) -> Tuple[str, ...]:
+    """
+    Metric families an expression selects: each metric name cut to its first
+    two `_` segments (`node_cpu_seconds_total` -> `node_cpu`), sorted.
+    """
+    stripped = _NON_METRIC_RE.sub(" ", promql)
+    names = {m for m in _NAME_RE.findall(stripped) if m.lower() not in _KEYWORDS}
+    return tuple(sorted({"_".join(name.split("_")[:2]) for name in names}))
+
+
+def batch_group(c: Check) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Checks are compatible for coalescing when they share an execution kind and
+    select the same metric families (`node_sockstat`, `pg_stat`, ...).
+    """
+    return c.kind, metric_families(c.promql)
+
+
+def tag_promql(promql: str, check_id: str) -> str:
+    return f'label_replace({promql}, "{CHECK_ID_LABEL}", "{check_id}", "", "")'
+
+
+def plan_check_batches(
+    checks: Sequence[Check],
+    render: Callable[[Check], str],
+    *,
+    max_batch_size: int,
+) -> List[QueryBatch]:
+    """
+    Merge compatible checks into `or`-joined queries tagged per check.
+
+    Each sub-query is tagged with `CHECK_ID_LABEL`, so series from different
+    checks never share a label set and `or` keeps all of them. Batches keep
+    catalog order; `max_batch_size <= 1` disables coalescing.
+    """
+    groups: Dict[Tuple[str, Tuple[str, ...]], List[Check]] = {}
+    for c in checks:
+        groups.setdefault(batch_group(c), []).append(c)
+
+    size = max(1, max_batch_size)
+    batches: List[QueryBatch] = []
+    for members in groups.values():
+        for i in range(0, len(members), size):
+            part = members[i : i + size]
+            if len(part) == 1:
+                batches.append(QueryBatch(check_ids=(part[0].id,), promql=render(part[0])))
+                continue
+            promql = " or ".join(tag_promql(render(c), c.id) for c in part)
+            batches.append(QueryBatch(check_ids=tuple(c.id for c in part), promql=promql))
+    return batches
+
+
+def split_check_tag(series: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Return `(check_id, series_without_tag)` for one series of a coalesced result."""
+    metric = dict(series.get("metric", {}))
+    check_id = metric.pop(CHECK_ID_LABEL, None)
+    untagged = dict(series)
+    untagged["metric"] = metric
+    return check_id, untagged
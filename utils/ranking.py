@@ -0,0 +1,84 @@
+"""Bounded-memory top-N selection over summarized series."""
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+ORDER_BY_CHOICES = ("max", "avg", "last", "min", "sustain")
+
+RankKey = Tuple[float, float]
+_UNRANKED: RankKey = (-math.inf, -math.inf)
+
+
+def validate_ranking(top_n: Optional[int], order_by: str, *, has_sustain: bool) -> None:
+    if top_n is None:
+        return
+    if top_n < 1:
+        raise ValueError("top_n must be >= 1")
+    if order_by not in ORDER_BY_CHOICES:
+        raise ValueError(f"order_by must be one of {', '.join(ORDER_BY_CHOICES)}")
+    if order_by == "sustain" and not has_sustain:
+        raise ValueError("order_by='sustain' requires alert thresholds (a percent check or alert_pct=True)")
+
+
+def _breach_seconds(level: Dict[str, Any]) -> float:
+    return float(level.get("max_duration_sec", level.get("breach_duration_sec", 0.0)))
+
+
+def rank_value(item: Dict[str, Any], order_by: str) -> RankKey:
+    """
+    Sort key of one summarized series; larger is worse.
+
+    `sustain` ranks by `(critical, warning)` breach seconds: the longest
+    critical breach, then the longest warning breach (total breach time for
+    push-down summaries, which carry no longest run). Other orders rank by
+    `(value, 0)`. Series without samples always rank last.
+    """
+    summary = item.get("summary", {})
+    if not summary.get("count"):
+        return _UNRANKED
+    if order_by == "sustain":
+        sustain = summary.get("sustain") or {}
+        return _breach_seconds(sustain.get("critical", {})), _breach_seconds(sustain.get("warning", {}))
+    value = summary.get(order_by)
+    return (float(value), 0.0) if value is not None else _UNRANKED
+
+
+class TopN:
+    """
+    Keep the `n` worst series seen so far in a min-heap of size `n`.
+
+    Memory is O(n) regardless of how many series are pushed; `total` counts
+    every series. Ties keep the series that arrived first. With `n=None`
+    every series is kept in arrival order.
+    """
+
+    def __init__(self, n: Optional[int], order_by: str = "max") -> None:
+        self.n = n
+        self.order_by = order_by
+        self.total = 0
+        self._heap: List[Tuple[RankKey, int, Dict[str, Any]]] = []
+        self._all: List[Dict[str, Any]] = []
+
+    def push(self, item: Dict[str, Any]) -> None:
+        if self.n is None:
+            self.total += 1
+            self._all.append(item)
+            return
+        entry = (rank_value(item, self.order_by), -self.total, item)
+        self.total += 1
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self) -> List[Dict[str, Any]]:
+        if self.n is None:
+            return list(self._all)
+        return [item for _, _, item in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def describe(self) -> Optional[Dict[str, Any]]:
+        if self.n is None:
+            return None
+        return {"top_n": self.n, "order_by": self.order_by, "returned": len(self._heap)}
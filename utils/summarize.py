@@ -1,24 +1,25 @@
 from __future__ import annotations
 
 import math
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from core.metrics import Stopwatch, metrics
+from utils.downsample import SampleBudget
 
-def stats_from_values(values: List[List[Any]]) -> Dict[str, Any]:
-    nums: List[float] = []
-    last_ts: Optional[float] = None
-    last_val: Optional[float] = None
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional speedup
+    np = None
+
+# Below this many samples the NumPy setup cost outweighs the vectorized pass.
+NUMPY_MIN_SAMPLES = 256
+
+
+def _gap_reset(step_seconds: int) -> int:
+    return max(1, int(step_seconds * 1.5))
 
-    for ts, v in values:
-        try:
-            fv = float(v)
-            if math.isfinite(fv):
-                nums.append(fv)
-                last_ts = float(ts)
-                last_val = fv
-        except Exception:
-            continue
 
+def _stats(nums: List[float], last_ts: Optional[float], last_val: Optional[float]) -> Dict[str, Any]:
     if not nums:
         return {"count": 0}
 
@@ -32,79 +33,198 @@ def stats_from_values(values: List[List[Any]]) -> Dict[str, Any]:
     }
 
 
-def max_sustain_duration(
-    values: List[List[Any]],
-    *,
-    threshold: float,
+def _summarize_python(
+    values: Sequence[Sequence[Any]],
+    thresholds: Sequence[float],
     step_seconds: int,
-) -> float:
-    max_dur = 0.0
-    active_start: Optional[float] = None
+) -> Tuple[Dict[str, Any], List[float]]:
+    nums: List[float] = []
     last_ts: Optional[float] = None
-    gap_reset = max(1, int(step_seconds * 1.5))
+    last_val: Optional[float] = None
+
+    gap_reset = _gap_reset(step_seconds)
+    n_thresholds = len(thresholds)
+    active: List[Optional[float]] = [None] * n_thresholds
+    max_dur: List[float] = [0.0] * n_thresholds
+    prev_t: Optional[float] = None
 
     for ts, v in values:
         try:
-            t = float(ts)
             fv = float(v)
-            if not math.isfinite(fv):
-                raise ValueError()
         except Exception:
-            last_ts = None
-            active_start = None
+            fv = math.nan
+        if not math.isfinite(fv):
+            prev_t = None
+            active = [None] * n_thresholds
             continue
+        nums.append(fv)
 
-        if last_ts is not None and (t - last_ts) > gap_reset:
-            active_start = None
+        try:
+            t = float(ts)
+        except Exception:
+            prev_t = None
+            active = [None] * n_thresholds
+            continue
+        last_ts = t
+        last_val = fv
 
-        if fv >= threshold:
-            if active_start is None:
-                active_start = t
-            dur = t - active_start
-            if dur > max_dur:
-                max_dur = dur
-        else:
-            active_start = None
+        if prev_t is not None and (t - prev_t) > gap_reset:
+            active = [None] * n_thresholds
+        for i in range(n_thresholds):
+            if fv >= thresholds[i]:
+                start = active[i]
+                if start is None:
+                    active[i] = start = t
+                dur = t - start
+                if dur > max_dur[i]:
+                    max_dur[i] = dur
+            else:
+                active[i] = None
+        prev_t = t
 
-        last_ts = t
+    return _stats(nums, last_ts, last_val), max_dur
+
+
+def _summarize_numpy(
+    values: Sequence[Sequence[Any]],
+    thresholds: Sequence[float],
+    step_seconds: int,
+) -> Optional[Tuple[Dict[str, Any], List[float]]]:
+    n = len(values)
+    try:
+        ts = np.fromiter((float(s[0]) for s in values), dtype=np.float64, count=n)
+        vs = np.fromiter((float(s[1]) for s in values), dtype=np.float64, count=n)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if not np.isfinite(ts).all():
+        return None
 
-    return max_dur
+    valid = np.isfinite(vs)
+    valid_idx = np.flatnonzero(valid)
+    if valid_idx.size == 0:
+        return {"count": 0}, [0.0] * len(thresholds)
+
+    # Reductions go through Python's min/max/sum on the decoded floats so the
+    # result is bit-for-bit identical to the pure-Python path.
+    nums = vs[valid].tolist()
+    last = int(valid_idx[-1])
+    stats = _stats(nums, float(ts[last]), float(vs[last]))
+
+    gap_break = np.zeros(n, dtype=bool)
+    gap_break[1:] = valid[:-1] & ((ts[1:] - ts[:-1]) > _gap_reset(step_seconds))
+    max_dur: List[float] = []
+    for threshold in thresholds:
+        breach = valid & (vs >= threshold)
+        if not breach.any():
+            max_dur.append(0.0)
+            continue
+        run_start = breach.copy()
+        run_start[1:] &= ~breach[:-1] | gap_break[1:]
+        start_idx = np.flatnonzero(run_start)
+        run_id = np.cumsum(run_start) - 1
+        durations = ts[breach] - ts[start_idx[run_id[breach]]]
+        max_dur.append(max(0.0, float(durations.max())))
+    return stats, max_dur
+
+
+def summarize_values(
+    values: Sequence[Sequence[Any]],
+    *,
+    thresholds: Sequence[float] = (),
+    step_seconds: int = 0,
+) -> Tuple[Dict[str, Any], List[float]]:
+    """
+    Decode one `[[ts, "value"], ...]` series once and return `(stats, max_sustain_per_threshold)`.
+
+    Uses NumPy for large series when installed; output is identical either way.
+    """
+    if np is not None and len(values) >= NUMPY_MIN_SAMPLES:
+        result = _summarize_numpy(values, thresholds, step_seconds)
+        if result is not None:
+            return result
+    return _summarize_python(values, thresholds, step_seconds)
+
+
+def stats_from_values(values: List[List[Any]]) -> Dict[str, Any]:
+    stats, _ = summarize_values(values)
+    return stats
+
+
+def max_sustain_duration(
+    values: List[List[Any]],
+    *,
+    threshold: float,
+    step_seconds: int,
+) -> float:
+    _, max_dur = summarize_values(values, thresholds=(threshold,), step_seconds=step_seconds)
+    return max_dur[0]
+
+
+def summarize_series(
+    series: Dict[str, Any],
+    include_samples: bool,
+    *,
+    alert_config: Optional[Dict[str, Any]] = None,
+    budget: Optional[SampleBudget] = None,
+) -> Dict[str, Any]:
+    """
+    Summarize one series; statistics always use every sample, while the
+    samples returned with `include_samples` are reduced to `budget` if given.
+
+    Not timed here: callers time a whole check or matrix (`summarize_stopwatch`).
+    """
+    metric = series.get("metric", {})
+    values = series.get("values", [])
+    thresholds: Tuple[float, ...] = ()
+    step_seconds = 0
+    if alert_config:
+        step_seconds = int(alert_config["step_seconds"])
+        thresholds = (float(alert_config["warn_pct"]), float(alert_config["crit_pct"]))
+
+    summary, max_dur = summarize_values(values, thresholds=thresholds, step_seconds=step_seconds)
+    if alert_config and summary.get("count", 0) > 0:
+        sustain_seconds = int(alert_config["sustain_seconds"])
+        warn_pct, crit_pct = thresholds
+        warn_max, crit_max = max_dur
+        summary["sustain"] = {
+            "warning": {
+                "threshold_pct": warn_pct,
+                "min_duration_sec": sustain_seconds,
+                "max_duration_sec": warn_max,
+                "breached": warn_max >= sustain_seconds,
+            },
+            "critical": {
+                "threshold_pct": crit_pct,
+                "min_duration_sec": sustain_seconds,
+                "max_duration_sec": crit_max,
+                "breached": crit_max >= sustain_seconds,
+            },
+        }
+    item = {"metric": metric, "summary": summary}
+    if include_samples:
+        if budget is None:
+            item["values"] = values
+        else:
+            item["values"], downsampled = budget.apply(values)
+            if downsampled:
+                item["downsampled"] = downsampled
+    return item
 
 
 def summarize_matrix(
-    result_matrix: List[Dict[str, Any]],
+    result_matrix: Iterable[Dict[str, Any]],
     include_samples: bool,
     *,
     alert_config: Optional[Dict[str, Any]] = None,
+    budget: Optional[SampleBudget] = None,
 ) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    for series in result_matrix:
-        metric = series.get("metric", {})
-        values = series.get("values", [])
-        summary = stats_from_values(values)
-        if alert_config and summary.get("count", 0) > 0:
-            step_seconds = int(alert_config["step_seconds"])
-            sustain_seconds = int(alert_config["sustain_seconds"])
-            warn_pct = float(alert_config["warn_pct"])
-            crit_pct = float(alert_config["crit_pct"])
-            warn_max = max_sustain_duration(values, threshold=warn_pct, step_seconds=step_seconds)
-            crit_max = max_sustain_duration(values, threshold=crit_pct, step_seconds=step_seconds)
-            summary["sustain"] = {
-                "warning": {
-                    "threshold_pct": warn_pct,
-                    "min_duration_sec": sustain_seconds,
-                    "max_duration_sec": warn_max,
-                    "breached": warn_max >= sustain_seconds,
-                },
-                "critical": {
-                    "threshold_pct": crit_pct,
-                    "min_duration_sec": sustain_seconds,
-                    "max_duration_sec": crit_max,
-                    "breached": crit_max >= sustain_seconds,
-                },
-            }
-        item = {"metric": metric, "summary": summary}
-        if include_samples:
-            item["values"] = values
-        out.append(item)
-    return out
+    with metrics.timer("mcp_processing_seconds", stage="summarize_series"):
+        return [
+            summarize_series(series, include_samples, alert_config=alert_config, budget=budget)
+            for series in result_matrix
+        ]
+
+
+def summarize_stopwatch() -> Stopwatch:
+    """Accumulates `summarize_series` time of one check; call `.record()` once at the end."""
+    return Stopwatch("mcp_processing_seconds", stage="summarize_series")
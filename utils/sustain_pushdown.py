@@ -0,0 +1,106 @@
+"""Sustained-breach evaluation pushed down into one instant PromQL query per check."""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+STAT_LABEL = "mcp_stat"
+_LEVELS = ("warning", "critical")
+
+
+def _tag(promql: str, stat: str) -> str:
+    return f'label_replace({promql}, "{STAT_LABEL}", "{stat}", "", "")'
+
+
+def _fmt_threshold(value: float) -> str:
+    return repr(float(value))
+
+
+def pushdown_promql(
+    expr: str,
+    *,
+    range_str: str,
+    step: str,
+    step_seconds: int,
+    sustain_seconds: int,
+    thresholds: Sequence[float],
+    start_ts: int,
+) -> str:
+    """
+    One `or`-joined instant query returning, per series, the breach
+    information that `summarize_series` would derive from samples.
+
+    - `sustained`: `max_over_time(min_over_time(expr[sustain+step:step])[range:step])`,
+      the highest level held for a whole sustain window; a threshold was
+      breached for `sustain_seconds` when it is `>=` the threshold. The window
+      spans `sustain/step + 1` samples, matching `last - first >= sustain`.
+      Sustain windows ending before `start_ts + sustain_seconds` are dropped,
+      so no window reaches back before the requested range.
+    - `breach_<i>`: samples at or above threshold `i` (total breach time / step).
+
+    Each of the `1 + len(thresholds)` subqueries evaluates `expr` at every step
+    of the window, so with the default two thresholds Prometheus does about
+    three times the work of one `query_range` of `expr`. The window stats
+    (`count`/`min`/`max`/`avg`/`last`) are cheaper to compute from that range
+    query than to push down, so `assemble_pushdown` takes them from there.
+    """
+    window = f"[{range_str}:{step}]"
+    sustain_window = f"[{sustain_seconds + step_seconds}s:{step}]"
+    held = f"min_over_time(({expr}){sustain_window}) and on() (vector(time()) >= {start_ts + sustain_seconds})"
+    parts = [_tag(f"max_over_time(({held}){window})", "sustained")]
+    for i, threshold in enumerate(thresholds):
+        parts.append(_tag(f"count_over_time((({expr}) >= {_fmt_threshold(threshold)}){window})", f"breach_{i}"))
+    return " or ".join(parts)
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return None
+    return out if math.isfinite(out) else None
+
+
+def _series_key(metric: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    # Range functions drop `__name__`, so it is not part of the match.
+    return tuple(sorted((str(k), str(v)) for k, v in metric.items() if k != "__name__"))
+
+
+def assemble_pushdown(
+    summaries: Sequence[Dict[str, Any]],
+    result: Sequence[Dict[str, Any]],
+    *,
+    thresholds: Sequence[float],
+    sustain_seconds: int,
+    step_seconds: int,
+) -> List[Dict[str, Any]]:
+    """
+    Attach the tagged instant vector of `pushdown_promql` to the sample-based
+    `{"metric", "summary"}` items of the same series (summarized without
+    `alert_config`), in `summaries` order.
+    """
+    stats: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+    for sample in result:
+        metric = dict(sample.get("metric", {}))
+        stat = metric.pop(STAT_LABEL, None)
+        value = sample.get("value") or [None, None]
+        if stat:
+            stats.setdefault(_series_key(metric), {})[stat] = _float(value[1])
+
+    items = []
+    for item in summaries:
+        summary = dict(item["summary"])
+        if summary.get("count"):
+            entry = stats.get(_series_key(item["metric"]), {})
+            sustained = entry.get("sustained")
+            summary["sustain"] = {
+                level: {
+                    "threshold_pct": threshold,
+                    "min_duration_sec": sustain_seconds,
+                    "breach_duration_sec": int(entry.get(f"breach_{i}") or 0) * step_seconds,
+                    "breached": sustained is not None and sustained >= threshold,
+                }
+                for i, (level, threshold) in enumerate(zip(_LEVELS, thresholds))
+            }
+        items.append({**item, "summary": summary})
+    return items